@@ -0,0 +1,58 @@
+# src/async_support.py
+import asyncio
+import os
+from typing import Awaitable, Iterable, List
+
+# Upper bound on in-flight queries per fan-out
+ASYNC_CONCURRENCY = int(os.getenv("RETAIL_ASYNC_CONCURRENCY", "8"))
+
+
+async def gather_bounded(aws: Iterable[Awaitable], limit: int | None = None) -> List:
+    """
+    asyncio.gather with at most `limit` awaitables running at once; results keep input order.
+    """
+    sem = asyncio.Semaphore(limit or ASYNC_CONCURRENCY)
+
+    async def run(aw):
+        async with sem:
+            return await aw
+    return await asyncio.gather(*(run(aw) for aw in aws))
+
+
+class AsyncClientAdapter:
+    """
+    Presents a synchronous client (the SQLite backend, a benchmark stand-in) with the
+    async client API: builders are unchanged, execute() is awaited and runs in a worker thread.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name: str) -> "_AsyncQuery":
+        return _AsyncQuery(self._client.table(name))
+
+    from_ = table
+
+    def rpc(self, fn: str, params=None) -> "_AsyncQuery":
+        return _AsyncQuery(self._client.rpc(fn, params))
+
+
+class _AsyncQuery:
+    def __init__(self, inner):
+        self._inner = inner
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if hasattr(result, "execute"):
+                self._inner = result
+                return self
+            return result
+        return call
+
+    async def execute(self):
+        return await asyncio.to_thread(self._inner.execute)
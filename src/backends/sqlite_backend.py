@@ -0,0 +1,460 @@
+# src/backends/sqlite_backend.py
+"""
+Embedded SQLite engine exposing the subset of the supabase/PostgREST client API
+the DAOs and services use: client.table(...).select/insert/upsert/update/delete,
+the usual filters, order/limit/range, embedded selects and client.rpc(...).
+Every statement is parameterised (sqlite3 caches the prepared statements) and
+every execute() runs in its own transaction.
+"""
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "sqlite_schema.sql")
+
+# SQLite's default limit on bound parameters per statement
+_MAX_VARIABLES = 32766
+
+# Same format as the schema's column defaults and updated_at triggers
+NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')"
+
+# Stored-procedure stand-ins: name -> fn(client, **params)
+RPC_FUNCTIONS: Dict[str, Callable] = {}
+
+def register_rpc(name: str):
+    def decorator(fn):
+        RPC_FUNCTIONS[name] = fn
+        return fn
+    return decorator
+
+
+class APIError(Exception):
+    """
+    Mirrors postgrest.exceptions.APIError: carries a Postgres-style error code.
+    """
+
+    def __init__(self, message: str, code: str | None = None, details: str | None = None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.details = details
+
+
+class SQLiteResponse:
+    def __init__(self, data: List[Dict], count: int | None = None):
+        self.data = data
+        self.count = count
+
+
+_CONSTRAINT_CODES = [
+    ("UNIQUE constraint failed", "23505"),
+    ("NOT NULL constraint failed", "23502"),
+    ("FOREIGN KEY constraint failed", "23503"),
+    ("CHECK constraint failed", "23514"),
+]
+
+def _api_error(exc: sqlite3.Error) -> APIError:
+    msg = str(exc)
+    for prefix, code in _CONSTRAINT_CODES:
+        if msg.startswith(prefix):
+            return APIError(msg, code=code)
+    return APIError(msg)
+
+
+def _split_top_level(columns: str) -> List[str]:
+    parts, depth, cur = [], 0, []
+    for ch in columns:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append("".join(cur).strip())
+            cur = []
+        else:
+            cur.append(ch)
+    if "".join(cur).strip():
+        parts.append("".join(cur).strip())
+    return parts
+
+def _parse_select(columns: str):
+    """
+    "*, customers(*), order_items(*, products(*))" -> (["*"], [("customers", "*"), ...])
+    """
+    plain, embeds = [], []
+    for part in _split_top_level(columns or "*"):
+        m = re.fullmatch(r"(\w+)\s*\((.*)\)", part, re.S)
+        if m:
+            embeds.append((m.group(1), m.group(2).strip() or "*"))
+        else:
+            plain.append(part)
+    return plain or ["*"], embeds
+
+
+class SQLiteQuery:
+    """
+    One table request, built fluently like a postgrest request builder.
+    """
+
+    def __init__(self, client: "SQLiteClient", table: str):
+        if table not in client.columns:
+            raise APIError(f"relation \"{table}\" does not exist", code="42P01")
+        self._client = client
+        self._table = table
+        self._op = "select"
+        self._columns = "*"
+        self._payload: Any = None
+        self._where: List[str] = []
+        self._params: List[Any] = []
+        self._order: List[str] = []
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+        self._count: Optional[str] = None
+        self._on_conflict: Optional[str] = None
+        self._ignore_duplicates = False
+        self._returning = "representation"
+
+    def _col(self, name: str) -> str:
+        if name not in self._client.columns[self._table]:
+            raise APIError(f"column {self._table}.{name} does not exist", code="42703")
+        return f'"{name}"'
+
+    # operations
+    def select(self, *columns: str, count: str | None = None):
+        self._op = "select"
+        self._columns = ",".join(columns) if columns else "*"
+        self._count = count
+        return self
+
+    def insert(self, json, count=None, returning: str = "representation", upsert: bool = False, **_):
+        self._op = "upsert" if upsert else "insert"
+        self._payload = json
+        self._returning = returning
+        return self
+
+    def upsert(self, json, count=None, returning: str = "representation",
+               ignore_duplicates: bool = False, on_conflict: str = "", **_):
+        self._op = "upsert"
+        self._payload = json
+        self._returning = returning
+        self._ignore_duplicates = ignore_duplicates
+        self._on_conflict = on_conflict or None
+        return self
+
+    def update(self, json, count=None, returning: str = "representation", **_):
+        self._op = "update"
+        self._payload = json
+        self._returning = returning
+        return self
+
+    def delete(self, count=None, returning: str = "representation", **_):
+        self._op = "delete"
+        self._returning = returning
+        return self
+
+    # filters
+    def _filter(self, column: str, op: str, value):
+        self._where.append(f"{self._col(column)} {op} ?")
+        self._params.append(value)
+        return self
+
+    def eq(self, column: str, value):
+        return self._filter(column, "=", value)
+
+    def neq(self, column: str, value):
+        return self._filter(column, "!=", value)
+
+    def gt(self, column: str, value):
+        return self._filter(column, ">", value)
+
+    def gte(self, column: str, value):
+        return self._filter(column, ">=", value)
+
+    def lt(self, column: str, value):
+        return self._filter(column, "<", value)
+
+    def lte(self, column: str, value):
+        return self._filter(column, "<=", value)
+
+    def like(self, column: str, pattern: str):
+        self._where.append(f"{self._col(column)} LIKE ? ESCAPE '\\'")
+        self._params.append(pattern.replace("*", "%"))
+        return self
+
+    def ilike(self, column: str, pattern: str):
+        self._where.append(f"lower({self._col(column)}) LIKE lower(?) ESCAPE '\\'")
+        self._params.append(pattern.replace("*", "%"))
+        return self
+
+    def is_(self, column: str, value):
+        if value is None or str(value).lower() == "null":
+            self._where.append(f"{self._col(column)} IS NULL")
+            return self
+        return self._filter(column, "IS", value)
+
+    def in_(self, column: str, values):
+        values = list(values)
+        if not values:
+            self._where.append("0")
+            return self
+        self._where.append(f"{self._col(column)} IN ({','.join('?' * len(values))})")
+        self._params.extend(values)
+        return self
+
+    # modifiers
+    def order(self, column: str, desc: bool = False, nullsfirst: bool | None = None, **_):
+        clause = f"{self._col(column)} {'DESC' if desc else 'ASC'}"
+        if nullsfirst is not None:
+            clause += " NULLS FIRST" if nullsfirst else " NULLS LAST"
+        self._order.append(clause)
+        return self
+
+    def limit(self, size: int, **_):
+        self._limit = int(size)
+        return self
+
+    def range(self, start: int, end: int, **_):
+        self._offset = int(start)
+        self._limit = int(end) - int(start) + 1
+        return self
+
+    def offset(self, size: int):
+        self._offset = int(size)
+        return self
+
+    # execution
+    def _where_sql(self) -> str:
+        return (" WHERE " + " AND ".join(self._where)) if self._where else ""
+
+    def execute(self) -> SQLiteResponse:
+        try:
+            with self._client.transaction(write=self._op != "select") as conn:
+                if self._op == "select":
+                    return self._run_select(conn)
+                if self._op in ("insert", "upsert"):
+                    data = self._run_insert(conn)
+                elif self._op == "update":
+                    data = self._run_write(conn, "update")
+                else:
+                    data = self._run_write(conn, "delete")
+                return SQLiteResponse(data if self._returning == "representation" else [])
+        except sqlite3.Error as e:
+            raise _api_error(e) from e
+
+    def _run_select(self, conn) -> SQLiteResponse:
+        plain, embeds = _parse_select(self._columns)
+        sql = f'SELECT * FROM "{self._table}"{self._where_sql()}'
+        if self._order:
+            sql += " ORDER BY " + ", ".join(self._order)
+        params = list(self._params)
+        if self._limit is not None or self._offset is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [self._limit if self._limit is not None else -1, self._offset or 0]
+        rows = [dict(r) for r in conn.execute(sql, params)]
+        for name, inner in embeds:
+            self._client._embed(conn, self._table, rows, name, inner)
+        if plain != ["*"]:
+            wanted = [c.strip() for c in plain]
+            for c in wanted:
+                self._col(c)
+            keep = set(wanted) | {name for name, _ in embeds}
+            rows = [{k: v for k, v in r.items() if k in keep} for r in rows]
+        count = None
+        if self._count:
+            count = conn.execute(f'SELECT COUNT(*) FROM "{self._table}"{self._where_sql()}',
+                                 self._params).fetchone()[0]
+        return SQLiteResponse(rows, count)
+
+    def _run_insert(self, conn) -> List[Dict]:
+        rows = self._payload if isinstance(self._payload, list) else [self._payload]
+        out: List[Dict] = []
+        # Consecutive rows with the same key set share one multi-row statement
+        i = 0
+        while i < len(rows):
+            keys = list(rows[i].keys())
+            j = i
+            while j < len(rows) and list(rows[j].keys()) == keys:
+                j += 1
+            per_stmt = max(1, _MAX_VARIABLES // max(1, len(keys)))
+            for start in range(i, j, per_stmt):
+                out.extend(self._insert_chunk(conn, keys, rows[start:min(j, start + per_stmt)]))
+            i = j
+        return out
+
+    def _stamps(self, keys) -> bool:
+        # The updated_at triggers run AFTER the statement, too late for RETURNING (Postgres stamps
+        # BEFORE), so tables with the column get it set in the statement itself
+        return "updated_at" in self._client.columns.get(self._table, ()) and "updated_at" not in keys
+
+    def _insert_chunk(self, conn, keys: List[str], chunk: List[Dict]) -> List[Dict]:
+        stamp = self._stamps(keys)
+        cols = ", ".join([self._col(k) for k in keys] + (['"updated_at"'] if stamp else []))
+        row_sql = "(" + ", ".join(["?"] * len(keys) + ([NOW_SQL] if stamp else [])) + ")"
+        values = ", ".join(row_sql for _ in chunk)
+        sql = f'INSERT INTO "{self._table}" ({cols}) VALUES {values}'
+        if self._op == "upsert":
+            target = [c.strip() for c in (self._on_conflict or self._client.primary_keys[self._table]).split(",")]
+            conflict = ", ".join(self._col(c) for c in target)
+            updates = [k for k in keys if k not in target]
+            if self._ignore_duplicates or not updates:
+                sql += f" ON CONFLICT ({conflict}) DO NOTHING"
+            else:
+                sets = ", ".join(f'{self._col(k)} = excluded.{self._col(k)}' for k in updates)
+                if stamp:
+                    sets += f', "updated_at" = {NOW_SQL}'
+                sql += f" ON CONFLICT ({conflict}) DO UPDATE SET {sets}"
+        sql += " RETURNING *"
+        params = [row.get(k) for row in chunk for k in keys]
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+    def _run_write(self, conn, op: str) -> List[Dict]:
+        if op == "update":
+            fields = self._payload or {}
+            if not fields:
+                return []
+            sets = ", ".join(f"{self._col(k)} = ?" for k in fields)
+            if self._stamps(fields):
+                sets += f', "updated_at" = {NOW_SQL}'
+            sql = f'UPDATE "{self._table}" SET {sets}{self._where_sql()} RETURNING *'
+            params = list(fields.values()) + self._params
+        else:
+            sql = f'DELETE FROM "{self._table}"{self._where_sql()} RETURNING *'
+            params = list(self._params)
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+
+class SQLiteRPC:
+    def __init__(self, client: "SQLiteClient", fn: str, params: Dict | None):
+        self._client = client
+        self._fn = fn
+        self._params = params or {}
+
+    def execute(self) -> SQLiteResponse:
+        fn = RPC_FUNCTIONS.get(self._fn)
+        if fn is None:
+            raise APIError(f"Could not find the function public.{self._fn}", code="PGRST202")
+        try:
+            return SQLiteResponse(fn(self._client, **self._params))
+        except sqlite3.Error as e:
+            raise _api_error(e) from e
+
+
+class SQLiteClient:
+    """
+    Drop-in stand-in for supabase.Client backed by a local SQLite database.
+    One connection shared under a lock; ":memory:" gives a throwaway database.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     cached_statements=512)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._migrate()
+        with open(SCHEMA_PATH) as f:
+            self._conn.executescript(f.read())
+        self._load_metadata()
+        # Registers the stored-function stand-ins on first use
+        from src.backends import sqlite_rpc  # noqa: F401
+
+    def _migrate(self) -> None:
+        """
+        Bring database files created by older schema versions up to date before the schema runs.
+        """
+        for table in ("products", "customers"):
+            cols = [r["name"] for r in self._conn.execute(f'PRAGMA table_info("{table}")')]
+            if cols and "updated_at" not in cols:
+                # ALTER TABLE can't add a column with a non-constant default; the insert trigger stamps new rows
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN updated_at TEXT")
+                self._conn.execute(f"UPDATE {table} SET updated_at = created_at")
+
+    def _load_metadata(self) -> None:
+        self.columns: Dict[str, List[str]] = {}
+        self.primary_keys: Dict[str, str] = {}
+        # (child table, fk column) -> (parent table, parent column)
+        self.foreign_keys: Dict[tuple, tuple] = {}
+        tables = [r[0] for r in self._conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        for t in tables:
+            info = self._conn.execute(f'PRAGMA table_info("{t}")').fetchall()
+            self.columns[t] = [r["name"] for r in info]
+            pk = [r["name"] for r in info if r["pk"]]
+            if pk:
+                self.primary_keys[t] = pk[0]
+            for fk in self._conn.execute(f'PRAGMA foreign_key_list("{t}")'):
+                self.foreign_keys[(t, fk["from"])] = (fk["table"], fk["to"])
+
+    def table(self, name: str) -> SQLiteQuery:
+        return SQLiteQuery(self, name)
+
+    from_ = table
+
+    def rpc(self, fn: str, params: Dict | None = None) -> SQLiteRPC:
+        return SQLiteRPC(self, fn, params)
+
+    @contextmanager
+    def transaction(self, write: bool = True):
+        """
+        Serialised transaction; nested use joins the outer one. Writes take the database
+        write lock up front (BEGIN IMMEDIATE); reads (write=False) begin deferred, so
+        they only hold a WAL read snapshot and don't block other connections' writers.
+        """
+        with self._lock:
+            if self._conn.in_transaction:
+                yield self._conn
+                return
+            self._conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _embed(self, conn, table: str, rows: List[Dict], name: str, inner: str) -> None:
+        """
+        Attach `name` to every row using the foreign keys between the two tables,
+        the way PostgREST resolves embedded resources (to-one -> dict, to-many -> list).
+        """
+        for (child, col), (parent, pcol) in self.foreign_keys.items():
+            if child == table and parent == name:
+                keys = list({r[col] for r in rows if r.get(col) is not None})
+                related = self._fetch_in(name, inner, pcol, keys)
+                by_key = {r[pcol]: r for r in related}
+                for r in rows:
+                    r[name] = by_key.get(r.get(col))
+                return
+            if child == name and parent == table:
+                keys = list({r[pcol] for r in rows if r.get(pcol) is not None})
+                related = self._fetch_in(name, inner, col, keys)
+                grouped: Dict[Any, List[Dict]] = {}
+                for r in related:
+                    grouped.setdefault(r[col], []).append(r)
+                for r in rows:
+                    r[name] = grouped.get(r.get(pcol), [])
+                return
+        raise APIError(f"Could not find a relationship between '{table}' and '{name}'", code="PGRST200")
+
+    def _fetch_in(self, table: str, inner: str, column: str, keys: List) -> List[Dict]:
+        if not keys:
+            return []
+        plain, embeds = _parse_select(inner)
+        # Always carry the join column so results can be matched to their parents
+        cols = inner if plain == ["*"] else ",".join(plain + [column] + [f"{n}({i})" for n, i in embeds])
+        out: List[Dict] = []
+        for start in range(0, len(keys), _MAX_VARIABLES):
+            q = SQLiteQuery(self, table).select(cols).in_(column, keys[start:start + _MAX_VARIABLES])
+            out.extend(q._run_select(self._conn).data)
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
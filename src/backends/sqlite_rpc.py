@@ -0,0 +1,229 @@
+# src/backends/sqlite_rpc.py
+"""
+SQLite versions of the database functions defined in src/tables_used.txt,
+reachable through SQLiteClient.rpc(name, params).
+"""
+from src.backends.sqlite_backend import NOW_SQL, register_rpc
+
+
+@register_rpc("report_top_selling_products")
+def report_top_selling_products(client, p_limit: int = 5, p_from=None, p_to=None):
+    with client.transaction() as conn:
+        rows = conn.execute(
+            """
+            SELECT oi.prod_id, p.name, SUM(oi.quantity) AS units_sold
+            FROM order_items oi
+            JOIN orders o ON o.order_id = oi.order_id
+            LEFT JOIN products p ON p.prod_id = oi.prod_id
+            WHERE (:p_from IS NULL OR o.order_date >= :p_from)
+              AND (:p_to IS NULL OR o.order_date < :p_to)
+            GROUP BY oi.prod_id, p.name
+            ORDER BY units_sold DESC, oi.prod_id
+            LIMIT :p_limit
+            """,
+            {"p_limit": p_limit, "p_from": p_from, "p_to": p_to},
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+@register_rpc("report_paid_revenue")
+def report_paid_revenue(client, p_from, p_to=None):
+    with client.transaction() as conn:
+        row = conn.execute(
+            """
+            SELECT COALESCE(SUM(amount), 0)
+            FROM payments
+            WHERE status = 'PAID'
+              AND paid_at >= :p_from
+              AND (:p_to IS NULL OR paid_at < :p_to)
+            """,
+            {"p_from": p_from, "p_to": p_to},
+        ).fetchone()
+    return row[0]
+
+
+@register_rpc("report_orders_by_customer")
+def report_orders_by_customer(client, p_from=None, p_to=None, p_min_orders: int = 1,
+                              p_after=None, p_page_size=None):
+    with client.transaction() as conn:
+        rows = conn.execute(
+            """
+            SELECT o.cust_id, COUNT(*) AS order_count
+            FROM orders o
+            WHERE (:p_from IS NULL OR o.order_date >= :p_from)
+              AND (:p_to IS NULL OR o.order_date < :p_to)
+              AND (:p_after IS NULL OR o.cust_id > :p_after)
+            GROUP BY o.cust_id
+            HAVING COUNT(*) >= :p_min_orders
+            ORDER BY o.cust_id
+            LIMIT COALESCE(:p_page_size, -1)
+            """,
+            {"p_from": p_from, "p_to": p_to, "p_min_orders": p_min_orders,
+             "p_after": p_after, "p_page_size": p_page_size},
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+@register_rpc("report_apply_delta")
+def report_apply_delta(client, p_units=None, p_orders=None, p_revenue=None):
+    with client.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO report_product_sales (prod_id, units_sold) VALUES (?, ?) "
+            "ON CONFLICT (prod_id) DO UPDATE SET units_sold = units_sold + excluded.units_sold",
+            [(e["prod_id"], e["units"]) for e in p_units or []])
+        conn.executemany(
+            "INSERT INTO report_customer_orders (cust_id, order_count) VALUES (?, ?) "
+            "ON CONFLICT (cust_id) DO UPDATE SET order_count = order_count + excluded.order_count",
+            [(e["cust_id"], e["orders"]) for e in p_orders or []])
+        conn.executemany(
+            "INSERT INTO report_daily_revenue (day, revenue) VALUES (?, ?) "
+            "ON CONFLICT (day) DO UPDATE SET revenue = revenue + excluded.revenue",
+            [(str(e["day"])[:10], e["amount"]) for e in p_revenue or []])
+    return None
+
+
+_EXPECTED_AGGREGATES = {
+    "units_sold": ("SELECT prod_id, SUM(quantity) FROM order_items WHERE prod_id IS NOT NULL GROUP BY prod_id",
+                   "SELECT prod_id, units_sold FROM report_product_sales"),
+    "order_count": ("SELECT cust_id, COUNT(*) FROM orders WHERE cust_id IS NOT NULL GROUP BY cust_id",
+                    "SELECT cust_id, order_count FROM report_customer_orders"),
+    "daily_revenue": ("SELECT substr(paid_at, 1, 10), SUM(amount) FROM payments "
+                      "WHERE status = 'PAID' AND paid_at IS NOT NULL GROUP BY 1",
+                      "SELECT day, revenue FROM report_daily_revenue"),
+}
+
+
+@register_rpc("report_rebuild_aggregates")
+def report_rebuild_aggregates(client):
+    with client.transaction() as conn:
+        for table, (expected_sql, _) in zip(
+                ("report_product_sales", "report_customer_orders", "report_daily_revenue"),
+                _EXPECTED_AGGREGATES.values()):
+            conn.execute(f"DELETE FROM {table}")
+            conn.execute(f"INSERT INTO {table} {expected_sql}")
+    return None
+
+
+@register_rpc("report_verify_aggregates")
+def report_verify_aggregates(client):
+    diffs = []
+    with client.transaction() as conn:
+        for kind, (expected_sql, actual_sql) in _EXPECTED_AGGREGATES.items():
+            expected = dict(conn.execute(expected_sql).fetchall())
+            actual = dict(conn.execute(actual_sql).fetchall())
+            for key in sorted(set(expected) | set(actual), key=str):
+                e, a = expected.get(key, 0) or 0, actual.get(key, 0) or 0
+                if round(e - a, 2) != 0:
+                    diffs.append({"kind": kind, "key": str(key), "expected": e, "actual": a})
+    return diffs
+
+
+@register_rpc("low_stock_products")
+def low_stock_products(client, p_default: int = 5, p_after=None, p_page_size=None):
+    with client.transaction() as conn:
+        rows = conn.execute(
+            """
+            SELECT p.prod_id, p.name, p.sku, p.category, p.stock,
+                   COALESCE(s.threshold, c.threshold, :p_default) AS threshold
+            FROM products p
+            LEFT JOIN reorder_thresholds s ON s.scope = 'sku' AND s.target = p.sku
+            LEFT JOIN reorder_thresholds c ON c.scope = 'category' AND c.target = p.category
+            WHERE p.stock <= (SELECT MAX(:p_default, COALESCE(MAX(t.threshold), 0)) FROM reorder_thresholds t)
+              AND p.stock <= COALESCE(s.threshold, c.threshold, :p_default)
+              AND (:p_after IS NULL OR p.prod_id > :p_after)
+            ORDER BY p.prod_id
+            LIMIT COALESCE(:p_page_size, -1)
+            """,
+            {"p_default": p_default, "p_after": p_after, "p_page_size": p_page_size},
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def _columns(rows, names) -> dict:
+    return {name: [r[i] for r in rows] for i, name in enumerate(names)}
+
+
+@register_rpc("analytics_payment_columns")
+def analytics_payment_columns(client, p_from, p_to, p_after=None, p_limit: int = 50000):
+    with client.transaction() as conn:
+        rows = conn.execute(
+            """
+            SELECT pay.payment_id, pay.amount, substr(pay.paid_at, 1, 10) AS day, c.city
+            FROM payments pay
+            JOIN orders o ON o.order_id = pay.order_id
+            LEFT JOIN customers c ON c.cust_id = o.cust_id
+            WHERE pay.status = 'PAID' AND pay.paid_at >= :p_from AND pay.paid_at < :p_to
+              AND (:p_after IS NULL OR pay.payment_id > :p_after)
+            ORDER BY pay.payment_id
+            LIMIT :p_limit
+            """,
+            {"p_from": p_from, "p_to": p_to, "p_after": p_after, "p_limit": p_limit},
+        ).fetchall()
+    return _columns(rows, ("payment_id", "amount", "day", "city"))
+
+
+@register_rpc("analytics_item_columns")
+def analytics_item_columns(client, p_from, p_to, p_after=None, p_limit: int = 50000):
+    with client.transaction() as conn:
+        rows = conn.execute(
+            """
+            SELECT oi.item_id, oi.order_id, oi.quantity, oi.price * oi.quantity AS amount,
+                   substr(o.order_date, 1, 10) AS day, p.category, c.city
+            FROM order_items oi
+            JOIN orders o ON o.order_id = oi.order_id
+            LEFT JOIN products p ON p.prod_id = oi.prod_id
+            LEFT JOIN customers c ON c.cust_id = o.cust_id
+            WHERE o.status <> 'CANCELLED' AND o.order_date >= :p_from AND o.order_date < :p_to
+              AND (:p_after IS NULL OR oi.item_id > :p_after)
+            ORDER BY oi.item_id
+            LIMIT :p_limit
+            """,
+            {"p_from": p_from, "p_to": p_to, "p_after": p_after, "p_limit": p_limit},
+        ).fetchall()
+    return _columns(rows, ("item_id", "order_id", "quantity", "amount", "day", "category", "city"))
+
+
+def _stock_request(p_items) -> dict:
+    demand = {}
+    for e in p_items or []:
+        demand[int(e["prod_id"])] = demand.get(int(e["prod_id"]), 0) + int(e["quantity"])
+    return demand
+
+
+@register_rpc("reserve_stock")
+def reserve_stock(client, p_items):
+    demand = _stock_request(p_items)
+    with client.transaction() as conn:
+        shortages = []
+        for pid, qty in sorted(demand.items()):
+            row = conn.execute("SELECT name, stock FROM products WHERE prod_id = ?", (pid,)).fetchone()
+            if row is None or row["stock"] < qty:
+                shortages.append({"prod_id": pid, "name": row["name"] if row else None,
+                                  "stock": row["stock"] if row else None, "requested": qty})
+        if shortages:
+            return {"ok": False, "shortages": shortages}
+        products = [dict(conn.execute(f"UPDATE products SET stock = stock - ?, updated_at = {NOW_SQL} "
+                                      "WHERE prod_id = ? RETURNING *",
+                                      (qty, pid)).fetchone())
+                    for pid, qty in sorted(demand.items())]
+    return {"ok": True, "products": products}
+
+
+@register_rpc("release_stock")
+def release_stock(client, p_items):
+    demand = _stock_request(p_items)
+    with client.transaction() as conn:
+        rows = [conn.execute(f"UPDATE products SET stock = stock + ?, updated_at = {NOW_SQL} "
+                             "WHERE prod_id = ? RETURNING *",
+                             (qty, pid)).fetchone()
+                for pid, qty in sorted(demand.items())]
+    return [dict(r) for r in rows if r is not None]
+
+
+@register_rpc("delete_customer_without_orders")
+def delete_customer_without_orders(client, p_cust_id):
+    with client.transaction() as conn:
+        if conn.execute("SELECT 1 FROM orders WHERE cust_id = ? LIMIT 1", (p_cust_id,)).fetchone():
+            return {"ok": False, "customer": None}
+        row = conn.execute("DELETE FROM customers WHERE cust_id = ? RETURNING *", (p_cust_id,)).fetchone()
+    return {"ok": True, "customer": dict(row) if row else None}
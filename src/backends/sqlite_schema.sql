@@ -0,0 +1,111 @@
+-- SQLite mirror of src/tables_used.txt for the embedded backend.
+-- NUMERIC money columns are REAL here so values round-trip as floats like PostgREST returns them.
+
+CREATE TABLE IF NOT EXISTS customers (
+    cust_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT UNIQUE,
+    phone TEXT NOT NULL,
+    city TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS products (
+    prod_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    sku TEXT UNIQUE NOT NULL,
+    price REAL NOT NULL CHECK (price > 0),
+    stock INTEGER NOT NULL DEFAULT 0,
+    category TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS orders (
+    order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cust_id INTEGER REFERENCES customers (cust_id) ON DELETE CASCADE,
+    order_date TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    status TEXT DEFAULT 'PLACED',
+    total_amount REAL
+);
+
+CREATE TABLE IF NOT EXISTS order_items (
+    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER REFERENCES orders (order_id) ON DELETE CASCADE,
+    prod_id INTEGER REFERENCES products (prod_id),
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    price REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS payments (
+    payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER REFERENCES orders (order_id) ON DELETE CASCADE,
+    amount REAL,
+    method TEXT,
+    paid_at TEXT,
+    status TEXT
+);
+
+-- sku and email are already indexed through their UNIQUE constraints
+CREATE INDEX IF NOT EXISTS idx_orders_cust_id ON orders (cust_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_prod_id ON order_items (prod_id);
+CREATE INDEX IF NOT EXISTS idx_payments_order_id ON payments (order_id);
+CREATE INDEX IF NOT EXISTS idx_payments_status_paid_at ON payments (status, paid_at);
+CREATE INDEX IF NOT EXISTS idx_orders_order_date ON orders (order_date);
+CREATE INDEX IF NOT EXISTS idx_products_updated_at ON products (updated_at);
+CREATE INDEX IF NOT EXISTS idx_products_stock ON products (stock);
+CREATE INDEX IF NOT EXISTS idx_customers_updated_at ON customers (updated_at);
+
+-- Reorder levels for low-stock checks; a sku entry beats its category's, which beats the caller's default
+CREATE TABLE IF NOT EXISTS reorder_thresholds (
+    scope TEXT NOT NULL CHECK (scope IN ('category', 'sku')),
+    target TEXT NOT NULL,
+    threshold INTEGER NOT NULL CHECK (threshold >= 0),
+    PRIMARY KEY (scope, target)
+);
+
+-- Keep products.updated_at current for the catalog snapshot's delta refresh (src/dao/catalog.py)
+CREATE TRIGGER IF NOT EXISTS products_touch_updated_at
+AFTER UPDATE ON products FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE products SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE prod_id = NEW.prod_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_stamp_updated_at
+AFTER INSERT ON products FOR EACH ROW WHEN NEW.updated_at IS NULL
+BEGIN
+    UPDATE products SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE prod_id = NEW.prod_id;
+END;
+
+-- Likewise customers.updated_at for the customer search index (src/dao/customer_index.py)
+CREATE TRIGGER IF NOT EXISTS customers_touch_updated_at
+AFTER UPDATE ON customers FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE customers SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE cust_id = NEW.cust_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS customers_stamp_updated_at
+AFTER INSERT ON customers FOR EACH ROW WHEN NEW.updated_at IS NULL
+BEGIN
+    UPDATE customers SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE cust_id = NEW.cust_id;
+END;
+
+-- Running report aggregates (see src/services/report_aggregates.py)
+CREATE TABLE IF NOT EXISTS report_product_sales (
+    prod_id INTEGER PRIMARY KEY REFERENCES products (prod_id) ON DELETE CASCADE,
+    units_sold INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_report_product_sales_units ON report_product_sales (units_sold DESC, prod_id);
+
+CREATE TABLE IF NOT EXISTS report_customer_orders (
+    cust_id INTEGER PRIMARY KEY REFERENCES customers (cust_id) ON DELETE CASCADE,
+    order_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_report_customer_orders_count ON report_customer_orders (order_count);
+
+CREATE TABLE IF NOT EXISTS report_daily_revenue (
+    day TEXT PRIMARY KEY,
+    revenue REAL NOT NULL DEFAULT 0
+);
@@ -0,0 +1,97 @@
+# src/bench/analytics.py
+"""
+Benchmark the NumPy analytics over millions of rows.
+
+    python -m src.bench.analytics --rows 3000000 --load-orders 50000
+
+Aggregation is timed on synthetic columns of --rows payments/order lines (no
+database involved), and the bulk load path is timed end to end against the
+PostgREST stand-in seeded with --load-orders orders.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from src.config import override_client
+from src.bench.fake_postgrest import FakeSupabase, seed
+from src.services import analytics
+
+
+def synthetic_columns(rows: int, days: int, cities: int, categories: int, seed_: int = 5) -> dict:
+    rng = np.random.default_rng(seed_)
+    start = np.datetime64(date.today() - timedelta(days=days), "D")
+    return {
+        "order_id": np.sort(rng.integers(1, max(2, rows // 3), rows)),
+        "quantity": rng.integers(1, 6, rows),
+        "amount": np.round(rng.uniform(5, 500, rows), 2),
+        "day": start + rng.integers(0, days, rows).astype("timedelta64[D]"),
+        "city": rng.integers(0, cities, rows).astype(np.int32),
+        "category": rng.integers(0, categories, rows).astype(np.int32),
+        "labels": {"city": [f"city-{i}" for i in range(cities)],
+                   "category": [f"category-{i}" for i in range(categories)]},
+    }
+
+
+def _time(fn, repeat: int) -> dict:
+    walls = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        walls.append((time.perf_counter() - t0) * 1000.0)
+    return {"wall_ms_median": round(statistics.median(walls), 1), "wall_ms_max": round(max(walls), 1)}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="retail-bench-analytics")
+    parser.add_argument("--rows", type=int, default=3_000_000, help="synthetic rows for aggregation timings")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--load-orders", type=int, default=20_000, help="orders seeded for the load timing")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    opts = build_parser().parse_args(argv)
+    cols = synthetic_columns(opts.rows, opts.days, opts.cities, opts.categories)
+    report = {"config": {k: v for k, v in vars(opts).items() if k != "output"}, "aggregate": {}, "load": {}}
+    for metric in ("sales", "units", "orders"):
+        for bucket in ("day", "week", "month"):
+            for by in (None, "city", "category"):
+                name = f"{metric}/{bucket}" + (f"/{by}" if by else "")
+                report["aggregate"][name] = _time(lambda: analytics.aggregate(cols, metric, bucket, by), opts.repeat)
+
+    fake = FakeSupabase(latency_ms=opts.latency_ms, seed=1)
+    report["load"]["seeded"] = seed(fake, products=1000, customers=5000, orders=opts.load_orders)
+    since, until = date.today() - timedelta(days=opts.days), date.today() + timedelta(days=1)
+    with override_client(fake):
+        for name, fn in (("payments", analytics.load_payments), ("items", analytics.load_items)):
+            fake.reset_counters()
+            t0 = time.perf_counter()
+            loaded = fn(since, until)
+            report["load"][name] = {"rows": int(len(loaded["day"])), "round_trips": fake.round_trips,
+                                    "wall_ms": round((time.perf_counter() - t0) * 1000.0, 1)}
+        t0 = time.perf_counter()
+        analytics.breakdown("revenue", since, until, "week", "city", compare="previous")
+        report["load"]["revenue_week_city_with_compare_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+    fake.backend.close()
+
+    out = json.dumps(report, indent=2)
+    if opts.output:
+        with open(opts.output, "w") as f:
+            f.write(out)
+    else:
+        sys.stdout.write(out + "\n")
+    return report
+
+
+if __name__ == "__main__":
+    main()
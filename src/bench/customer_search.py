@@ -0,0 +1,160 @@
+# src/bench/customer_search.py
+"""
+Benchmark customer type-ahead search over the in-process index.
+
+    python -m src.bench.customer_search --customers 500000 --queries 500
+
+Customers with generated names, emails and phone numbers are loaded into the
+PostgREST stand-in; the report covers the index load (round trips, wall time,
+footprint), per-query latency percentiles for each kind of query, and the
+cost of keeping the index current (delta refresh and in-process writes).
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from src.config import override_client
+from src.bench.fake_postgrest import FakeSupabase
+from src.dao import customer_dao
+from src.dao.customer_index import customer_index
+
+FIRST = ["aarav", "vivaan", "aditya", "vihaan", "arjun", "sai", "reyansh", "ayaan", "krishna", "ishaan",
+         "ananya", "diya", "aadhya", "saanvi", "pari", "anika", "navya", "myra", "sara", "ira",
+         "john", "maria", "david", "fatima", "chen", "olga", "pedro", "amina", "lucas", "emma"]
+LAST = ["sharma", "verma", "gupta", "reddy", "iyer", "nair", "patel", "shah", "mehta", "rao",
+        "kumar", "singh", "das", "bose", "menon", "pillai", "joshi", "kulkarni", "desai", "khan",
+        "smith", "garcia", "mueller", "rossi", "silva", "kim", "tanaka", "novak", "cohen", "okafor"]
+DOMAINS = ["example.com", "mail.in", "shop.co", "post.org"]
+
+
+def seed_customers(fake: FakeSupabase, customers: int, rng: random.Random) -> None:
+    batch = 50_000
+    # Stamped a second apart, ending an hour back, so the delta refresh below only sees the rows it changes
+    oldest = datetime.now(timezone.utc) - timedelta(hours=1, seconds=customers)
+    def stamp(i):
+        return (oldest + timedelta(seconds=i)).isoformat()
+    with fake.backend.transaction() as conn:
+        for start in range(0, customers, batch):
+            rows = []
+            for i in range(start, min(customers, start + batch)):
+                first, last = rng.choice(FIRST), rng.choice(LAST)
+                rows.append((f"{first.title()} {last.title()}", f"{first}.{last}{i}@{rng.choice(DOMAINS)}",
+                             f"+91 9{rng.randint(0, 999_999_999):09d}", stamp(i), stamp(i)))
+            conn.executemany("INSERT INTO customers (name, email, phone, created_at, updated_at) "
+                             "VALUES (?, ?, ?, ?, ?)", rows)
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(len(word))
+    return word[:i] + rng.choice("aeiou") + word[i + 1:]
+
+
+def query_mix(customers: int, rng: random.Random) -> dict:
+    """
+    kind -> query generator. Email prefixes and phone fragments are taken from real rows.
+    """
+    def row():
+        return customer_dao.get_customer_by_id(rng.randint(1, customers))
+    return {
+        "name_prefix": lambda: rng.choice(FIRST)[:rng.randint(2, 4)],
+        "full_name": lambda: f"{rng.choice(FIRST)} {rng.choice(LAST)[:3]}",
+        "surname": lambda: rng.choice(LAST),
+        "email_prefix": lambda: row()["email"][:rng.randint(8, 14)],
+        "phone_fragment": lambda: (lambda p: p[-rng.randint(4, 7):])(row()["phone"].replace(" ", "")),
+        "misspelt_name": lambda: f"{_typo(rng.choice(FIRST), rng)} {_typo(rng.choice(LAST), rng)}",
+    }
+
+
+def _percentiles(walls) -> dict:
+    walls = sorted(walls)
+
+    def pct(p):
+        return round(walls[min(len(walls) - 1, int(len(walls) * p))], 3)
+    return {"p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99), "max_ms": round(walls[-1], 3),
+            "mean_ms": round(statistics.fmean(walls), 3)}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="retail-bench-customer-search")
+    parser.add_argument("--customers", type=int, default=500_000)
+    parser.add_argument("--queries", type=int, default=500, help="queries per kind")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--updates", type=int, default=1000, help="rows changed before the delta refresh")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    opts = build_parser().parse_args(argv)
+    rng = random.Random(11)
+    fake = FakeSupabase(latency_ms=opts.latency_ms, seed=1)
+    seed_customers(fake, opts.customers, rng)
+    report = {"config": {k: v for k, v in vars(opts).items() if k != "output"}, "search": {}}
+    with override_client(fake):
+        fake.reset_counters()
+        t0 = time.perf_counter()
+        customer_index.load()
+        report["load"] = {"rows": len(customer_index), "round_trips": fake.round_trips,
+                          "wall_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+                          "memory_mib": round(customer_index.memory_bytes() / 2**20, 1)}
+
+        for kind, make in query_mix(opts.customers, rng).items():
+            queries = [make() for _ in range(opts.queries)]
+            walls, hits = [], 0
+            for q in queries:
+                t0 = time.perf_counter()
+                hits += bool(customer_index.search(q, opts.limit))
+                walls.append((time.perf_counter() - t0) * 1000.0)
+            report["search"][kind] = dict(_percentiles(walls), hit_rate=round(hits / len(queries), 3),
+                                          example=queries[0])
+
+        # A second page costs about as much as the first plus the skipped matches
+        walls = []
+        for q in ("sa", "sharma", "9876"):
+            t0 = time.perf_counter()
+            customer_index.search(q, opts.limit, offset=5 * opts.limit)
+            walls.append((time.perf_counter() - t0) * 1000.0)
+        report["search"]["sixth_page"] = _percentiles(walls)
+
+        fake.reset_counters()
+        t0 = time.perf_counter()
+        customer_dao.find_customers("sharma", opts.limit)
+        report["find_customers"] = {"round_trips": fake.round_trips,
+                                    "wall_ms": round((time.perf_counter() - t0) * 1000.0, 3)}
+
+        changed = rng.sample(range(1, opts.customers + 1), min(opts.updates, opts.customers))
+        with fake.backend.transaction() as conn:
+            conn.executemany("UPDATE customers SET name = ? WHERE cust_id = ?",
+                             ((f"{rng.choice(FIRST).title()} {rng.choice(LAST).title()}", cid) for cid in changed))
+        fake.reset_counters()
+        t0 = time.perf_counter()
+        applied = customer_index.refresh()
+        report["refresh"] = {"rows_changed": len(changed), "rows_applied": applied, "round_trips": fake.round_trips,
+                             "wall_ms": round((time.perf_counter() - t0) * 1000.0, 1)}
+
+        walls = []
+        for cid in changed[:200]:
+            row = {"cust_id": cid, "name": f"{rng.choice(FIRST)} {rng.choice(LAST)}",
+                   "email": f"moved{cid}@example.com", "phone": "90000 00000"}
+            t0 = time.perf_counter()
+            customer_index.apply(row)
+            walls.append((time.perf_counter() - t0) * 1000.0)
+        report["apply_edit"] = _percentiles(walls)
+    fake.backend.close()
+
+    out = json.dumps(report, indent=2)
+    if opts.output:
+        with open(opts.output, "w") as f:
+            f.write(out)
+    else:
+        sys.stdout.write(out + "\n")
+    return report
+
+
+if __name__ == "__main__":
+    main()
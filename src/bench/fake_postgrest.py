@@ -0,0 +1,174 @@
+# src/bench/fake_postgrest.py
+"""
+In-process stand-in for the Supabase/PostgREST API used by the benchmarks.
+Queries are answered by the embedded SQLite backend; every execute() counts as
+one round trip and can be delayed to imitate network latency.
+
+Faults can be injected to exercise the resilience layer (src/resilience.py):
+random 503s before a request reaches the database (error_rate), lost responses
+after it was applied (lost_response_rate), a full outage for a while (outage())
+and scripted failures of specific requests (fail_next()).
+"""
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+
+from src.backends.sqlite_backend import APIError, SQLiteClient
+
+_BUILDER_OPS = ("select", "insert", "upsert", "update", "delete")
+
+
+class FakeSupabase:
+    def __init__(self, backend: SQLiteClient | None = None, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, seed: int | None = None, error_rate: float = 0.0,
+                 lost_response_rate: float = 0.0):
+        self.backend = backend or SQLiteClient(":memory:")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.lost_response_rate = lost_response_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.round_trips = 0
+        self.calls: Counter = Counter()
+        self.faults: Counter = Counter()
+        self._outage_until = 0.0
+        self._scripted: list = []
+
+    def table(self, name: str) -> "_CountingQuery":
+        return _CountingQuery(self, self.backend.table(name), name)
+
+    from_ = table
+
+    def rpc(self, fn: str, params: Dict | None = None) -> "_CountingQuery":
+        return _CountingQuery(self, self.backend.rpc(fn, params), "rpc", fn)
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.round_trips = 0
+            self.calls.clear()
+            self.faults.clear()
+
+    def outage(self, seconds: float) -> None:
+        """
+        Fail every request with a 503 for the next `seconds`.
+        """
+        with self._lock:
+            self._outage_until = time.monotonic() + seconds
+
+    def fail_next(self, table: str, op: str, times: int = 1, applied: bool = False) -> None:
+        """
+        Fail the next `times` requests for `table`.`op` (table "rpc" and the function name for rpc calls). With
+        applied=True the request takes effect and only its response is lost.
+        """
+        with self._lock:
+            self._scripted.append([table, op, applied, times])
+
+    def _fault(self, table: str, op: str, applied: bool) -> None:
+        if not (self._scripted or self._outage_until or self.error_rate or self.lost_response_rate):
+            return
+        with self._lock:
+            for entry in self._scripted:
+                if entry[:3] == [table, op, applied]:
+                    entry[3] -= 1
+                    if not entry[3]:
+                        self._scripted.remove(entry)
+                    kind = "scripted"
+                    break
+            else:
+                if not applied and time.monotonic() < self._outage_until:
+                    kind = "outage"
+                elif self._rng.random() < (self.lost_response_rate if applied else self.error_rate):
+                    kind = "lost_response" if applied else "error"
+                else:
+                    return
+            self.faults[kind] += 1
+        raise APIError(f"Service unavailable (injected {kind} on {table}.{op})", code="503")
+
+    def _round_trip(self, table: str, op: str) -> None:
+        with self._lock:
+            self.round_trips += 1
+            self.calls[f"{table}.{op}"] += 1
+            delay = self.latency_ms + (self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+
+class _CountingQuery:
+    def __init__(self, fake: FakeSupabase, inner, table: str, op: str = "select"):
+        self._fake = fake
+        self._inner = inner
+        self._table = table
+        self._op = op
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if name in _BUILDER_OPS:
+                self._op = name
+            return self if result is self._inner else result
+        return call
+
+    def execute(self):
+        self._fake._round_trip(self._table, self._op)
+        self._fake._fault(self._table, self._op, applied=False)
+        resp = self._inner.execute()
+        self._fake._fault(self._table, self._op, applied=True)
+        return resp
+
+
+def seed(fake: FakeSupabase, products: int = 10_000, customers: int = 10_000, orders: int = 10_000,
+         items_per_order: int = 3, paid_ratio: float = 0.6, rng_seed: int = 42) -> Dict[str, int]:
+    """
+    Bulk-load synthetic rows straight into the backend (not counted as round trips).
+    """
+    rng = random.Random(rng_seed)
+    now = datetime.now(timezone.utc)
+    categories = ["grocery", "dairy", "bakery", "household", "beverages", "snacks", None]
+    cities = ["Hyderabad", "Pune", "Chennai", "Bengaluru", "Delhi", "Mumbai"]
+    batch = 50_000
+    with fake.backend.transaction() as conn:
+        for start in range(0, products, batch):
+            conn.executemany(
+                "INSERT INTO products (name, sku, price, stock, category) VALUES (?, ?, ?, ?, ?)",
+                ((f"Product {i}", f"SKU-{i:07d}", round(rng.uniform(1, 500), 2),
+                  rng.randint(0, 500), rng.choice(categories))
+                 for i in range(start, min(products, start + batch))))
+        for start in range(0, customers, batch):
+            conn.executemany(
+                "INSERT INTO customers (name, email, phone, city) VALUES (?, ?, ?, ?)",
+                ((f"Customer {i}", f"customer{i}@example.com", f"9{i:09d}", rng.choice(cities))
+                 for i in range(start, min(customers, start + batch))))
+        prices = {}
+        for start in range(0, orders, batch):
+            order_rows, item_rows, payment_rows = [], [], []
+            for order_id in range(start + 1, min(orders, start + batch) + 1):
+                placed = now - timedelta(days=rng.uniform(0, 90))
+                lines = []
+                for _ in range(items_per_order):
+                    pid = rng.randint(1, max(1, products))
+                    price = prices.setdefault(pid, round(rng.uniform(1, 500), 2))
+                    lines.append((order_id, pid, rng.randint(1, 5), price))
+                total = round(sum(q * p for _, _, q, p in lines), 2)
+                paid = rng.random() < paid_ratio
+                order_rows.append((order_id, rng.randint(1, max(1, customers)), placed.isoformat(),
+                                   "COMPLETED" if paid else "PLACED", total))
+                item_rows.extend(lines)
+                payment_rows.append((order_id, total, rng.choice(["Cash", "Card", "UPI"]) if paid else None,
+                                     (placed + timedelta(minutes=5)).isoformat() if paid else None,
+                                     "PAID" if paid else "PENDING"))
+            conn.executemany("INSERT INTO orders (order_id, cust_id, order_date, status, total_amount) "
+                             "VALUES (?, ?, ?, ?, ?)", order_rows)
+            conn.executemany("INSERT INTO order_items (order_id, prod_id, quantity, price) "
+                             "VALUES (?, ?, ?, ?)", item_rows)
+            conn.executemany("INSERT INTO payments (order_id, amount, method, paid_at, status) "
+                             "VALUES (?, ?, ?, ?, ?)", payment_rows)
+    return {"products": products, "customers": customers, "orders": orders,
+            "order_items": orders * items_per_order}
@@ -0,0 +1,180 @@
+# src/bench/resilience.py
+"""
+Exercise the resilience layer (src/resilience.py) against the fault-injecting
+PostgREST stand-in.
+
+    python -m src.bench.resilience --threads 32 --latency-ms 20
+
+Scenarios, each run with the layer's feature on and off:
+  coalescing  many threads reading the same few products at once: backend round trips
+  retries     reads under random 503s: errors the callers see
+  breaker     a backend outage: requests still sent while it lasts, time to recover
+  orders      order placement under write faults: half-written orders left behind
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config import override_client
+from src.bench.fake_postgrest import FakeSupabase, seed
+from src.dao import product_dao
+from src.resilience import resilience
+from src.services import order_service
+
+
+def _hammer(threads: int, calls: int, fn) -> dict:
+    errors = 0
+
+    def worker(i):
+        nonlocal errors
+        try:
+            fn(i)
+        except Exception:
+            errors += 1
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(calls)))
+    return {"calls": calls, "errors": errors, "wall_ms": round((time.perf_counter() - t0) * 1000.0, 1)}
+
+
+def coalescing(fake: FakeSupabase, opts) -> dict:
+    report = {}
+    for on in (False, True):
+        resilience.coalesce = on
+        fake.reset_counters()
+        result = _hammer(opts.threads, opts.calls,
+                         lambda i: product_dao.get_product_by_id(1 + i % opts.hot_products, fresh=True))
+        report["on" if on else "off"] = dict(result, round_trips=fake.round_trips)
+    resilience.coalesce = True
+    return report
+
+
+def retries(fake: FakeSupabase, opts) -> dict:
+    report = {}
+    fake.error_rate = opts.error_rate
+    for attempts in (1, resilience.attempts):
+        saved, resilience.attempts = resilience.attempts, attempts
+        resilience.reset()
+        fake.reset_counters()
+        result = _hammer(opts.threads, opts.calls,
+                         lambda i: product_dao.get_product_by_id(1 + i % opts.products, fresh=True))
+        report[f"attempts_{attempts}"] = dict(result, round_trips=fake.round_trips,
+                                              injected=sum(fake.faults.values()), **_counters())
+        resilience.attempts = saved
+    fake.error_rate = 0.0
+    return report
+
+
+def breaker(fake: FakeSupabase, opts) -> dict:
+    report = {}
+    saved = resilience.breaker.failures
+    for on in (False, True):
+        resilience.breaker.failures = saved if on else 10 ** 9
+        resilience.breaker.reset_seconds = opts.outage_s / 2
+        resilience.reset()
+        fake.reset_counters()
+        fake.outage(opts.outage_s)
+        t0 = time.monotonic()
+        stop = t0 + opts.outage_s * 2
+        recovered_at = sent_during_outage = None
+
+        def worker(i):
+            nonlocal recovered_at, sent_during_outage
+            while time.monotonic() < stop:
+                if sent_during_outage is None and time.monotonic() - t0 >= opts.outage_s:
+                    sent_during_outage = fake.round_trips
+                try:
+                    product_dao.get_product_by_id(1 + i % opts.products, fresh=True)
+                    if recovered_at is None and time.monotonic() - t0 >= opts.outage_s:
+                        recovered_at = time.monotonic() - t0
+                except Exception:
+                    pass
+                time.sleep(0.005)
+        with ThreadPoolExecutor(max_workers=opts.threads) as pool:
+            list(pool.map(worker, range(opts.threads)))
+        report["on" if on else "off"] = {
+            "requests_sent_during_outage": sent_during_outage,
+            "outage_s": opts.outage_s,
+            "first_success_after_s": round(recovered_at, 2) if recovered_at else None,
+            **_counters(),
+        }
+    resilience.breaker.failures = saved
+    resilience.breaker.reset_seconds = opts.outage_s
+    return report
+
+
+def orders(fake: FakeSupabase, opts) -> dict:
+    """
+    Place orders while writes fail at random, then look for orders missing items or a payment.
+    """
+    rng = random.Random(3)
+    fake.error_rate = opts.error_rate
+    resilience.reset()
+    fake.reset_counters()
+    placed = failed = 0
+    for _ in range(opts.orders):
+        basket = [{"prod_id": pid, "quantity": 1} for pid in rng.sample(range(1, opts.products + 1), 3)]
+        try:
+            order_service.create_order(rng.randint(1, opts.customers), basket)
+            placed += 1
+        except Exception:
+            failed += 1
+    fake.error_rate = 0.0
+    with fake.backend.transaction() as conn:
+        orphans = conn.execute(
+            "SELECT COUNT(*) FROM orders o WHERE NOT EXISTS (SELECT 1 FROM order_items i WHERE i.order_id = o.order_id)"
+            " OR NOT EXISTS (SELECT 1 FROM payments p WHERE p.order_id = o.order_id)").fetchone()[0]
+        written = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    return {"attempted": opts.orders, "placed": placed, "failed": failed, "orders_in_db": written,
+            "half_written_orders": orphans, "injected": dict(fake.faults), **_counters()}
+
+
+def _counters() -> dict:
+    stats = resilience.stats()
+    return {k: stats.get(k, 0) for k in ("retries", "retries_exhausted", "coalesced", "breaker_opened",
+                                         "breaker_rejected")}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="retail-bench-resilience")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--calls", type=int, default=2000, help="reads per coalescing/retry run")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--hot-products", type=int, default=5, help="distinct products read in the coalescing run")
+    parser.add_argument("--orders", type=int, default=300)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--outage-s", type=float, default=2.0)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    opts = build_parser().parse_args(argv)
+    fake = FakeSupabase(latency_ms=opts.latency_ms, seed=1)
+    seed(fake, products=opts.products, customers=opts.customers, orders=0)
+    with fake.backend.transaction() as conn:
+        conn.execute("UPDATE products SET stock = 1000000")
+    report = {"config": {k: v for k, v in vars(opts).items() if k != "output"}}
+    with override_client(fake):
+        report["coalescing"] = coalescing(fake, opts)
+        report["retries"] = retries(fake, opts)
+        report["breaker"] = breaker(fake, opts)
+        report["orders"] = orders(fake, opts)
+    fake.backend.close()
+
+    out = json.dumps(report, indent=2)
+    if opts.output:
+        with open(opts.output, "w") as f:
+            f.write(out)
+    else:
+        sys.stdout.write(out + "\n")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# src/bench/run.py
+"""
+Benchmark the DAO/service paths against the local PostgREST stand-in.
+
+    python -m src.bench.run --products 100000 --orders 200000 --latency-ms 20 --output bench.json
+
+Each operation reports round trips, wall time and peak Python memory as JSON.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from src.config import override_client
+from src.dao.cache import clear_caches
+from src.dao.catalog import catalog
+from src.dao import product_dao
+from src.bench.fake_postgrest import FakeSupabase, seed
+from src.services import order_service, product_service, report_service
+
+
+def _basket(rng: random.Random, products: int, size: int) -> List[Dict]:
+    ids = rng.sample(range(1, products + 1), min(size, products))
+    return [{"prod_id": pid, "quantity": 1} for pid in ids]
+
+
+def build_operations(fake: FakeSupabase, opts) -> Dict[str, tuple]:
+    """
+    name -> (setup() -> args, run(*args)). Setup work is not measured.
+    """
+    rng = random.Random(7)
+
+    def restock_all():
+        with fake.backend.transaction() as conn:
+            conn.execute("UPDATE products SET stock = stock + 1000")
+
+    def new_order(size):
+        restock_all()
+        cust = rng.randint(1, opts.customers)
+        return (cust, _basket(rng, opts.products, size))
+
+    def placed_order(size=None):
+        cust, items = new_order(size or opts.basket)
+        return (order_service.create_order(cust, items)["order"]["order_id"],)
+
+    def any_order():
+        return (rng.randint(1, opts.orders),)
+
+    def empty_catalog():
+        catalog.clear()
+        return ()
+
+    def loaded_catalog():
+        if not catalog.loaded:
+            catalog.load()
+        return ()
+
+    def price_ids():
+        loaded_catalog()
+        return (rng.sample(range(1, opts.products + 1), min(opts.large_basket, opts.products)),)
+
+    return {
+        "create_order": (lambda: new_order(opts.basket), order_service.create_order),
+        "create_order_large": (lambda: new_order(opts.large_basket), order_service.create_order),
+        "get_order_details": (any_order, order_service.get_order_details),
+        "get_order_details_large": (lambda: placed_order(opts.large_basket), order_service.get_order_details),
+        "cancel_order": (placed_order, order_service.cancel_order),
+        "get_low_stock": (lambda: (), product_service.get_low_stock),
+        # Memory: compact snapshot vs the same catalog as one dict per row
+        "catalog_load": (empty_catalog, catalog.load),
+        "catalog_as_dicts": (lambda: (), lambda: list(product_dao.scan_products())),
+        "catalog_low_stock": (loaded_catalog, lambda: catalog.low_stock(5)),
+        "catalog_prices": (price_ids, catalog.prices_for),
+        "report_top5": (lambda: (), report_service.top_5_selling_products),
+        "report_revenue": (lambda: (), report_service.total_revenue_last_month),
+        "report_orders_by_customer": (lambda: (), report_service.total_orders_by_customer),
+        "report_big_customers": (lambda: (), report_service.customers_with_more_than_2_orders),
+    }
+
+
+def measure(fake: FakeSupabase, setup: Callable, run: Callable, repeat: int, warm: bool) -> Dict:
+    walls, trips, peaks, calls = [], [], [], {}
+    for _ in range(repeat):
+        args = setup()
+        if not warm:
+            clear_caches()
+        fake.reset_counters()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        run(*args)
+        walls.append((time.perf_counter() - t0) * 1000.0)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        trips.append(fake.round_trips)
+        calls = dict(fake.calls)
+    return {
+        "round_trips": max(trips),
+        "wall_ms_median": round(statistics.median(walls), 3),
+        "wall_ms_min": round(min(walls), 3),
+        "wall_ms_max": round(max(walls), 3),
+        "peak_kib": round(max(peaks) / 1024.0, 1),
+        "calls": calls,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="retail-bench")
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--customers", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--items-per-order", type=int, default=3)
+    parser.add_argument("--basket", type=int, default=5, help="lines per order for create_order")
+    parser.add_argument("--large-basket", type=int, default=50, help="lines for create_order_large")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="injected per round trip")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warm", action="store_true", help="keep DAO caches between runs")
+    parser.add_argument("--ops", nargs="*", help="subset of operations to run")
+    parser.add_argument("--db", default=":memory:", help="SQLite file for the stand-in")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    opts = build_parser().parse_args(argv)
+    from src.backends.sqlite_backend import SQLiteClient
+    fake = FakeSupabase(SQLiteClient(opts.db), latency_ms=opts.latency_ms,
+                        jitter_ms=opts.jitter_ms, seed=1)
+    t0 = time.perf_counter()
+    seeded = seed(fake, opts.products, opts.customers, opts.orders, opts.items_per_order)
+    report = {
+        "config": {k: v for k, v in vars(opts).items() if k != "output"},
+        "seeded": seeded,
+        "seed_seconds": round(time.perf_counter() - t0, 2),
+        "results": {},
+    }
+    operations = build_operations(fake, opts)
+    with override_client(fake):
+        for name, (setup, run) in operations.items():
+            if opts.ops and name not in opts.ops:
+                continue
+            report["results"][name] = measure(fake, setup, run, opts.repeat, opts.warm)
+        if catalog.loaded:
+            report["catalog_snapshot"] = {"rows": len(catalog), "kib": round(catalog.memory_bytes() / 1024.0, 1)}
+    out = json.dumps(report, indent=2)
+    if opts.output:
+        with open(opts.output, "w") as f:
+            f.write(out)
+    else:
+        sys.stdout.write(out + "\n")
+    fake.backend.close()
+    return report
+
+
+if __name__ == "__main__":
+    main()
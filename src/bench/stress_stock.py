@@ -0,0 +1,108 @@
+# src/bench/stress_stock.py
+"""
+Concurrency stress test for stock reservation against the local PostgREST stand-in.
+
+    python -m src.bench.stress_stock --threads 64 --orders 2000 --products 5 --stock 300
+
+Many threads place multi-line orders (and some restocks and cancellations) on a
+few hot products. Afterwards every product must satisfy
+    initial + restocked == stock + units in non-cancelled orders, and stock >= 0;
+any violation (oversell or lost update) exits non-zero. tests/test_stock_concurrency.py
+runs the same check at a small scale.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config import override_client
+from src.bench.fake_postgrest import FakeSupabase, seed
+from src.services import order_service, product_service
+
+
+def run(opts) -> dict:
+    fake = FakeSupabase(latency_ms=opts.latency_ms, jitter_ms=opts.jitter_ms, seed=3)
+    seed(fake, products=opts.products, customers=50, orders=0)
+    with fake.backend.transaction() as conn:
+        conn.execute("UPDATE products SET stock = ?", (opts.stock,))
+
+    restocked = {pid: 0 for pid in range(1, opts.products + 1)}
+    lock = threading.Lock()
+    outcome = {"placed": 0, "rejected": 0, "cancelled": 0, "restocks": 0, "errors": 0}
+
+    def worker(i: int):
+        rng = random.Random(i)
+        try:
+            roll = rng.random()
+            if roll < opts.restock_ratio:
+                pid, delta = rng.randint(1, opts.products), rng.randint(1, 5)
+                product_service.restock_product(pid, delta)
+                with lock:
+                    restocked[pid] += delta
+                    outcome["restocks"] += 1
+                return
+            lines = rng.randint(1, min(3, opts.products))
+            items = [{"prod_id": pid, "quantity": rng.randint(1, 4)}
+                     for pid in rng.sample(range(1, opts.products + 1), lines)]
+            try:
+                order = order_service.create_order(rng.randint(1, 50), items)
+            except ValueError:
+                with lock:
+                    outcome["rejected"] += 1
+                return
+            with lock:
+                outcome["placed"] += 1
+            if roll > 1 - opts.cancel_ratio:
+                order_service.cancel_order(order["order"]["order_id"])
+                with lock:
+                    outcome["cancelled"] += 1
+        except Exception:
+            with lock:
+                outcome["errors"] += 1
+
+    t0 = time.perf_counter()
+    with override_client(fake), ThreadPoolExecutor(max_workers=opts.threads) as pool:
+        list(pool.map(worker, range(opts.orders)))
+    elapsed = time.perf_counter() - t0
+
+    with fake.backend.transaction() as conn:
+        stock = dict(conn.execute("SELECT prod_id, stock FROM products").fetchall())
+        sold = dict(conn.execute(
+            "SELECT oi.prod_id, SUM(oi.quantity) FROM order_items oi "
+            "JOIN orders o ON o.order_id = oi.order_id WHERE o.status != 'CANCELLED' "
+            "GROUP BY oi.prod_id").fetchall())
+    violations = []
+    for pid in restocked:
+        expected = opts.stock + restocked[pid]
+        actual = stock[pid] + (sold.get(pid) or 0)
+        if stock[pid] < 0 or expected != actual:
+            violations.append({"prod_id": pid, "stock": stock[pid], "sold": sold.get(pid) or 0,
+                               "restocked": restocked[pid], "initial": opts.stock})
+    return {"outcome": outcome, "seconds": round(elapsed, 2), "violations": violations}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="retail-stress-stock")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--orders", type=int, default=1000, help="number of worker tasks")
+    parser.add_argument("--products", type=int, default=5, help="hot products shared by all orders")
+    parser.add_argument("--stock", type=int, default=200, help="initial stock per product")
+    parser.add_argument("--restock-ratio", type=float, default=0.1)
+    parser.add_argument("--cancel-ratio", type=float, default=0.1)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--jitter-ms", type=float, default=2.0)
+    return parser
+
+
+def main(argv=None):
+    opts = build_parser().parse_args(argv)
+    result = run(opts)
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["violations"] or result["outcome"]["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,30 @@
 import argparse
+import io
 import json
-from src.services import product_service, order_service, report_service
+import os
+import shlex
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from src.services import product_service, order_service, report_service, report_aggregates, import_service, export_service, low_stock, analytics
 from src.dao import product_dao, customer_dao
+from src.dao.cache import cache_stats
+from src.config import get_client_manager, shutdown_supabase
+from src.instrumentation import profiler
+from src.resilience import resilience
+
+def _print_stream(rows):
+    """
+    Print an iterable of rows as a JSON array, one element at a time.
+    """
+    first = True
+    sys.stdout.write("[")
+    for row in rows:
+        item = json.dumps(row, indent=2, default=str).replace("\n", "\n  ")
+        sys.stdout.write(("\n  " if first else ",\n  ") + item)
+        first = False
+    sys.stdout.write("\n]\n" if not first else "]\n")
 
 def cmd_product_add(args):
     try:
@@ -10,11 +33,77 @@ def cmd_product_add(args):
         print(json.dumps(p, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
+        return 1
 
 def cmd_product_list(args):
+    if args.all:
+        _print_stream(product_dao.scan_products(page_size=args.page_size, prefetch=True))
+        return
     ps = product_dao.list_products(limit=100)
     print(json.dumps(ps, indent=2, default=str))
 
+def cmd_product_low_stock(args):
+    if args.watch:
+        def emit(event):
+            print(json.dumps(event, default=str), flush=True)
+        try:
+            low_stock.watch(emit, interval=args.interval, default=args.threshold)
+        except KeyboardInterrupt:
+            pass
+        return
+    _print_stream(low_stock.low_stock(args.threshold, page_size=args.page_size))
+
+def cmd_product_threshold_set(args):
+    try:
+        t = product_dao.set_reorder_threshold(args.level, category=args.category, sku=args.sku)
+        print("Reorder threshold set:")
+        print(json.dumps(t, indent=2, default=str))
+    except Exception as e:
+        print("Error:", e)
+        return 1
+
+def cmd_product_threshold_clear(args):
+    try:
+        t = product_dao.clear_reorder_threshold(category=args.category, sku=args.sku)
+    except Exception as e:
+        print("Error:", e)
+        return 1
+    if not t:
+        print("Error: No such reorder threshold.")
+        return 1
+    print("Reorder threshold removed:")
+    print(json.dumps(t, indent=2, default=str))
+
+def cmd_product_threshold_list(args):
+    print(json.dumps(product_dao.list_reorder_thresholds(), indent=2, default=str))
+
+def _run_import(import_fn, args):
+    errors_out = open(args.errors, "a") if args.errors else None
+
+    def on_error(err):
+        line = json.dumps(err, default=str)
+        if errors_out:
+            errors_out.write(line + "\n")
+        else:
+            print("Row error:", line, file=sys.stderr)
+    try:
+        summary = import_fn(args.file, fmt=args.format, batch_size=args.batch_size,
+                            checkpoint=args.checkpoint, on_error=on_error)
+    except Exception as e:
+        print("Error:", e)
+        return 1
+    finally:
+        if errors_out:
+            errors_out.close()
+    print("Import finished:")
+    print(json.dumps(summary, indent=2))
+
+def cmd_product_import(args):
+    return _run_import(import_service.import_products, args)
+
+def cmd_customer_import(args):
+    return _run_import(import_service.import_customers, args)
+
 def cmd_customer_add(args):
     try:
         c = customer_dao.create_customer(args.name, args.email, args.phone, args.city)
@@ -22,39 +111,56 @@ def cmd_customer_add(args):
         print(json.dumps(c, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
+        return 1
 
 def cmd_customer_update(args):
     if not args.phone and not args.city:
         print("Error: At least one of --phone or --city must be provided.")
-        return
+        return 1
     customer = customer_dao.get_customer_by_email(args.email)
     if not customer:
         print(f"Error: No customer found with email '{args.email}'.")
-        return
+        return 1
     try:
         updated = customer_dao.update_customer(customer["cust_id"], args.phone, args.city)
         print("Updated customer:")
         print(json.dumps(updated, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
+        return 1
 
 def cmd_customer_delete(args):
     customer = customer_dao.get_customer_by_email(args.email)
     if not customer:
         print(f"Error: No customer found with email '{args.email}'.")
-        return
+        return 1
     try:
         deleted = customer_dao.delete_customer(customer["cust_id"])
         print("Deleted customer:")
         print(json.dumps(deleted, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
+        return 1
 
 def cmd_customer_list(args):
+    if args.all:
+        _print_stream(customer_dao.scan_customers(page_size=args.page_size, prefetch=True))
+        return
     results = customer_dao.list_customers(limit=100)
     print(json.dumps(results, indent=2, default=str))
 
 def cmd_customer_search(args):
+    if args.query is not None:
+        if args.email or args.city or args.all:
+            print("Error: --query can't be combined with --email, --city or --all.")
+            return 1
+        results = customer_dao.find_customers(args.query, limit=args.limit, offset=args.offset)
+        print(json.dumps(results, indent=2, default=str))
+        return
+    if args.all:
+        _print_stream(customer_dao.scan_customers(email=args.email, city=args.city,
+                                                  page_size=args.page_size, prefetch=True))
+        return
     results = customer_dao.search_customers(email=args.email, city=args.city)
     print(json.dumps(results, indent=2, default=str))
 
@@ -66,13 +172,14 @@ def cmd_order_create(args):
             items.append({"prod_id": int(pid), "quantity": int(qty)})
         except Exception:
             print("Invalid item format:", item)
-            return
+            return 1
     try:
         ord = order_service.create_order(args.customer, items)
         print("Order created:")
         print(json.dumps(ord, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
+        return 1
 
 def cmd_order_show(args):
     try:
@@ -80,6 +187,7 @@ def cmd_order_show(args):
         print(json.dumps(o, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
+        return 1
 
 def cmd_order_cancel(args):
     try:
@@ -88,6 +196,7 @@ def cmd_order_cancel(args):
         print(json.dumps(o, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
+        return 1
 def cmd_order_list(args):
     orders = order_service.get_orders_by_customer(args.customer)
     print(json.dumps(orders, indent=2, default=str))
@@ -99,6 +208,7 @@ def cmd_order_complete(args):
         print(json.dumps(o, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
+        return 1
 
 def cmd_order_pay(args):
     try:
@@ -107,25 +217,264 @@ def cmd_order_pay(args):
         print(json.dumps(o, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
+        return 1
+
+def _read_order_batch(source: str) -> list:
+    f = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        text = f.read()
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def cmd_order_create_batch(args):
+    try:
+        batch = _read_order_batch(args.file)
+    except (OSError, ValueError) as e:
+        print("Error:", e)
+        return 1
+    failed = 0
+    for start in range(0, len(batch), args.chunk_size):
+        try:
+            results = order_service.create_orders(batch[start:start + args.chunk_size])
+        except Exception as e:
+            print("Error:", e)
+            return 1
+        for result in results:
+            result["index"] += start
+            failed += not result["ok"]
+            print(json.dumps(result, default=str))
+    print(f"{len(batch) - failed} order(s) placed, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
 
 def cmd_report_top5(args):
-    res = report_service.top_5_selling_products()
+    if args.names or args.limit != 5 or args.since or args.until:
+        res = report_service.top_selling_products(args.limit, args.since, args.until)
+    else:
+        res = report_service.top_5_selling_products()
     print(json.dumps(res, indent=2, default=str))
 
 def cmd_report_revenue(args):
-    res = report_service.total_revenue_last_month()
-    print("Total revenue in last month:", res)
+    custom_compare = args.compare_from or args.compare_to
+    if args.from_ or args.to or args.bucket or args.by or args.metric != "revenue" or args.compare or custom_compare:
+        # A missing end of the comparison range defaults like --from/--to (30 days up to --compare-to, or today)
+        compare = (args.compare_from, args.compare_to) if custom_compare else ("previous" if args.compare else None)
+        try:
+            res = analytics.breakdown(args.metric, args.from_, args.to, args.bucket or "day", args.by, compare)
+        except Exception as e:
+            print("Error:", e)
+            return 1
+        print(json.dumps(res, indent=2, default=str))
+        return
+    if args.days == 30:
+        res = report_service.total_revenue_last_month()
+        print("Total revenue in last month:", res)
+    else:
+        res = report_service.total_revenue_last_month(args.days)
+        print(f"Total revenue in last {args.days} days:", res)
 
 def cmd_report_orders_by_customer(args):
-    res = report_service.total_orders_by_customer()
+    res = report_service.total_orders_by_customer(args.since, args.until)
     print(json.dumps(res, indent=2, default=str))
 
 def cmd_report_big_customers(args):
-    res = report_service.customers_with_more_than_2_orders()
+    res = report_service.customers_with_more_than(args.more_than, args.since, args.until)
     print(json.dumps(res, indent=2, default=str))
 
-def build_parser():
-    parser = argparse.ArgumentParser(prog="retail-cli")
+def cmd_report_rebuild(args):
+    report_aggregates.rebuild()
+    print("Report aggregates rebuilt.")
+
+def cmd_report_verify(args):
+    diffs = report_aggregates.verify()
+    if diffs:
+        print(f"{len(diffs)} aggregate(s) differ from a full recomputation:")
+        print(json.dumps(diffs, indent=2, default=str))
+        return 1
+    else:
+        print("Report aggregates match a full recomputation.")
+
+def cmd_export(args):
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        n = export_service.export(args.table, out, fmt=args.format, joined=args.joined, since=args.since,
+                                  until=args.until, status=args.status, page_size=args.page_size)
+    except BrokenPipeError:
+        # Reader went away (e.g. `| head`); stop quietly instead of failing on the final flush.
+        # Under batch, sys.stdout is the shared per-thread proxy and must stay in place.
+        if not isinstance(sys.stdout, _ThreadLocalStdout):
+            sys.stdout = open(os.devnull, "w")
+        return
+    except Exception as e:
+        print("Error:", e, file=sys.stderr)
+        return 1
+    finally:
+        if args.output:
+            out.close()
+    print(f"Exported {n} rows", file=sys.stderr)
+
+class _ThreadLocalStdout(io.TextIOBase):
+    """
+    Stand-in for sys.stdout while a batch runs: each worker thread's prints go to its
+    own buffer (so commands running in parallel don't interleave), everything else
+    goes to the real stdout.
+    """
+    def __init__(self, real):
+        self._real = real
+        self._local = threading.local()
+
+    def capture(self) -> io.StringIO:
+        self._local.buf = io.StringIO()
+        return self._local.buf
+
+    def release(self) -> None:
+        self._local.buf = None
+
+    def write(self, text: str) -> int:
+        buf = getattr(self._local, "buf", None)
+        return (buf or self._real).write(text)
+
+    def flush(self) -> None:
+        if getattr(self._local, "buf", None) is None:
+            self._real.flush()
+
+class _UsageError(Exception):
+    pass
+
+class _BatchArgumentParser(argparse.ArgumentParser):
+    # Usage errors become the command's result instead of exiting the whole batch
+    def error(self, message):
+        raise _UsageError(f"{self.prog}: {message}")
+
+def _read_commands(source: str):
+    """
+    Yield (line_no, command) for every non-blank, non-comment line of `source` ("-" = stdin).
+    """
+    f = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line_no, line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def _run_batch_command(parser, stdout: _ThreadLocalStdout, line_no: int, command: str) -> dict:
+    buf = stdout.capture()
+    status = 0
+    try:
+        argv = shlex.split(command)
+        if argv and argv[0] == "batch":
+            raise ValueError("batch cannot be nested")
+        args = parser.parse_args(argv)
+        for action in parser._actions:
+            # Global options (--profile, --cache-stats, ...) apply to the whole batch process
+            if action.option_strings and action.dest != "help" and getattr(args, action.dest) != action.default:
+                raise _UsageError(f"{'/'.join(action.option_strings)} is a global option; "
+                                  "pass it to batch itself, not on a batch line")
+        if not hasattr(args, "func"):
+            raise ValueError("incomplete command")
+        status = args.func(args) or 0
+    except SystemExit as e:
+        # --help
+        status = e.code if isinstance(e.code, int) else 0
+    except _UsageError as e:
+        print("Error:", e)
+        status = 2
+    except Exception as e:
+        print("Error:", e)
+        status = 1
+    finally:
+        stdout.release()
+    return {"line": line_no, "command": command, "status": status, "output": buf.getvalue().rstrip("\n")}
+
+def _run_batch_parallel(parser, stdout: _ThreadLocalStdout, commands, jobs: int, stop_on_error: bool):
+    """
+    Yield batch results in input order, running up to `jobs` commands at once. Commands are
+    submitted as earlier ones finish, so after a failure (with stop_on_error) later commands
+    are never started; only those already running complete.
+    """
+    stop = threading.Event()
+
+    def run(line_no, command):
+        if stop.is_set():
+            return None
+        result = _run_batch_command(parser, stdout, line_no, command)
+        if result["status"] != 0 and stop_on_error:
+            stop.set()
+        return result
+
+    pool = ThreadPoolExecutor(max_workers=jobs)
+    pending = deque()
+    try:
+        for c in commands:
+            if len(pending) >= jobs * 2:
+                result = pending.popleft().result()
+                if result is not None:
+                    yield result
+            if stop.is_set():
+                break
+            pending.append(pool.submit(run, *c))
+        while pending:
+            result = pending.popleft().result()
+            if result is not None:
+                yield result
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+def cmd_batch(args):
+    """
+    Run commands (same syntax as the subcommands, one per line) in this process so they
+    share one client and the entity caches. Prints one JSON result per command, in input
+    order; with --jobs > 1 commands run concurrently, so only batch independent commands.
+    """
+    parser = build_parser(_BatchArgumentParser)
+    real_stdout = sys.stdout
+    stdout = sys.stdout = _ThreadLocalStdout(real_stdout)
+    failed = total = 0
+    try:
+        commands = _read_commands(args.file)
+        if args.jobs > 1:
+            results = _run_batch_parallel(parser, stdout, commands, args.jobs, args.stop_on_error)
+        else:
+            results = (_run_batch_command(parser, stdout, *c) for c in commands)
+        try:
+            for result in results:
+                total += 1
+                failed += result["status"] != 0
+                real_stdout.write(json.dumps(result, default=str) + "\n")
+                if result["status"] != 0 and args.stop_on_error:
+                    break
+        finally:
+            results.close()
+    except OSError as e:
+        print("Error:", e, file=sys.stderr)
+        return 1
+    finally:
+        sys.stdout = real_stdout
+    print(f"{total} command(s), {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+def _add_import_args(p):
+    p.add_argument("file")
+    p.add_argument("--format", choices=["csv", "jsonl"], default=None, help="default: from file extension")
+    p.add_argument("--batch-size", type=int, default=None)
+    p.add_argument("--checkpoint", default=None, help="resume file; created/updated after every batch")
+    p.add_argument("--errors", default=None, help="append per-row errors here as JSON lines")
+
+def build_parser(parser_class=argparse.ArgumentParser):
+    parser = parser_class(prog="retail-cli")
+    parser.add_argument("--profile", action="store_true", help="print a per-query timing breakdown")
+    parser.add_argument("--profile-json", metavar="PATH", help="also write profile records as JSON")
+    parser.add_argument("--profile-trace", metavar="PATH", help="also write a Chrome trace-event file")
+    parser.add_argument("--resilience-stats", action="store_true",
+                        help="print retry, coalescing and circuit breaker counters")
+    parser.add_argument("--cache-stats", action="store_true", help="print product/customer cache hit rates")
+    parser.add_argument("--pool-stats", action="store_true", help="print supabase client reuse counters")
     sub = parser.add_subparsers(dest="cmd")
 
     # product add/list
@@ -139,9 +488,35 @@ def build_parser():
     addp.add_argument("--category", default=None)
     addp.set_defaults(func=cmd_product_add)
 
+    importp = pprod_sub.add_parser("import", help="bulk import products from CSV/JSONL")
+    _add_import_args(importp)
+    importp.set_defaults(func=cmd_product_import)
+
     listp = pprod_sub.add_parser("list")
+    listp.add_argument("--all", action="store_true", help="stream every product, page by page")
+    listp.add_argument("--page-size", type=int, default=None)
     listp.set_defaults(func=cmd_product_list)
 
+    lowp = pprod_sub.add_parser("low-stock", help="products at or below their reorder level")
+    lowp.add_argument("--threshold", type=int, default=None,
+                      help="one level for every product (default: per-sku/category thresholds)")
+    lowp.add_argument("--page-size", type=int, default=None)
+    lowp.add_argument("--watch", action="store_true", help="keep running and print low/recovered events")
+    lowp.add_argument("--interval", type=float, default=10.0, help="seconds between watch passes")
+    lowp.set_defaults(func=cmd_product_low_stock)
+
+    thresholdp = pprod_sub.add_parser("threshold", help="manage reorder thresholds")
+    threshold_sub = thresholdp.add_subparsers(dest="threshold_action")
+    for name, func in (("set", cmd_product_threshold_set), ("clear", cmd_product_threshold_clear)):
+        tp = threshold_sub.add_parser(name)
+        scope = tp.add_mutually_exclusive_group(required=True)
+        scope.add_argument("--category")
+        scope.add_argument("--sku")
+        if name == "set":
+            tp.add_argument("--level", type=int, required=True)
+        tp.set_defaults(func=func)
+    threshold_sub.add_parser("list").set_defaults(func=cmd_product_threshold_list)
+
     # customer commands
     pcust = sub.add_parser("customer", help="customer commands")
     pcust_sub = pcust.add_subparsers(dest="action")
@@ -153,6 +528,10 @@ def build_parser():
     addc.add_argument("--city", default=None)
     addc.set_defaults(func=cmd_customer_add)
 
+    importc = pcust_sub.add_parser("import", help="bulk import customers from CSV/JSONL")
+    _add_import_args(importc)
+    importc.set_defaults(func=cmd_customer_import)
+
     updatec = pcust_sub.add_parser("update")
     updatec.add_argument("--email", required=True)
     updatec.add_argument("--phone", required=False)
@@ -164,11 +543,19 @@ def build_parser():
     delc.set_defaults(func=cmd_customer_delete)
 
     listc = pcust_sub.add_parser("list")
+    listc.add_argument("--all", action="store_true", help="stream every customer, page by page")
+    listc.add_argument("--page-size", type=int, default=None)
     listc.set_defaults(func=cmd_customer_list)
 
     searchc = pcust_sub.add_parser("search")
     searchc.add_argument("--email", required=False)
     searchc.add_argument("--city", required=False)
+    searchc.add_argument("--all", action="store_true", help="stream matches page by page")
+    searchc.add_argument("--page-size", type=int, default=None)
+    searchc.add_argument("--query", "-q", default=None,
+                         help="ranked type-ahead match on name, email prefix or phone fragment")
+    searchc.add_argument("--limit", type=int, default=20, help="matches per page with --query")
+    searchc.add_argument("--offset", type=int, default=0, help="matches to skip with --query")
     searchc.set_defaults(func=cmd_customer_search)
 
     # order
@@ -201,21 +588,67 @@ def build_parser():
     pay.add_argument("--method", required=True, choices=["Cash", "Card", "UPI"])
     pay.set_defaults(func=cmd_order_pay)
 
+    createb = porder_sub.add_parser("create-batch", help="place many orders from a JSON array or JSONL file")
+    createb.add_argument("file", help='entries like {"customer_id": 1, "items": [{"prod_id": 2, "quantity": 1}]}; - for stdin')
+    createb.add_argument("--chunk-size", type=int, default=200, help="orders placed per bulk write")
+    createb.set_defaults(func=cmd_order_create_batch)
+
     preport = sub.add_parser("report", help="reporting commands")
     preport_sub = preport.add_subparsers(dest="action")
 
     top5 = preport_sub.add_parser("top5")
+    top5.add_argument("--limit", type=int, default=5)
+    top5.add_argument("--since", default=None, help="order date lower bound (ISO date)")
+    top5.add_argument("--until", default=None, help="order date upper bound, exclusive (ISO date)")
+    top5.add_argument("--names", action="store_true", help="include product names")
     top5.set_defaults(func=cmd_report_top5)
 
     revenue = preport_sub.add_parser("revenue")
+    revenue.add_argument("--days", type=int, default=30)
+    revenue.add_argument("--from", dest="from_", default=None, help="range start (ISO date); enables the breakdown")
+    revenue.add_argument("--to", default=None, help="range end, exclusive (ISO date; default: tomorrow)")
+    revenue.add_argument("--bucket", choices=analytics.BUCKETS, default=None)
+    revenue.add_argument("--by", choices=analytics.DIMENSIONS, default=None)
+    revenue.add_argument("--metric", choices=analytics.METRICS, default="revenue")
+    revenue.add_argument("--compare", action="store_true", help="add the preceding period of the same length")
+    revenue.add_argument("--compare-from", default=None, help="compare against this range instead")
+    revenue.add_argument("--compare-to", default=None, help="end of the comparison range (exclusive)")
     revenue.set_defaults(func=cmd_report_revenue)
 
     orders = preport_sub.add_parser("orders_by_customer")
+    orders.add_argument("--since", default=None)
+    orders.add_argument("--until", default=None)
     orders.set_defaults(func=cmd_report_orders_by_customer)
 
     bigcust = preport_sub.add_parser("big_customers")
+    bigcust.add_argument("--more-than", type=int, default=2, help="minimum order count (exclusive)")
+    bigcust.add_argument("--since", default=None)
+    bigcust.add_argument("--until", default=None)
     bigcust.set_defaults(func=cmd_report_big_customers)
 
+    rebuild = preport_sub.add_parser("rebuild", help="recompute incremental report aggregates from scratch")
+    rebuild.set_defaults(func=cmd_report_rebuild)
+
+    verify = preport_sub.add_parser("verify", help="diff incremental aggregates against a recomputation")
+    verify.set_defaults(func=cmd_report_verify)
+
+    pexport = sub.add_parser("export", help="stream orders/order_items/payments as NDJSON or CSV")
+    pexport.add_argument("table", choices=list(export_service.EXPORT_TABLES))
+    pexport.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    pexport.add_argument("--joined", action="store_true", help="orders with their items and payments")
+    pexport.add_argument("--since", default=None, help="order date lower bound (ISO date)")
+    pexport.add_argument("--until", default=None, help="order date upper bound, exclusive (ISO date)")
+    pexport.add_argument("--status", default=None, help="order status, e.g. PLACED, COMPLETED, CANCELLED")
+    pexport.add_argument("--page-size", type=int, default=None)
+    pexport.add_argument("--output", "-o", default=None, help="file to write (default: stdout)")
+    pexport.set_defaults(func=cmd_export)
+
+    pbatch = sub.add_parser("batch", help="run many commands from a file or stdin in one process")
+    pbatch.add_argument("file", nargs="?", default="-", help="one command per line (default: stdin)")
+    pbatch.add_argument("--jobs", "-j", type=int, default=1, help="run up to N commands concurrently")
+    pbatch.add_argument("--stop-on-error", action="store_true")
+    pbatch.set_defaults(func=cmd_batch)
+
     return parser
 
 def main():
@@ -223,8 +656,29 @@ def main():
     args = parser.parse_args()
     if not hasattr(args, "func"):
         parser.print_help()
-        return
-    args.func(args)
+        return 0
+    profiling = args.profile or args.profile_json or args.profile_trace
+    if profiling:
+        profiler.enable()
+    try:
+        status = args.func(args)
+    finally:
+        if profiling:
+            profiler.disable()
+            print(profiler.format_summary(), file=sys.stderr)
+            if args.profile_json:
+                profiler.export_json(args.profile_json)
+            if args.profile_trace:
+                profiler.export_trace(args.profile_trace)
+        if args.resilience_stats:
+            print(json.dumps(resilience.stats()), file=sys.stderr)
+        if args.cache_stats:
+            print(json.dumps(cache_stats()), file=sys.stderr)
+        if args.pool_stats:
+            # Before shutdown_supabase() closes the clients
+            print(json.dumps(get_client_manager().stats()), file=sys.stderr)
+        shutdown_supabase()
+    return status or 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
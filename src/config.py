@@ -1,17 +1,236 @@
 # src/config.py
+import asyncio
 import os
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
-from supabase import create_client, Client
- 
+from src.instrumentation import instrument
+from src.resilience import resilient
+
+if TYPE_CHECKING:
+    from supabase import Client
+
 load_dotenv()  # loads .env from project root
- 
+
+# "supabase" (default) or "sqlite" for the embedded local engine
+RETAIL_BACKEND = os.getenv("RETAIL_BACKEND", "supabase").lower()
+RETAIL_SQLITE_PATH = os.getenv("RETAIL_SQLITE_PATH", "retail.db")
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
- 
-def get_supabase() -> Client:
+
+# HTTP connection pool settings for the shared clients
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "10"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+
+
+class ClientManager:
     """
-    Return a supabase client. Raises RuntimeError if config missing.
+    Hands out long-lived supabase clients, one per (thread, event loop).
+    Each client keeps its HTTP session (and keep-alive pool) between calls,
+    so queries don't pay TLS/connection setup every time.
     """
+
+    def __init__(self, url: str | None, key: str | None, pool_size: int = 10,
+                 timeout: float = 10.0, connect_timeout: float = 5.0,
+                 keepalive_expiry: float = 30.0):
+        self.url = url
+        self.key = key
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.keepalive_expiry = keepalive_expiry
+        self._lock = threading.Lock()
+        self._clients: dict[tuple, tuple] = {}  # key -> (client, http session or None)
+        self._closed = False
+        self.hits = 0
+        self.misses = 0
+
+    def _scope(self) -> tuple:
+        # Async code must not share a client with another event loop
+        try:
+            loop_id = id(asyncio.get_running_loop())
+        except RuntimeError:
+            loop_id = 0
+        return threading.get_ident(), loop_id
+
+    def _http_session(self):
+        import httpx
+        return httpx.Client(
+            limits=httpx.Limits(max_connections=self.pool_size,
+                                max_keepalive_connections=self.pool_size,
+                                keepalive_expiry=self.keepalive_expiry),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+        )
+
+    def _create(self) -> tuple:
+        # Imported lazily so SQLite-only nodes don't need the supabase package
+        from supabase import create_client
+        from supabase.lib.client_options import ClientOptions
+        opts = {"postgrest_client_timeout": self.timeout}
+        session = None
+        # Newer supabase releases accept a caller-owned httpx client; use it to size the pool
+        if "httpx_client" in getattr(ClientOptions, "__dataclass_fields__", {}):
+            session = self._http_session()
+            opts["httpx_client"] = session
+        client = create_client(self.url, self.key, options=ClientOptions(**opts))
+        return client, session
+
+    def get(self) -> "Client":
+        if not self.url or not self.key:
+            raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set in environment (.env)")
+        scope = self._scope()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Supabase client manager has been shut down")
+            entry = self._clients.get(scope)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            entry = self._create()
+            self._clients[scope] = entry
+            return entry[0]
+
+    def release(self) -> None:
+        """
+        Close the client owned by the calling thread/event loop (e.g. at worker exit).
+        """
+        with self._lock:
+            entry = self._clients.pop(self._scope(), None)
+        if entry:
+            self._close_entry(entry)
+
+    def shutdown(self) -> None:
+        """
+        Close every client and its connection pool. Further get() calls fail.
+        """
+        with self._lock:
+            entries = list(self._clients.values())
+            self._clients.clear()
+            self._closed = True
+        for entry in entries:
+            self._close_entry(entry)
+
+    @staticmethod
+    def _close_entry(entry: tuple) -> None:
+        client, session = entry
+        sessions = [session]
+        postgrest = getattr(client, "_postgrest", None)
+        if postgrest is not None:
+            sessions.append(getattr(postgrest, "session", None))
+        for s in sessions:
+            if s is not None:
+                try:
+                    s.close()
+                except Exception:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "open_clients": len(self._clients),
+                "pool_size": self.pool_size,
+            }
+
+
+_manager = ClientManager(SUPABASE_URL, SUPABASE_KEY, pool_size=SUPABASE_POOL_SIZE,
+                         timeout=SUPABASE_TIMEOUT, connect_timeout=SUPABASE_CONNECT_TIMEOUT,
+                         keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY)
+
+_sqlite_client = None
+_sqlite_lock = threading.Lock()
+_client_override = None
+
+def _get_sqlite():
+    global _sqlite_client
+    with _sqlite_lock:
+        if _sqlite_client is None:
+            from src.backends.sqlite_backend import SQLiteClient
+            _sqlite_client = SQLiteClient(RETAIL_SQLITE_PATH)
+        return _sqlite_client
+
+def get_supabase() -> "Client":
+    """
+    Return the shared client for the configured backend (a supabase client for this
+    thread, or the embedded SQLite client). Raises RuntimeError if config missing.
+    """
+    if _client_override is not None:
+        client = _client_override
+    elif RETAIL_BACKEND == "sqlite":
+        client = _get_sqlite()
+    elif RETAIL_BACKEND == "supabase":
+        client = _manager.get()
+    else:
+        raise RuntimeError(f"Unknown RETAIL_BACKEND '{RETAIL_BACKEND}' (expected 'supabase' or 'sqlite')")
+    # Retries happen outside the profiler, so every attempt shows up as its own query
+    return resilient(instrument(client))
+
+_async_clients: dict = {}  # id(event loop) -> async supabase client
+_async_lock = threading.Lock()
+
+async def get_async_supabase():
+    """
+    Async counterpart of get_supabase(), one client per running event loop.
+    Synchronous backends (SQLite, overrides) are adapted so execute() is awaitable.
+    """
+    from src.async_support import AsyncClientAdapter
+    if _client_override is not None:
+        return resilient(instrument(AsyncClientAdapter(_client_override)), is_async=True)
+    if RETAIL_BACKEND == "sqlite":
+        return resilient(instrument(AsyncClientAdapter(_get_sqlite())), is_async=True)
+    if RETAIL_BACKEND != "supabase":
+        raise RuntimeError(f"Unknown RETAIL_BACKEND '{RETAIL_BACKEND}' (expected 'supabase' or 'sqlite')")
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set in environment (.env)")
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
\ No newline at end of file
+    loop_id = id(asyncio.get_running_loop())
+    with _async_lock:
+        client = _async_clients.get(loop_id)
+    if client is None:
+        from supabase import acreate_client
+        from supabase.lib import client_options
+        options_cls = getattr(client_options, "AsyncClientOptions", client_options.ClientOptions)
+        client = await acreate_client(SUPABASE_URL, SUPABASE_KEY,
+                                      options=options_cls(postgrest_client_timeout=SUPABASE_TIMEOUT))
+        with _async_lock:
+            client = _async_clients.setdefault(loop_id, client)
+    return resilient(instrument(client), is_async=True)
+
+async def shutdown_async_supabase() -> None:
+    """
+    Close the async client that belongs to the running event loop.
+    """
+    with _async_lock:
+        client = _async_clients.pop(id(asyncio.get_running_loop()), None)
+    postgrest = getattr(client, "_postgrest", None) if client else None
+    if postgrest is not None:
+        await postgrest.aclose()
+
+def get_client_manager() -> ClientManager:
+    return _manager
+
+@contextmanager
+def override_client(client):
+    """
+    Route every DAO/service query to `client` (e.g. a local stand-in) inside the block.
+    """
+    global _client_override
+    previous = _client_override
+    _client_override = client
+    try:
+        yield client
+    finally:
+        _client_override = previous
+
+def shutdown_supabase() -> None:
+    global _sqlite_client
+    _manager.shutdown()
+    with _sqlite_lock:
+        if _sqlite_client is not None:
+            _sqlite_client.close()
+            _sqlite_client = None
@@ -0,0 +1,53 @@
+from typing import Optional, List, Dict
+from src.config import get_async_supabase
+from src.dao.cache import customer_cache
+from src.dao.scan import SCAN_PAGE_SIZE
+
+async def _sb():
+    return await get_async_supabase()
+
+async def get_customer_by_id(cust_id: int, fresh: bool = False) -> Optional[Dict]:
+    if not fresh:
+        cached = customer_cache.get(cust_id)
+        if cached is not None:
+            return cached
+    resp = await (await _sb()).table("customers").select("*").eq("cust_id", cust_id).limit(1).execute()
+    row = resp.data[0] if resp.data else None
+    customer_cache.put(row)
+    return row
+
+async def get_customer_by_email(email: str, fresh: bool = False) -> Optional[Dict]:
+    if not fresh:
+        cached = customer_cache.get_by_key(email)
+        if cached is not None:
+            return cached
+    resp = await (await _sb()).table("customers").select("*").eq("email", email).limit(1).execute()
+    row = resp.data[0] if resp.data else None
+    customer_cache.put(row)
+    return row
+
+async def list_customers(limit: int = 100) -> List[Dict]:
+    resp = await (await _sb()).table("customers").select("*").order("cust_id", desc=False).limit(limit).execute()
+    return resp.data or []
+
+async def search_customers(email: str | None = None, city: str | None = None,
+                           page_size: int | None = None) -> List[Dict]:
+    """
+    Search customers by email or city, paging by cust_id.
+    """
+    page_size = page_size or SCAN_PAGE_SIZE
+    results: List[Dict] = []
+    after = None
+    while True:
+        q = (await _sb()).table("customers").select("*")
+        if email:
+            q = q.eq("email", email)
+        if city:
+            q = q.eq("city", city)
+        if after is not None:
+            q = q.gt("cust_id", after)
+        page = (await q.order("cust_id", desc=False).limit(page_size).execute()).data or []
+        results.extend(page)
+        if len(page) < page_size:
+            return results
+        after = page[-1]["cust_id"]
@@ -0,0 +1,82 @@
+# src/dao/async_product_dao.py
+from typing import Optional, List, Dict
+from src.config import get_async_supabase
+from src.dao.cache import product_cache
+from src.dao.catalog import catalog
+from src.dao.product_dao import InsufficientStock, _stock_changed, _stock_items
+ 
+async def _sb():
+    return await get_async_supabase()
+ 
+async def get_product_by_id(prod_id: int, fresh: bool = False) -> Optional[Dict]:
+    if not fresh:
+        cached = product_cache.get(prod_id)
+        if cached is not None:
+            return cached
+    resp = await (await _sb()).table("products").select("*").eq("prod_id", prod_id).limit(1).execute()
+    row = resp.data[0] if resp.data else None
+    product_cache.put(row)
+    return row
+ 
+async def get_products_by_ids(prod_ids: List[int], fresh: bool = False) -> Dict[int, Dict]:
+    """
+    Fetch many products in one query. Returns {prod_id: row}; missing ids are absent.
+    """
+    ids = list(dict.fromkeys(prod_ids))
+    found = {}
+    if not fresh:
+        for pid in ids:
+            cached = product_cache.get(pid)
+            if cached is not None:
+                found[pid] = cached
+        ids = [pid for pid in ids if pid not in found]
+    if not ids:
+        return found
+    resp = await (await _sb()).table("products").select("*").in_("prod_id", ids).execute()
+    for row in resp.data or []:
+        product_cache.put(row)
+        found[row["prod_id"]] = row
+    return found
+ 
+async def get_product_by_sku(sku: str, fresh: bool = False) -> Optional[Dict]:
+    if not fresh:
+        cached = product_cache.get_by_key(sku)
+        if cached is not None:
+            return cached
+    resp = await (await _sb()).table("products").select("*").eq("sku", sku).limit(1).execute()
+    row = resp.data[0] if resp.data else None
+    product_cache.put(row)
+    return row
+ 
+async def reserve_stock(quantities: Dict[int, int]) -> Dict[int, Dict]:
+    """
+    Atomically take quantities {prod_id: qty} out of stock, all or nothing (see product_dao.reserve_stock).
+    """
+    product_cache.invalidate(*quantities)
+    resp = await (await _sb()).rpc("reserve_stock", {"p_items": _stock_items(quantities)}).execute()
+    result = resp.data or {}
+    if not result.get("ok"):
+        raise InsufficientStock(result.get("shortages") or [])
+    rows = {row["prod_id"]: row for row in result.get("products") or []}
+    for row in rows.values():
+        product_cache.put(row)
+        catalog.note(row)
+    _stock_changed(list(rows.values()))
+    return rows
+ 
+async def release_stock(quantities: Dict[int, int]) -> Dict[int, Dict]:
+    product_cache.invalidate(*quantities)
+    resp = await (await _sb()).rpc("release_stock", {"p_items": _stock_items(quantities)}).execute()
+    rows = {row["prod_id"]: row for row in resp.data or []}
+    for row in rows.values():
+        product_cache.put(row)
+        catalog.note(row)
+    _stock_changed(list(rows.values()))
+    return rows
+ 
+async def list_products(limit: int = 100, category: str | None = None) -> List[Dict]:
+    q = (await _sb()).table("products").select("*").order("prod_id", desc=False).limit(limit)
+    if category:
+        q = q.eq("category", category)
+    resp = await q.execute()
+    return resp.data or []
@@ -0,0 +1,104 @@
+# src/dao/cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Hashable
+
+CACHE_MAX_ENTRIES = int(os.getenv("RETAIL_CACHE_MAX_ENTRIES", "10000"))
+PRODUCT_CACHE_TTL = float(os.getenv("RETAIL_PRODUCT_CACHE_TTL", "30"))
+CUSTOMER_CACHE_TTL = float(os.getenv("RETAIL_CUSTOMER_CACHE_TTL", "300"))
+
+
+class EntityCache:
+    """
+    Bounded LRU cache of rows with a TTL, addressable by primary key and by a
+    natural key (e.g. sku or email). Only rows that exist are cached.
+    """
+
+    def __init__(self, name: str, id_field: str, key_field: str,
+                 maxsize: int = 10000, ttl: float = 60.0):
+        self.name = name
+        self.id_field = id_field
+        self.key_field = key_field
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._rows: OrderedDict = OrderedDict()  # id -> (expires_at, row)
+        self._by_key: Dict[Hashable, Hashable] = {}  # natural key -> id
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _drop(self, row_id) -> None:
+        entry = self._rows.pop(row_id, None)
+        if entry is not None:
+            self._by_key.pop(entry[1].get(self.key_field), None)
+
+    def get(self, row_id) -> Optional[Dict]:
+        with self._lock:
+            entry = self._rows.get(row_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(row_id)
+                self.misses += 1
+                return None
+            self._rows.move_to_end(row_id)
+            self.hits += 1
+            return dict(entry[1])
+
+    def get_by_key(self, key) -> Optional[Dict]:
+        with self._lock:
+            row_id = self._by_key.get(key)
+        if row_id is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return self.get(row_id)
+
+    def put(self, row: Optional[Dict]) -> None:
+        if not row or self.ttl <= 0:
+            return
+        row_id = row.get(self.id_field)
+        if row_id is None:
+            return
+        with self._lock:
+            self._drop(row_id)
+            self._rows[row_id] = (time.monotonic() + self.ttl, dict(row))
+            if row.get(self.key_field) is not None:
+                self._by_key[row[self.key_field]] = row_id
+            while len(self._rows) > self.maxsize:
+                self._drop(next(iter(self._rows)))
+
+    def invalidate(self, *row_ids) -> None:
+        with self._lock:
+            for row_id in row_ids:
+                self._drop(row_id)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rows.clear()
+            self._by_key.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._rows),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+product_cache = EntityCache("products", "prod_id", "sku", CACHE_MAX_ENTRIES, PRODUCT_CACHE_TTL)
+customer_cache = EntityCache("customers", "cust_id", "email", CACHE_MAX_ENTRIES, CUSTOMER_CACHE_TTL)
+
+def cache_stats() -> Dict[str, Dict]:
+    return {c.name: c.stats() for c in (product_cache, customer_cache)}
+
+def clear_caches() -> None:
+    product_cache.clear()
+    customer_cache.clear()
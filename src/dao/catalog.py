@@ -0,0 +1,249 @@
+# src/dao/catalog.py
+"""
+In-process snapshot of the product catalog for hot read paths (price and stock
+lookups, product listings, low-stock checks) on catalogs with millions of SKUs.
+
+Columns are kept in typed arrays (prod_id, price, stock) and plain lists (sku,
+name, interned category) instead of one dict per product, which is several
+times smaller. Rows are ordered by prod_id, so id lookups are a binary search;
+skus have a dict index. The snapshot is loaded once and then refreshed from rows
+whose updated_at moved (see the products_touch_updated_at trigger), re-reading
+a small overlap window so rows stamped by slower concurrent transactions aren't
+missed. Deletes made elsewhere are only picked up by a full reload.
+
+Stock values are as fresh as the last refresh; reserve_stock remains the
+authority when orders are placed. Enable with RETAIL_CATALOG_SNAPSHOT=1.
+"""
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+from src.dao.scan import scan_table
+
+CATALOG_SNAPSHOT = os.getenv("RETAIL_CATALOG_SNAPSHOT", "0").lower() in ("1", "true", "yes")
+# Seconds between delta refreshes, and how far behind the newest seen updated_at each refresh re-reads
+CATALOG_REFRESH_SECONDS = float(os.getenv("RETAIL_CATALOG_REFRESH_SECONDS", "5"))
+CATALOG_REFRESH_OVERLAP = float(os.getenv("RETAIL_CATALOG_REFRESH_OVERLAP", "5"))
+# Full reload interval (picks up deletes made by other processes); 0 disables
+CATALOG_RELOAD_SECONDS = float(os.getenv("RETAIL_CATALOG_RELOAD_SECONDS", "3600"))
+
+SNAPSHOT_COLUMNS = "prod_id, name, sku, price, stock, category, updated_at"
+
+def enabled() -> bool:
+    return CATALOG_SNAPSHOT
+
+
+class CatalogSnapshot:
+    __slots__ = ("ids", "prices", "stocks", "skus", "names", "categories", "live",
+                 "_pos_by_sku", "_watermark", "_loaded_at", "_refreshed_at", "_lock")
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self._loaded_at = None
+
+    def _reset(self) -> None:
+        self.ids = array("q")
+        self.prices = array("d")
+        self.stocks = array("q")
+        self.skus: List[str] = []
+        self.names: List[str] = []
+        self.categories: List[Optional[str]] = []
+        self.live = bytearray()
+        self._pos_by_sku: Dict[str, int] = {}
+        self._watermark: Optional[str] = None
+        self._refreshed_at = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def __len__(self) -> int:
+        return sum(self.live)
+
+    # ---- loading -------------------------------------------------------------
+
+    def load(self, page_size: int | None = None) -> int:
+        """
+        Replace the snapshot with a full read of products. Returns the number of rows.
+        """
+        fresh = CatalogSnapshot()
+        for row in scan_table("products", "prod_id", SNAPSHOT_COLUMNS, page_size=page_size, prefetch=True):
+            fresh._append(row)
+        with self._lock:
+            for slot in ("ids", "prices", "stocks", "skus", "names", "categories", "live",
+                         "_pos_by_sku", "_watermark"):
+                setattr(self, slot, getattr(fresh, slot))
+            self._loaded_at = self._refreshed_at = time.monotonic()
+        return len(self.ids)
+
+    def refresh(self) -> int:
+        """
+        Apply rows changed since the last load/refresh. Returns the number of rows applied.
+        """
+        if not self.loaded:
+            return self.load()
+        since = self._watermark
+        where = None
+        if since is not None:
+            since = (datetime.fromisoformat(since) - timedelta(seconds=CATALOG_REFRESH_OVERLAP)).isoformat()
+            where = lambda q: q.gt("updated_at", since)
+        n = 0
+        for row in scan_table("products", "prod_id", SNAPSHOT_COLUMNS, where=where):
+            self.apply(row)
+            n += 1
+        self._refreshed_at = time.monotonic()
+        return n
+
+    def ensure_fresh(self) -> "CatalogSnapshot":
+        """
+        Load on first use, reload or delta-refresh when the configured intervals have passed.
+        """
+        now = time.monotonic()
+        if not self.loaded or (CATALOG_RELOAD_SECONDS and now - self._loaded_at >= CATALOG_RELOAD_SECONDS):
+            self.load()
+        elif now - self._refreshed_at >= CATALOG_REFRESH_SECONDS:
+            self.refresh()
+        return self
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+            self._loaded_at = None
+
+    # ---- writes --------------------------------------------------------------
+
+    def _append(self, row: Dict) -> None:
+        self._pos_by_sku[row["sku"]] = len(self.ids)
+        self.ids.append(row["prod_id"])
+        self.prices.append(float(row["price"]))
+        self.stocks.append(int(row["stock"] or 0))
+        self.skus.append(row["sku"])
+        self.names.append(row["name"])
+        self.categories.append(sys.intern(row["category"]) if row.get("category") else None)
+        self.live.append(1)
+        self._bump_watermark(row)
+
+    def _bump_watermark(self, row: Dict) -> None:
+        stamp = row.get("updated_at")
+        if stamp and (self._watermark is None or str(stamp) > self._watermark):
+            self._watermark = str(stamp)
+
+    def apply(self, row: Optional[Dict]) -> None:
+        """
+        Insert or overwrite one product row (e.g. a row returned by a write in this process).
+        """
+        if not row:
+            return
+        with self._lock:
+            pid = row["prod_id"]
+            pos = bisect_left(self.ids, pid)
+            if pos == len(self.ids):
+                self._append(row)
+                return
+            if self.ids[pos] != pid:
+                # Ids normally only grow; keep the arrays sorted for the rare out-of-order id
+                for col, value in ((self.ids, pid), (self.prices, 0.0), (self.stocks, 0), (self.skus, ""),
+                                   (self.names, ""), (self.categories, None)):
+                    col.insert(pos, value)
+                self.live.insert(pos, 1)
+                self._pos_by_sku = {sku: i for i, sku in enumerate(self.skus)}
+            old_sku = self.skus[pos]
+            if self._pos_by_sku.get(old_sku) == pos:
+                del self._pos_by_sku[old_sku]
+            self._pos_by_sku[row["sku"]] = pos
+            self.prices[pos] = float(row["price"])
+            self.stocks[pos] = int(row["stock"] or 0)
+            self.skus[pos] = row["sku"]
+            self.names[pos] = row["name"]
+            self.categories[pos] = sys.intern(row["category"]) if row.get("category") else None
+            self.live[pos] = 1
+            self._bump_watermark(row)
+
+    def note(self, row: Optional[Dict]) -> None:
+        """
+        apply() if the snapshot is loaded; a no-op otherwise, so writers can call it unconditionally.
+        """
+        if self.loaded:
+            self.apply(row)
+
+    def discard(self, prod_id: int) -> None:
+        with self._lock:
+            pos = self._position(prod_id)
+            if pos is not None:
+                self.live[pos] = 0
+                self._pos_by_sku.pop(self.skus[pos], None)
+
+    # ---- reads ---------------------------------------------------------------
+
+    def _position(self, prod_id: int) -> Optional[int]:
+        pos = bisect_left(self.ids, prod_id)
+        if pos < len(self.ids) and self.ids[pos] == prod_id and self.live[pos]:
+            return pos
+        return None
+
+    def _row(self, pos: int) -> Dict:
+        return {"prod_id": self.ids[pos], "name": self.names[pos], "sku": self.skus[pos],
+                "price": self.prices[pos], "stock": self.stocks[pos], "category": self.categories[pos]}
+
+    def get(self, prod_id: int) -> Optional[Dict]:
+        with self._lock:
+            pos = self._position(prod_id)
+            return self._row(pos) if pos is not None else None
+
+    def get_by_sku(self, sku: str) -> Optional[Dict]:
+        with self._lock:
+            pos = self._pos_by_sku.get(sku)
+            return self._row(pos) if pos is not None else None
+
+    def get_many(self, prod_ids: Iterable[int]) -> Dict[int, Dict]:
+        with self._lock:
+            found = {}
+            for pid in prod_ids:
+                pos = self._position(pid)
+                if pos is not None:
+                    found[pid] = self._row(pos)
+            return found
+
+    def prices_for(self, prod_ids: Iterable[int]) -> Dict[int, float]:
+        with self._lock:
+            found = {}
+            for pid in prod_ids:
+                pos = self._position(pid)
+                if pos is not None:
+                    found[pid] = self.prices[pos]
+            return found
+
+    def rows(self, limit: int | None = None, category: str | None = None) -> Iterator[Dict]:
+        """
+        Live products in prod_id order, optionally by category.
+        """
+        n = 0
+        for pos in range(len(self.ids)):
+            if limit is not None and n >= limit:
+                return
+            if self.live[pos] and (category is None or self.categories[pos] == category):
+                n += 1
+                yield self._row(pos)
+
+    def low_stock(self, threshold: int) -> List[Dict]:
+        with self._lock:
+            return [self._row(pos) for pos, stock in enumerate(self.stocks)
+                    if stock <= threshold and self.live[pos]]
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate footprint of the snapshot's columns and indexes.
+        """
+        size = sum(sys.getsizeof(col) for col in (self.ids, self.prices, self.stocks, self.live,
+                                                   self.skus, self.names, self.categories, self._pos_by_sku))
+        size += sum(sys.getsizeof(s) for s in self.skus) + sum(sys.getsizeof(s) for s in self.names)
+        size += sum(sys.getsizeof(c) for c in set(self.categories) if c is not None)
+        return size
+
+
+catalog = CatalogSnapshot()
@@ -1,32 +1,72 @@
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterator
 from src.config import get_supabase
+from src.dao.cache import customer_cache
+from src.dao.customer_index import customer_index
+from src.dao.errors import is_unique_violation
+from src.dao.scan import scan_table
 
 def _sb():
     return get_supabase()
 
 def create_customer(name: str, email: str, phone: str, city: str | None = None) -> Optional[Dict]:
     """
-    Create a new customer. Email must be unique.
+    Create a new customer. Email must be unique (enforced by the UNIQUE constraint).
     """
-    existing = get_customer_by_email(email)
-    if existing:
-        raise ValueError(f"Customer with email '{email}' already exists.")
-
     payload = {"name": name, "email": email, "phone": phone}
     if city:
         payload["city"] = city
 
-    _sb().table("customers").insert(payload).execute()
-    resp = _sb().table("customers").select("*").eq("email", email).limit(1).execute()
-    return resp.data[0] if resp.data else None
+    try:
+        resp = _sb().table("customers").insert(payload).execute()
+    except Exception as e:
+        if is_unique_violation(e):
+            raise ValueError(f"Customer with email '{email}' already exists.") from e
+        raise
+    row = resp.data[0] if resp.data else None
+    customer_cache.put(row)
+    customer_index.note(row)
+    return row
 
-def get_customer_by_id(cust_id: int) -> Optional[Dict]:
+def get_customer_by_id(cust_id: int, fresh: bool = False) -> Optional[Dict]:
+    if not fresh:
+        cached = customer_cache.get(cust_id)
+        if cached is not None:
+            return cached
     resp = _sb().table("customers").select("*").eq("cust_id", cust_id).limit(1).execute()
-    return resp.data[0] if resp.data else None
+    row = resp.data[0] if resp.data else None
+    customer_cache.put(row)
+    return row
+
+def get_customers_by_ids(cust_ids: List[int], fresh: bool = False) -> Dict[int, Dict]:
+    """
+    Fetch many customers in one query. Returns {cust_id: row}; missing ids are absent.
+    Cached rows are reused unless fresh=True.
+    """
+    ids = list(dict.fromkeys(cust_ids))
+    found = {}
+    if not fresh:
+        for cid in ids:
+            cached = customer_cache.get(cid)
+            if cached is not None:
+                found[cid] = cached
+        ids = [cid for cid in ids if cid not in found]
+    if not ids:
+        return found
+    resp = _sb().table("customers").select("*").in_("cust_id", ids).execute()
+    for row in resp.data or []:
+        customer_cache.put(row)
+        found[row["cust_id"]] = row
+    return found
 
-def get_customer_by_email(email: str) -> Optional[Dict]:
+def get_customer_by_email(email: str, fresh: bool = False) -> Optional[Dict]:
+    if not fresh:
+        cached = customer_cache.get_by_key(email)
+        if cached is not None:
+            return cached
     resp = _sb().table("customers").select("*").eq("email", email).limit(1).execute()
-    return resp.data[0] if resp.data else None
+    row = resp.data[0] if resp.data else None
+    customer_cache.put(row)
+    return row
 
 def update_customer(cust_id: int, phone: str | None = None, city: str | None = None) -> Optional[Dict]:
     """
@@ -41,36 +81,55 @@ def update_customer(cust_id: int, phone: str | None = None, city: str | None = N
     if not fields:
         raise ValueError("No fields to update.")
 
-    _sb().table("customers").update(fields).eq("cust_id", cust_id).execute()
-    resp = _sb().table("customers").select("*").eq("cust_id", cust_id).limit(1).execute()
-    return resp.data[0] if resp.data else None
+    customer_cache.invalidate(cust_id)
+    resp = _sb().table("customers").update(fields).eq("cust_id", cust_id).execute()
+    row = resp.data[0] if resp.data else None
+    customer_cache.put(row)
+    customer_index.note(row)
+    return row
 
 def delete_customer(cust_id: int) -> Optional[Dict]:
     """
-    Delete a customer only if they have no orders.
+    Delete a customer only if they have no orders. The check and the delete run in one
+    database call (orders cascade on delete, so they must not race).
     """
-    orders_resp = _sb().table("orders").select("order_id").eq("customer", cust_id).limit(1).execute()
-    if orders_resp.data:
+    resp = _sb().rpc("delete_customer_without_orders", {"p_cust_id": cust_id}).execute()
+    result = resp.data or {}
+    if not result.get("ok"):
         raise ValueError("Cannot delete customer: existing orders found.")
-
-    resp_before = _sb().table("customers").select("*").eq("cust_id", cust_id).limit(1).execute()
-    row = resp_before.data[0] if resp_before.data else None
-
-    _sb().table("customers").delete().eq("cust_id", cust_id).execute()
-    return row
+    customer_cache.invalidate(cust_id)
+    customer_index.discard(cust_id)
+    return result.get("customer")
 
 def list_customers(limit: int = 100) -> List[Dict]:
     resp = _sb().table("customers").select("*").order("cust_id", desc=False).limit(limit).execute()
     return resp.data or []
 
+def scan_customers(email: str | None = None, city: str | None = None, page_size: int | None = None,
+                   prefetch: bool = False) -> Iterator[Dict]:
+    """
+    Stream customers in cust_id order, optionally filtered by email or city.
+    """
+    def where(q):
+        if email:
+            q = q.eq("email", email)
+        if city:
+            q = q.eq("city", city)
+        return q
+    return scan_table("customers", "cust_id", page_size=page_size, where=where, prefetch=prefetch)
+
 def search_customers(email: str | None = None, city: str | None = None) -> List[Dict]:
     """
     Search customers by email or city.
     """
-    q = _sb().table("customers").select("*")
-    if email:
-        q = q.eq("email", email)
-    if city:
-        q = q.eq("city", city)
-    resp = q.execute()
-    return resp.data or []
\ No newline at end of file
+    return list(scan_customers(email=email, city=city))
+
+def find_customers(query: str, limit: int = 20, offset: int = 0) -> List[Dict]:
+    """
+    Type-ahead search by name, email prefix or phone fragment, ranked best first
+    (see src/dao/customer_index.py). Each row carries its match `score`.
+    """
+    ranked = customer_index.ensure_fresh().search(query, limit, offset)
+    # Fresh rows, so what is shown agrees with the text that matched
+    rows = get_customers_by_ids([cid for cid, _ in ranked], fresh=True)
+    return [dict(rows[cid], score=score) for cid, score in ranked if cid in rows]
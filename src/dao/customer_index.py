@@ -0,0 +1,450 @@
+# src/dao/customer_index.py
+"""
+In-process search index over customers for type-ahead lookup by name, email
+prefix or phone fragment.
+
+Each customer is kept as one lower-cased "name\\nemail\\nphone digits" string,
+in load order, with on top of that:
+
+  - positions sorted by email and by name, for prefix matches by binary search
+  - trigram posting lists (an array of positions per 3-character gram) over the
+    name, the email's local part and the phone digits, for substring matches
+    (candidates come from the query's rarest gram) and, for queries nothing else
+    matched, fuzzy matches (the share of the query's grams a customer has)
+
+Results are ranked by match quality (see SCORES). The index is loaded once and
+refreshed from rows whose customers.updated_at moved, re-reading a small overlap
+window, like the catalog snapshot (src/dao/catalog.py); writes made in this
+process are applied directly by customer_dao. Deletes made elsewhere are only
+picked up by a full reload. Edits leave stale postings behind, which cost a
+little time but never a wrong result: every candidate is checked against its
+current text. NumPy, when installed, builds the postings of a full load in one sort.
+"""
+import heapq
+import math
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from src.dao.scan import scan_table
+
+try:
+    import numpy as np
+except ImportError:  # optional: only speeds up building the postings on a full load
+    np = None
+
+# Seconds between delta refreshes, and how far behind the newest seen updated_at each refresh re-reads
+CUSTOMER_INDEX_REFRESH_SECONDS = float(os.getenv("RETAIL_CUSTOMER_INDEX_REFRESH_SECONDS", "5"))
+CUSTOMER_INDEX_REFRESH_OVERLAP = float(os.getenv("RETAIL_CUSTOMER_INDEX_REFRESH_OVERLAP", "5"))
+# Full reload interval (picks up deletes made by other processes); 0 disables
+CUSTOMER_INDEX_RELOAD_SECONDS = float(os.getenv("RETAIL_CUSTOMER_INDEX_RELOAD_SECONDS", "3600"))
+# Minimum share of the query's trigrams a fuzzy match must have
+SEARCH_FUZZY_THRESHOLD = float(os.getenv("RETAIL_SEARCH_FUZZY_THRESHOLD", "0.5"))
+# Grams held by more than this share of customers are too common to tell fuzzy matches apart
+FUZZY_MAX_GRAM_SHARE = 0.05
+
+INDEX_COLUMNS = "cust_id, name, email, phone, updated_at"
+
+# Best match per customer, highest first; a fuzzy match scores "fuzzy" * its similarity.
+# Ties go to the matched field in alphabetical order (email for email matches, name otherwise), then cust_id.
+SCORES = {
+    "email": 100,             # the whole email
+    "email_prefix": 90,
+    "name_prefix": 80,
+    "name_word_prefix": 70,   # a later word of the name, e.g. the surname
+    "phone": 60,              # the phone's digits contain the query's digits
+    "substring": 50,          # the name or the email's local part contains the query
+    "fuzzy": 40,
+}
+
+_NON_DIGITS = re.compile(r"\D+")
+# Hyphens, dots and apostrophes in names count as word breaks, like spaces
+_NAME_PUNCTUATION = re.compile(r"[\s.\-_']+")
+
+def _digits(value: Optional[str]) -> str:
+    return _NON_DIGITS.sub("", value or "")
+
+def _normalize(value: str) -> str:
+    return _NAME_PUNCTUATION.sub(" ", value.lower()).strip()
+
+def _text(row: Dict) -> str:
+    return f"{_normalize(row.get('name') or '')}\n{(row.get('email') or '').lower()}\n{_digits(row.get('phone'))}"
+
+def _grams(value: str) -> Set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+def _text_grams(text: str) -> Set[str]:
+    """
+    Grams of the name, the email's local part and the phone digits.
+    """
+    name, email, phone = text.split("\n")
+    return _grams(name) | _grams(email.partition("@")[0]) | _grams(phone)
+
+def _gram_source(text: str) -> str:
+    name, email, phone = text.split("\n")
+    return f"{name}\n{email.partition('@')[0]}\n{phone}"
+
+def _new_postings() -> array:
+    return array("i")
+
+def _build_postings(texts: List[str]) -> Dict[str, array]:
+    """
+    gram -> ascending positions for a full load. With NumPy every gram of every row
+    is encoded as one integer (gram code << 31 | position) and the lot is sorted at
+    once, instead of appending tens of millions of positions one by one.
+    """
+    postings = defaultdict(_new_postings)
+    chars = alphabet = None
+    if np is not None and texts:
+        sources = [_gram_source(t) for t in texts]
+        chars = np.frombuffer(("\x00".join(sources) + "\x00").encode("utf-32-le"), dtype=np.uint32)
+        alphabet = np.flatnonzero(np.bincount(chars))
+    # Three 10-bit letter codes and a 31-bit position must fit in 63 bits
+    if alphabet is None or len(alphabet) >= 1 << 10:
+        for pos, text in enumerate(texts):
+            for g in _text_grams(text):
+                postings[g].append(pos)
+        return postings
+    letters = np.searchsorted(alphabet, chars).astype(np.int64)
+    rows = np.repeat(np.arange(len(sources), dtype=np.int64),
+                     np.fromiter(map(len, sources), dtype=np.int64, count=len(sources)) + 1)
+    # Grams spanning a field ("\n") or row ("\x00") break are dropped
+    breaks = np.isin(letters, np.searchsorted(alphabet, [0, 10]))
+    ok = ~(breaks[:-2] | breaks[1:-1] | breaks[2:])
+    keys = (((letters[:-2] << 20) | (letters[1:-1] << 10) | letters[2:]) << 31 | rows[:-2])[ok]
+    keys.sort()
+    keep = np.empty(len(keys), dtype=bool)
+    keep[:1] = True
+    np.not_equal(keys[1:], keys[:-1], out=keep[1:])
+    keys = keys[keep]
+    if not len(keys):
+        return postings
+    codes, positions = keys >> 31, (keys & 0x7FFFFFFF).astype(np.int32)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)]
+    letter = alphabet.tolist()
+    for start, end, code in zip(starts.tolist(), ends.tolist(), codes[starts].tolist()):
+        gram = chr(letter[code >> 20]) + chr(letter[(code >> 10) & 0x3FF]) + chr(letter[code & 0x3FF])
+        postings[gram].frombytes(positions[start:end].tobytes())
+    return postings
+
+def _name_of(text: str) -> str:
+    return text.partition("\n")[0]
+
+def _email_of(text: str) -> str:
+    return text.split("\n", 2)[1]
+
+
+class CustomerIndex:
+    __slots__ = ("ids", "texts", "live", "_by_email", "_by_name", "_grams", "_edited", "_pos_by_id",
+                 "_watermark", "_loaded_at", "_refreshed_at", "_lock")
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self._loaded_at = None
+
+    def _reset(self) -> None:
+        self.ids = array("q")
+        self.texts: List[str] = []
+        self.live = bytearray()
+        self._by_email = array("i")
+        self._by_name = array("i")
+        self._grams: Dict[str, array] = defaultdict(_new_postings)
+        # Positions whose text changed since the load, so their postings may be stale
+        self._edited: Set[int] = set()
+        # Only built if ids stop arriving in increasing order; until then ids are searched by bisection
+        self._pos_by_id: Optional[Dict[int, int]] = None
+        self._watermark: Optional[str] = None
+        self._refreshed_at = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def __len__(self) -> int:
+        return sum(self.live)
+
+    # ---- loading -------------------------------------------------------------
+
+    def load(self, page_size: int | None = None) -> int:
+        """
+        Replace the index with a full read of customers. Returns the number of rows.
+        """
+        fresh = CustomerIndex()
+        for row in scan_table("customers", "cust_id", INDEX_COLUMNS, page_size=page_size, prefetch=True):
+            fresh._append(row, post=False)
+        fresh._grams = _build_postings(fresh.texts)
+        fresh._by_email = array("i", sorted(range(len(fresh.texts)), key=fresh._order_key(_email_of)))
+        fresh._by_name = array("i", sorted(range(len(fresh.texts)), key=fresh._order_key(_name_of)))
+        with self._lock:
+            for slot in ("ids", "texts", "live", "_by_email", "_by_name", "_grams", "_edited", "_pos_by_id",
+                         "_watermark"):
+                setattr(self, slot, getattr(fresh, slot))
+            self._loaded_at = self._refreshed_at = time.monotonic()
+        return len(self.ids)
+
+    def refresh(self) -> int:
+        """
+        Apply rows changed since the last load/refresh. Returns the number of rows applied.
+        """
+        if not self.loaded:
+            return self.load()
+        since = self._watermark
+        where = None
+        if since is not None:
+            since = (datetime.fromisoformat(since) - timedelta(seconds=CUSTOMER_INDEX_REFRESH_OVERLAP)).isoformat()
+            where = lambda q: q.gt("updated_at", since)
+        n = 0
+        for row in scan_table("customers", "cust_id", INDEX_COLUMNS, where=where):
+            self.apply(row)
+            n += 1
+        self._refreshed_at = time.monotonic()
+        return n
+
+    def ensure_fresh(self) -> "CustomerIndex":
+        """
+        Load on first use, reload or delta-refresh when the configured intervals have passed.
+        """
+        now = time.monotonic()
+        if not self.loaded or (CUSTOMER_INDEX_RELOAD_SECONDS and now - self._loaded_at >= CUSTOMER_INDEX_RELOAD_SECONDS):
+            self.load()
+        elif now - self._refreshed_at >= CUSTOMER_INDEX_REFRESH_SECONDS:
+            self.refresh()
+        return self
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+            self._loaded_at = None
+
+    # ---- writes --------------------------------------------------------------
+
+    def _append(self, row: Dict, post: bool = True) -> int:
+        pos = len(self.ids)
+        cid = row["cust_id"]
+        if self._pos_by_id is None and self.ids and cid < self.ids[-1]:
+            self._pos_by_id = {c: p for p, c in enumerate(self.ids)}
+        if self._pos_by_id is not None:
+            self._pos_by_id[cid] = pos
+        self.ids.append(cid)
+        text = _text(row)
+        self.texts.append(text)
+        self.live.append(1)
+        if post:
+            self._post(pos, _text_grams(text))
+        self._bump_watermark(row)
+        return pos
+
+    def _post(self, pos: int, grams: Set[str]) -> None:
+        postings = self._grams
+        for g in grams:
+            postings[g].append(pos)
+
+    def _bump_watermark(self, row: Dict) -> None:
+        stamp = row.get("updated_at")
+        if stamp and (self._watermark is None or str(stamp) > self._watermark):
+            self._watermark = str(stamp)
+
+    def _order_key(self, key):
+        # Equal names (or emails) stay in cust_id order
+        return lambda p: (key(self.texts[p]), self.ids[p])
+
+    def _sorted_insert(self, order: array, pos: int, key) -> None:
+        order_key = self._order_key(key)
+        order.insert(bisect_left(order, order_key(pos), key=order_key), pos)
+
+    def _sorted_remove(self, order: array, pos: int, key) -> None:
+        order_key = self._order_key(key)
+        i = bisect_left(order, order_key(pos), key=order_key)
+        while i < len(order) and order[i] != pos:
+            i += 1
+        if i < len(order):
+            del order[i]
+
+    def apply(self, row: Optional[Dict]) -> None:
+        """
+        Insert or overwrite one customer row (e.g. a row returned by a write in this process).
+        """
+        if not row:
+            return
+        with self._lock:
+            pos = self._position(row["cust_id"], live_only=False)
+            if pos is None:
+                pos = self._append(row)
+                self._sorted_insert(self._by_email, pos, _email_of)
+                self._sorted_insert(self._by_name, pos, _name_of)
+                return
+            text = _text(row)
+            old = self.texts[pos]
+            if text != old:
+                self._sorted_remove(self._by_email, pos, _email_of)
+                self._sorted_remove(self._by_name, pos, _name_of)
+                self.texts[pos] = text
+                self._sorted_insert(self._by_email, pos, _email_of)
+                self._sorted_insert(self._by_name, pos, _name_of)
+                self._post(pos, _text_grams(text) - _text_grams(old))
+                self._edited.add(pos)
+            self.live[pos] = 1
+            self._bump_watermark(row)
+
+    def note(self, row: Optional[Dict]) -> None:
+        """
+        apply() if the index is loaded; a no-op otherwise, so writers can call it unconditionally.
+        """
+        if self.loaded:
+            self.apply(row)
+
+    def discard(self, cust_id: int) -> None:
+        with self._lock:
+            pos = self._position(cust_id)
+            if pos is not None:
+                self.live[pos] = 0
+
+    # ---- reads ---------------------------------------------------------------
+
+    def _position(self, cust_id: int, live_only: bool = True) -> Optional[int]:
+        if self._pos_by_id is not None:
+            pos = self._pos_by_id.get(cust_id)
+        else:
+            pos = bisect_left(self.ids, cust_id)
+            if pos == len(self.ids) or self.ids[pos] != cust_id:
+                pos = None
+        if pos is None or (live_only and not self.live[pos]):
+            return None
+        return pos
+
+    def _prefixed(self, order: array, prefix: str, key) -> Iterator[int]:
+        texts, live = self.texts, self.live
+        i = bisect_left(order, prefix, key=lambda p: key(texts[p]))
+        while i < len(order):
+            pos = order[i]
+            if not key(texts[pos]).startswith(prefix):
+                return
+            if live[pos]:
+                yield pos
+            i += 1
+
+    def _candidates(self, term: str) -> Set[int]:
+        """
+        Positions that may contain `term`: the postings of its rarest gram (empty if any gram is unknown).
+        """
+        lists = [self._grams.get(g) for g in _grams(term)]
+        if not lists or any(plist is None for plist in lists):
+            return set()
+        return set(min(lists, key=len))
+
+    def _substring_matches(self, q: str, name_term: str, phone: bool) -> Iterator[Tuple[int, float, str]]:
+        """
+        (position, score, name) for every live customer whose phone digits (phone=True),
+        name or email local part contain the query.
+        """
+        texts, live = self.texts, self.live
+        candidates = self._candidates(q)
+        if name_term != q:
+            candidates |= self._candidates(name_term)
+        word = " " + name_term
+        for pos in candidates:
+            if not live[pos]:
+                continue
+            name, email, digits = texts[pos].split("\n")
+            if phone:
+                if q in digits:
+                    yield pos, SCORES["phone"], name
+            elif word in name:
+                yield pos, SCORES["name_word_prefix"], name
+            elif name_term in name or q in email.partition("@")[0]:
+                yield pos, SCORES["substring"], name
+
+    def _fuzzy_matches(self, term: str) -> Iterator[Tuple[int, float, str]]:
+        grams = _grams(term)
+        if not grams:
+            return
+        cap = max(1, int(len(self.ids) * FUZZY_MAX_GRAM_SHARE))
+        usable, common = [], []
+        for g in grams:
+            plist = self._grams.get(g)
+            if plist is None:
+                continue
+            if len(plist) <= cap:
+                usable.append(plist)
+            else:
+                common.append(g)
+        if not usable:
+            return
+        shared = Counter()
+        for plist in usable:
+            shared.update(plist)
+        # Candidates need enough of the rarer grams; the common ones are then checked against their text
+        least = math.ceil(len(usable) * SEARCH_FUZZY_THRESHOLD)
+        texts, live, edited = self.texts, self.live, self._edited
+        for pos, n in [(pos, n) for pos, n in shared.items() if n >= least]:
+            if not live[pos]:
+                continue
+            source = _gram_source(texts[pos])
+            if pos in edited:
+                n = sum(g in source for g in grams)
+            else:
+                n += sum(g in source for g in common)
+            similarity = n / len(grams)
+            if similarity >= SEARCH_FUZZY_THRESHOLD:
+                yield pos, round(SCORES["fuzzy"] * similarity, 1), _name_of(texts[pos])
+
+    def _rank(self, ranked: Dict[int, float], matches: Iterator[Tuple[int, float, str]], n: int) -> None:
+        best = heapq.nsmallest(n, ((-score, name, self.ids[pos], pos)
+                                   for pos, score, name in matches if pos not in ranked))
+        for neg_score, _, _, pos in best:
+            ranked[pos] = -neg_score
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> List[Tuple[int, float]]:
+        """
+        Ranked (cust_id, score) pairs for `query`, best first, skipping `offset` matches.
+        A query without letters is matched against phone numbers by its digits.
+        Each tier is only searched while the page isn't full, so common prefixes stay
+        cheap; fuzzy matching is a fallback for queries nothing else matched.
+        """
+        q = " ".join(query.lower().split())
+        if not q or limit <= 0:
+            return []
+        need = offset + limit
+        phone = not any(c.isalpha() for c in q)
+        term = _digits(q) if phone else q
+        name_term = term if phone else _normalize(q)
+        ranked: Dict[int, float] = {}
+        with self._lock:
+            texts = self.texts
+            for pos in self._prefixed(self._by_email, q, _email_of):
+                ranked[pos] = SCORES["email"] if _email_of(texts[pos]) == q else SCORES["email_prefix"]
+                if len(ranked) >= need:
+                    break
+            if len(ranked) < need and name_term:
+                for pos in self._prefixed(self._by_name, name_term, _name_of):
+                    ranked.setdefault(pos, SCORES["name_prefix"])
+                    if len(ranked) >= need:
+                        break
+            if len(ranked) < need and len(term) >= 3:
+                self._rank(ranked, self._substring_matches(term, name_term, phone), need - len(ranked))
+                if not ranked and not phone:
+                    self._rank(ranked, self._fuzzy_matches(name_term), need)
+            return [(self.ids[pos], score) for pos, score in list(ranked.items())[offset:need]]
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate footprint of the index's text, sort orders and postings.
+        """
+        size = sum(sys.getsizeof(col) for col in (self.ids, self.texts, self.live, self._by_email,
+                                                   self._by_name, self._grams))
+        size += sum(sys.getsizeof(t) for t in self.texts)
+        size += sum(sys.getsizeof(g) + sys.getsizeof(plist) for g, plist in self._grams.items())
+        if self._pos_by_id is not None:
+            size += sys.getsizeof(self._pos_by_id)
+        return size
+
+
+customer_index = CustomerIndex()
@@ -0,0 +1,28 @@
+# src/dao/errors.py
+# Postgres SQLSTATE for a UNIQUE constraint violation; PostgREST passes it through as APIError.code
+UNIQUE_VIOLATION = "23505"
+
+def is_unique_violation(exc: Exception) -> bool:
+    """
+    True if `exc` is a database error for a duplicate key (works for postgrest and SQLite APIError).
+    """
+    return str(getattr(exc, "code", "") or "") == UNIQUE_VIOLATION
+
+# Failures worth retrying: gateway/rate-limit statuses (PostgREST reports the HTTP status as the
+# code when the body isn't JSON), PostgREST's own connection errors, and Postgres
+# serialization/deadlock/shutdown states. Class 08 (connection exceptions) is matched by prefix.
+TRANSIENT_CODES = frozenset({"429", "502", "503", "504", "PGRST000", "PGRST001", "PGRST002",
+                             "40001", "40P01", "57P01", "57P02", "57P03"})
+
+def is_transient(exc: Exception) -> bool:
+    """
+    True if `exc` looks like a passing backend/network problem (timeout, dropped connection,
+    5xx from the gateway) rather than a problem with the request itself.
+    """
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    # httpx isn't needed by the SQLite backend, so match its transport errors by name
+    if any(cls.__name__ in ("TimeoutException", "TransportError") for cls in type(exc).__mro__):
+        return True
+    code = str(getattr(exc, "code", "") or "")
+    return code in TRANSIENT_CODES or code.startswith("08")
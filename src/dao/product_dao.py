@@ -1,51 +1,227 @@
 # src/dao/product_dao.py
-from typing import Optional, List, Dict
+from typing import Callable, Optional, List, Dict, Iterator
 from src.config import get_supabase
+from src.dao.cache import product_cache
+from src.dao.catalog import catalog, enabled as snapshot_enabled
+from src.dao.scan import SCAN_PAGE_SIZE, scan_table
  
 def _sb():
     return get_supabase()
  
 def create_product(name: str, sku: str, price: float, stock: int = 0, category: str | None = None) -> Optional[Dict]:
     """
-    Insert a product and return the inserted row (two-step: insert then select by unique sku).
+    Insert a product and return the inserted row (one round trip; the insert returns the representation).
+    A duplicate sku surfaces as the database's unique-violation error (see src.dao.errors).
     """
     payload = {"name": name, "sku": sku, "price": price, "stock": stock}
     if category is not None:
         payload["category"] = category
  
-    # Insert (no select chaining)
-    _sb().table("products").insert(payload).execute()
- 
-    # Fetch inserted row by unique column (sku)
-    resp = _sb().table("products").select("*").eq("sku", sku).limit(1).execute()
-    return resp.data[0] if resp.data else None
+    resp = _sb().table("products").insert(payload).execute()
+    row = resp.data[0] if resp.data else None
+    product_cache.put(row)
+    catalog.note(row)
+    return row
  
-def get_product_by_id(prod_id: int) -> Optional[Dict]:
+def get_product_by_id(prod_id: int, fresh: bool = False) -> Optional[Dict]:
+    """
+    Read-through cached lookup. Pass fresh=True when the stock value must be current.
+    """
+    if not fresh:
+        cached = product_cache.get(prod_id)
+        if cached is not None:
+            return cached
     resp = _sb().table("products").select("*").eq("prod_id", prod_id).limit(1).execute()
-    return resp.data[0] if resp.data else None
+    row = resp.data[0] if resp.data else None
+    product_cache.put(row)
+    return row
+ 
+def get_products_by_ids(prod_ids: List[int], fresh: bool = False) -> Dict[int, Dict]:
+    """
+    Fetch many products in one query. Returns {prod_id: row}; missing ids are absent.
+    Cached rows are reused unless fresh=True.
+    """
+    ids = list(dict.fromkeys(prod_ids))
+    found = {}
+    if not fresh:
+        for pid in ids:
+            cached = product_cache.get(pid)
+            if cached is not None:
+                found[pid] = cached
+        ids = [pid for pid in ids if pid not in found]
+    if not ids:
+        return found
+    resp = _sb().table("products").select("*").in_("prod_id", ids).execute()
+    for row in resp.data or []:
+        product_cache.put(row)
+        found[row["prod_id"]] = row
+    return found
  
-def get_product_by_sku(sku: str) -> Optional[Dict]:
+def get_product_by_sku(sku: str, fresh: bool = False) -> Optional[Dict]:
+    if not fresh:
+        cached = product_cache.get_by_key(sku)
+        if cached is not None:
+            return cached
     resp = _sb().table("products").select("*").eq("sku", sku).limit(1).execute()
-    return resp.data[0] if resp.data else None
+    row = resp.data[0] if resp.data else None
+    product_cache.put(row)
+    return row
  
 def update_product(prod_id: int, fields: Dict) -> Optional[Dict]:
     """
-    Update and then return the updated row (two-step).
+    Update and return the updated row in one round trip (None if the product doesn't exist).
     """
-    _sb().table("products").update(fields).eq("prod_id", prod_id).execute()
-    resp = _sb().table("products").select("*").eq("prod_id", prod_id).limit(1).execute()
-    return resp.data[0] if resp.data else None
+    product_cache.invalidate(prod_id)
+    resp = _sb().table("products").update(fields).eq("prod_id", prod_id).execute()
+    row = resp.data[0] if resp.data else None
+    product_cache.put(row)
+    catalog.note(row)
+    return row
+ 
+class InsufficientStock(ValueError):
+    """
+    Raised by reserve_stock; `shortages` lists {prod_id, name, stock, requested}
+    (name/stock are None for products that don't exist).
+    """
+    def __init__(self, shortages: List[Dict]):
+        self.shortages = shortages
+        super().__init__(f"Insufficient stock for product ids {[s['prod_id'] for s in shortages]}")
+ 
+# Called with the updated rows whenever this process changes stock (orders, cancellations, restocks)
+_stock_listeners: List[Callable[[List[Dict]], None]] = []
+
+def add_stock_listener(fn: Callable[[List[Dict]], None]) -> None:
+    _stock_listeners.append(fn)
+
+def remove_stock_listener(fn: Callable[[List[Dict]], None]) -> None:
+    if fn in _stock_listeners:
+        _stock_listeners.remove(fn)
+
+def _stock_changed(rows: List[Dict]) -> None:
+    for fn in list(_stock_listeners):
+        fn(rows)
+
+def _stock_items(quantities: Dict[int, int]) -> List[Dict]:
+    items = []
+    for pid, qty in quantities.items():
+        if qty <= 0:
+            raise ValueError(f"Quantity for product id {pid} must be positive.")
+        items.append({"prod_id": pid, "quantity": qty})
+    return items
+ 
+def reserve_stock(quantities: Dict[int, int]) -> Dict[int, Dict]:
+    """
+    Atomically take quantities {prod_id: qty} out of stock, all or nothing.
+    Returns the updated rows {prod_id: row}; raises InsufficientStock and changes nothing
+    if any product is missing or short.
+    """
+    product_cache.invalidate(*quantities)
+    resp = _sb().rpc("reserve_stock", {"p_items": _stock_items(quantities)}).execute()
+    result = resp.data or {}
+    if not result.get("ok"):
+        raise InsufficientStock(result.get("shortages") or [])
+    rows = {row["prod_id"]: row for row in result.get("products") or []}
+    for row in rows.values():
+        product_cache.put(row)
+        catalog.note(row)
+    _stock_changed(list(rows.values()))
+    return rows
+ 
+def release_stock(quantities: Dict[int, int]) -> Dict[int, Dict]:
+    """
+    Atomically add quantities {prod_id: qty} back to stock. Returns updated rows; missing ids are absent.
+    """
+    product_cache.invalidate(*quantities)
+    resp = _sb().rpc("release_stock", {"p_items": _stock_items(quantities)}).execute()
+    rows = {row["prod_id"]: row for row in resp.data or []}
+    for row in rows.values():
+        product_cache.put(row)
+        catalog.note(row)
+    _stock_changed(list(rows.values()))
+    return rows
  
 def delete_product(prod_id: int) -> Optional[Dict]:
-    # fetch row before delete (so we can return it)
-    resp_before = _sb().table("products").select("*").eq("prod_id", prod_id).limit(1).execute()
-    row = resp_before.data[0] if resp_before.data else None
-    _sb().table("products").delete().eq("prod_id", prod_id).execute()
-    return row
+    # delete returns the removed row, so no select beforehand
+    resp = _sb().table("products").delete().eq("prod_id", prod_id).execute()
+    product_cache.invalidate(prod_id)
+    catalog.discard(prod_id)
+    return resp.data[0] if resp.data else None
  
 def list_products(limit: int = 100, category: str | None = None) -> List[Dict]:
+    if snapshot_enabled():
+        return list(catalog.ensure_fresh().rows(limit, category))
     q = _sb().table("products").select("*").order("prod_id", desc=False).limit(limit)
     if category:
         q = q.eq("category", category)
     resp = q.execute()
-    return resp.data or []
\ No newline at end of file
+    return resp.data or []
+ 
+def get_prices(prod_ids: List[int]) -> Dict[int, float]:
+    """
+    {prod_id: price} for the given ids, from the catalog snapshot when enabled.
+    """
+    if snapshot_enabled():
+        return catalog.ensure_fresh().prices_for(prod_ids)
+    ids = list(dict.fromkeys(prod_ids))
+    if not ids:
+        return {}
+    resp = _sb().table("products").select("prod_id, price").in_("prod_id", ids).execute()
+    return {row["prod_id"]: row["price"] for row in resp.data or []}
+
+def scan_products(category: str | None = None, page_size: int | None = None,
+                  prefetch: bool = False) -> Iterator[Dict]:
+    """
+    Stream every product in prod_id order, page by page.
+    """
+    where = (lambda q: q.eq("category", category)) if category else None
+    return scan_table("products", "prod_id", page_size=page_size, where=where, prefetch=prefetch)
+ 
+# Columns of a low-stock row (plus its threshold), the same shape as the low_stock_products function returns
+LOW_STOCK_COLUMNS = "prod_id, name, sku, category, stock"
+
+def scan_low_stock(threshold: int, page_size: int | None = None) -> Iterator[Dict]:
+    """
+    Stream {prod_id, name, sku, category, stock} for products with stock <= threshold
+    in prod_id order (filtered in the database).
+    """
+    return scan_table("products", "prod_id", LOW_STOCK_COLUMNS, page_size=page_size,
+                      where=lambda q: q.lte("stock", threshold))
+ 
+def scan_below_reorder_level(default: int = 5, page_size: int | None = None) -> Iterator[Dict]:
+    """
+    Stream {prod_id, name, sku, category, stock, threshold} for products at or below their
+    reorder level: the sku's threshold, else the category's, else `default`.
+    """
+    page_size = page_size or SCAN_PAGE_SIZE
+    after = None
+    while True:
+        resp = _sb().rpc("low_stock_products", {
+            "p_default": default, "p_after": after, "p_page_size": page_size
+        }).execute()
+        page = resp.data or []
+        yield from page
+        if len(page) < page_size:
+            return
+        after = page[-1]["prod_id"]
+ 
+def _threshold_scope(category: str | None, sku: str | None) -> Dict:
+    if (category is None) == (sku is None):
+        raise ValueError("Give exactly one of category or sku.")
+    return {"scope": "category", "target": category} if category is not None else {"scope": "sku", "target": sku}
+ 
+def set_reorder_threshold(threshold: int, category: str | None = None, sku: str | None = None) -> Dict:
+    if threshold < 0:
+        raise ValueError("Threshold must not be negative.")
+    row = dict(_threshold_scope(category, sku), threshold=threshold)
+    resp = _sb().table("reorder_thresholds").upsert(row, on_conflict="scope,target").execute()
+    return resp.data[0] if resp.data else row
+ 
+def clear_reorder_threshold(category: str | None = None, sku: str | None = None) -> Optional[Dict]:
+    scope = _threshold_scope(category, sku)
+    resp = _sb().table("reorder_thresholds").delete() \
+        .eq("scope", scope["scope"]).eq("target", scope["target"]).execute()
+    return resp.data[0] if resp.data else None
+ 
+def list_reorder_thresholds() -> List[Dict]:
+    resp = _sb().table("reorder_thresholds").select("*").order("scope").order("target").execute()
+    return resp.data or []
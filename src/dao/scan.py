@@ -0,0 +1,53 @@
+# src/dao/scan.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+from src.config import get_supabase
+
+# PostgREST caps responses at max-rows (1000 on Supabase), so pages never exceed that by default
+SCAN_PAGE_SIZE = int(os.getenv("RETAIL_SCAN_PAGE_SIZE", "1000"))
+
+def _sb():
+    return get_supabase()
+
+def _fetch_page(table: str, key: str, columns: str, after, page_size: int,
+                where: Optional[Callable]) -> List[Dict]:
+    q = _sb().table(table).select(columns)
+    if where:
+        q = where(q)
+    if after is not None:
+        q = q.gt(key, after)
+    resp = q.order(key, desc=False).limit(page_size).execute()
+    return resp.data or []
+
+def scan_table(table: str, key: str, columns: str = "*", page_size: int | None = None,
+               where: Optional[Callable] = None, prefetch: bool = False,
+               start_after=None) -> Iterator[Dict]:
+    """
+    Yield every matching row of `table` in `key` order, one keyset page at a time
+    (WHERE key > last ORDER BY key LIMIT page_size), so memory stays at one or two pages.
+    `where` receives the query builder and adds filters. With prefetch=True the next page
+    is requested in the background while the current one is consumed.
+    `columns` must include `key`.
+    """
+    page_size = page_size or SCAN_PAGE_SIZE
+    if not prefetch:
+        after = start_after
+        while True:
+            page = _fetch_page(table, key, columns, after, page_size, where)
+            yield from page
+            if len(page) < page_size:
+                return
+            after = page[-1][key]
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(_fetch_page, table, key, columns, start_after, page_size, where)
+        while True:
+            page = future.result()
+            if len(page) == page_size:
+                future = pool.submit(_fetch_page, table, key, columns, page[-1][key], page_size, where)
+            else:
+                future = None
+            yield from page
+            if future is None:
+                return
@@ -0,0 +1,223 @@
+# src/instrumentation.py
+"""
+Per-query instrumentation. While the profiler is enabled, get_supabase() hands out
+a wrapped client that times every execute() and records table, operation, filter
+shape, row count and payload sizes.
+"""
+import inspect
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List
+
+_OPS = ("select", "insert", "upsert", "update", "delete")
+_FILTERS = ("eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "is_", "in_",
+            "order", "limit", "range", "offset")
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def _size(obj) -> int:
+    if obj is None:
+        return 0
+    return len(json.dumps(obj, default=str))
+
+
+class QueryProfiler:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.records: List[Dict] = []
+        self._t0 = time.perf_counter()
+
+    def enable(self) -> None:
+        self.reset()
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.records = []
+            self._t0 = time.perf_counter()
+
+    def record(self, table: str, op: str, filters: List[str], started: float, ended: float,
+               rows: int, request_bytes: int, response_bytes: int, error: str | None = None) -> None:
+        with self._lock:
+            self.records.append({
+                "table": table,
+                "op": op,
+                "filters": ",".join(filters),
+                "rows": rows,
+                "request_bytes": request_bytes,
+                "response_bytes": response_bytes,
+                "latency_ms": (ended - started) * 1000.0,
+                "start_ms": (started - self._t0) * 1000.0,
+                "thread": threading.get_ident(),
+                "error": error,
+            })
+
+    def summary(self) -> Dict:
+        """
+        Aggregate by table/operation/filter shape: counts, rows, bytes and latency percentiles.
+        """
+        with self._lock:
+            records = list(self.records)
+        groups: Dict[str, List[Dict]] = {}
+        for r in records:
+            groups.setdefault(f"{r['table']}.{r['op']}({r['filters']})", []).append(r)
+
+        def stats(rs: List[Dict]) -> Dict:
+            lat = sorted(r["latency_ms"] for r in rs)
+            return {
+                "count": len(rs),
+                "errors": sum(1 for r in rs if r["error"]),
+                "rows": sum(r["rows"] for r in rs),
+                "request_bytes": sum(r["request_bytes"] for r in rs),
+                "response_bytes": sum(r["response_bytes"] for r in rs),
+                "total_ms": round(sum(lat), 3),
+                "p50_ms": round(_percentile(lat, 50), 3),
+                "p95_ms": round(_percentile(lat, 95), 3),
+                "p99_ms": round(_percentile(lat, 99), 3),
+            }
+
+        by_query = {k: stats(v) for k, v in sorted(groups.items(), key=lambda kv: -sum(r["latency_ms"] for r in kv[1]))}
+        return {"total": stats(records), "queries": by_query}
+
+    def format_summary(self) -> str:
+        s = self.summary()
+        lines = [f"{'query':<60} {'n':>4} {'rows':>7} {'bytes':>9} {'total':>9} {'p50':>8} {'p95':>8} {'p99':>8}"]
+        for name, q in list(s["queries"].items()) + [("TOTAL", s["total"])]:
+            lines.append(f"{name[:60]:<60} {q['count']:>4} {q['rows']:>7} "
+                         f"{q['request_bytes'] + q['response_bytes']:>9} {q['total_ms']:>8.1f}ms "
+                         f"{q['p50_ms']:>6.1f}ms {q['p95_ms']:>6.1f}ms {q['p99_ms']:>6.1f}ms")
+        return "\n".join(lines)
+
+    def export_json(self, path: str) -> None:
+        with self._lock:
+            records = list(self.records)
+        with open(path, "w") as f:
+            json.dump({"summary": self.summary(), "queries": records}, f, indent=2)
+
+    def export_trace(self, path: str) -> None:
+        """
+        Chrome/Perfetto trace-event file (open in chrome://tracing or ui.perfetto.dev).
+        """
+        with self._lock:
+            records = list(self.records)
+        events = [{
+            "name": f"{r['table']}.{r['op']}",
+            "cat": "query",
+            "ph": "X",
+            "ts": round(r["start_ms"] * 1000.0, 1),
+            "dur": round(r["latency_ms"] * 1000.0, 1),
+            "pid": os.getpid(),
+            "tid": r["thread"],
+            "args": {k: r[k] for k in ("filters", "rows", "request_bytes", "response_bytes", "error")},
+        } for r in records]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+profiler = QueryProfiler()
+
+
+class InstrumentedClient:
+    def __init__(self, client, profiler: QueryProfiler):
+        self._client = client
+        self._profiler = profiler
+
+    def table(self, name: str) -> "_InstrumentedQuery":
+        return _InstrumentedQuery(self._profiler, self._client.table(name), name)
+
+    from_ = table
+
+    def rpc(self, fn: str, params: Dict | None = None) -> "_InstrumentedQuery":
+        q = _InstrumentedQuery(self._profiler, self._client.rpc(fn, params), fn, op="rpc")
+        q._request_bytes = _size(params)
+        return q
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class _InstrumentedQuery:
+    def __init__(self, profiler: QueryProfiler, inner, table: str, op: str = "select"):
+        self._profiler = profiler
+        self._inner = inner
+        self._table = table
+        self._op = op
+        self._filters: List[str] = []
+        self._request_bytes = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            if name in _OPS:
+                self._op = name
+                if args and name != "select":
+                    self._request_bytes = _size(args[0])
+            elif name in _FILTERS:
+                # Record the shape only (column and operator), never the values
+                shape = f"{args[0]}:{name.rstrip('_')}" if args and isinstance(args[0], str) else name
+                if name == "in_" and len(args) > 1 and hasattr(args[1], "__len__"):
+                    shape += f"[{len(args[1])}]"
+                self._filters.append(shape)
+            result = attr(*args, **kwargs)
+            if result is self._inner or hasattr(result, "execute"):
+                self._inner = result
+                return self
+            return result
+        return call
+
+    def execute(self):
+        started = time.perf_counter()
+        try:
+            resp = self._inner.execute()
+        except Exception as e:
+            self._failed(started, e)
+            raise
+        if inspect.isawaitable(resp):
+            return self._execute_async(started, resp)
+        self._done(started, resp)
+        return resp
+
+    async def _execute_async(self, started: float, pending):
+        try:
+            resp = await pending
+        except Exception as e:
+            self._failed(started, e)
+            raise
+        self._done(started, resp)
+        return resp
+
+    def _failed(self, started: float, error: Exception) -> None:
+        self._profiler.record(self._table, self._op, self._filters, started, time.perf_counter(),
+                              0, self._request_bytes, 0, error=type(error).__name__)
+
+    def _done(self, started: float, resp) -> None:
+        ended = time.perf_counter()
+        data = getattr(resp, "data", None)
+        rows = len(data) if isinstance(data, list) else (1 if data else 0)
+        self._profiler.record(self._table, self._op, self._filters, started, ended,
+                              rows, self._request_bytes, _size(data))
+
+
+def instrument(client):
+    """
+    Wrap `client` so its queries are recorded, if profiling is on.
+    """
+    if not profiler.enabled or isinstance(client, InstrumentedClient):
+        return client
+    return InstrumentedClient(client, profiler)
@@ -0,0 +1,384 @@
+# src/resilience.py
+"""
+Resilience layer around the backend client. get_supabase() hands out a wrapped
+client whose execute() adds:
+
+  - single-flight reads: identical reads already in flight from another thread
+    are joined instead of sent again (followers get a copy of the leader's response)
+  - retries with jittered exponential backoff for transient failures (see
+    dao/errors.is_transient), but only for operations that are safe to repeat:
+    selects, read-only rpc functions and writes run under idempotent()
+  - a circuit breaker that fails fast with BackendUnavailable once the backend
+    keeps failing, and lets a single probe through after a cool-down
+  - counters for all of the above (stats())
+
+A read only joins a flight that started after this process's last write, so a
+thread always sees its own earlier writes. Async clients get the same behaviour
+(flights are then shared within an event loop). Disable with RETAIL_RESILIENCE=0.
+"""
+import asyncio
+import copy
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from src.dao.errors import is_transient
+
+RESILIENCE = os.getenv("RETAIL_RESILIENCE", "1").lower() in ("1", "true", "yes")
+COALESCE_READS = os.getenv("RETAIL_COALESCE_READS", "1").lower() in ("1", "true", "yes")
+# Attempts per retryable operation (1 disables retries) and the backoff bounds between them
+RETRY_ATTEMPTS = int(os.getenv("RETAIL_RETRY_ATTEMPTS", "3"))
+RETRY_BASE_MS = float(os.getenv("RETAIL_RETRY_BASE_MS", "50"))
+RETRY_MAX_MS = float(os.getenv("RETAIL_RETRY_MAX_MS", "1000"))
+# Consecutive transient failures that open the breaker, and how long it stays open
+BREAKER_FAILURES = int(os.getenv("RETAIL_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("RETAIL_BREAKER_RESET_SECONDS", "30"))
+
+_WRITE_OPS = ("insert", "upsert", "update", "delete")
+# Functions declared STABLE in tables_used.txt; every other rpc may write
+READ_ONLY_RPCS = frozenset({
+    "report_top_selling_products", "report_paid_revenue", "report_orders_by_customer",
+    "report_verify_aggregates", "low_stock_products", "analytics_payment_columns", "analytics_item_columns",
+})
+
+
+class BackendUnavailable(RuntimeError):
+    """
+    Raised without contacting the backend while the circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive transient failures; open -> half-open
+    after `reset_seconds`, when one probe call is let through: success closes the
+    breaker, failure opens it again.
+    """
+
+    def __init__(self, failures: int = 5, reset_seconds: float = 30.0):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    def before_call(self) -> bool:
+        """
+        Raise BackendUnavailable unless the call may go ahead; True if it is the half-open
+        probe, which the caller must finish with end_probe() whatever happens.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return False
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+        raise BackendUnavailable("Backend unavailable: too many recent failures, not sending the request.")
+
+    def end_probe(self) -> None:
+        # A probe interrupted without an outcome (e.g. KeyboardInterrupt) lets the next call probe instead
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive = 0
+            self._probing = False
+            self.state = "closed"
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            self._probing = False
+            if self.state == "half_open" or (self.state == "closed" and self._consecutive >= self.failures):
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self.opened += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._consecutive = 0
+            self._probing = False
+            self.opened = self.rejected = 0
+
+
+class _Flight:
+    __slots__ = ("done", "response", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class Resilience:
+    """
+    Process-wide state shared by every wrapped client: breaker, in-flight reads, counters.
+    """
+
+    def __init__(self):
+        self.enabled = RESILIENCE
+        self.coalesce = COALESCE_READS
+        self.attempts = RETRY_ATTEMPTS
+        self.breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET_SECONDS)
+        self._lock = threading.Lock()
+        self._flights: Dict[tuple, _Flight] = {}
+        # (id(loop), epoch, key) -> [future of the leading coroutine's response, followers]
+        self._async_flights: Dict[tuple, list] = {}
+        # Bumped after every write, so reads never join a flight that may predate it
+        self._write_epoch = 0
+        self._local = threading.local()
+        self._rng = random.Random()
+        self.counters: Dict[str, int] = {}
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {"enabled": self.enabled, "breaker": self.breaker.state,
+                "breaker_opened": self.breaker.opened, "breaker_rejected": self.breaker.rejected, **counters}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+        self.breaker.reset()
+
+    @contextmanager
+    def idempotent(self):
+        """
+        Writes executed in this thread inside the block may be retried (e.g. deletes by primary key).
+        """
+        previous = getattr(self._local, "idempotent", False)
+        self._local.idempotent = True
+        try:
+            yield
+        finally:
+            self._local.idempotent = previous
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": uniform over [0, min(max, base * 2^attempt)]
+        return self._rng.uniform(0, min(RETRY_MAX_MS, RETRY_BASE_MS * (2 ** attempt))) / 1000.0
+
+    def _call(self, execute, retryable: bool):
+        attempts = self.attempts if retryable else 1
+        for attempt in range(attempts):
+            probe = self.breaker.before_call()
+            try:
+                resp = execute()
+            except Exception as e:
+                if not is_transient(e):
+                    # The backend answered; the request itself was at fault
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                self._count("transient_failures")
+                if attempt + 1 >= attempts:
+                    if retryable and attempts > 1:
+                        self._count("retries_exhausted")
+                    raise
+                self._count("retries")
+            else:
+                self.breaker.record_success()
+                return resp
+            finally:
+                if probe:
+                    self.breaker.end_probe()
+            time.sleep(self._backoff(attempt))
+
+    def execute(self, execute, key: Optional[tuple], read: bool):
+        """
+        Run one request (`execute` sends it). `key` identifies a read for coalescing.
+        """
+        self._count("reads" if read else "writes")
+        if not read:
+            try:
+                return self._call(execute, getattr(self._local, "idempotent", False))
+            finally:
+                with self._lock:
+                    self._write_epoch += 1
+        if not self.coalesce or key is None:
+            return self._call(execute, True)
+
+        with self._lock:
+            key = (self._write_epoch, key)
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+        if not leader:
+            flight.done.wait()
+            self._count("coalesced")
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.response)
+        try:
+            resp = self._call(execute, True)
+        except BaseException as e:
+            flight.error = e
+            self._land(key, flight)
+            raise
+        self._land(key, flight, resp)
+        return resp
+
+    async def _call_async(self, execute, retryable: bool):
+        attempts = self.attempts if retryable else 1
+        for attempt in range(attempts):
+            probe = self.breaker.before_call()
+            try:
+                resp = await execute()
+            except Exception as e:
+                if not is_transient(e):
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                self._count("transient_failures")
+                if attempt + 1 >= attempts:
+                    if retryable and attempts > 1:
+                        self._count("retries_exhausted")
+                    raise
+                self._count("retries")
+            else:
+                self.breaker.record_success()
+                return resp
+            finally:
+                if probe:
+                    self.breaker.end_probe()
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def execute_async(self, execute, key: Optional[tuple], read: bool):
+        """
+        execute() for async clients: `execute` returns an awaitable. Reads coalesce per event loop.
+        """
+        self._count("reads" if read else "writes")
+        if not read:
+            try:
+                return await self._call_async(execute, getattr(self._local, "idempotent", False))
+            finally:
+                with self._lock:
+                    self._write_epoch += 1
+        if not self.coalesce or key is None:
+            return await self._call_async(execute, True)
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            key = (id(loop), self._write_epoch, key)
+            entry = self._async_flights.get(key)
+            leader = entry is None
+            if leader:
+                entry = self._async_flights[key] = [loop.create_future(), 0]
+            else:
+                entry[1] += 1
+        flight = entry[0]
+        if not leader:
+            # shield: a cancelled follower must not cancel the leader's future
+            resp = await asyncio.shield(flight)
+            self._count("coalesced")
+            return copy.deepcopy(resp)
+        try:
+            resp = await self._call_async(execute, True)
+        except BaseException as e:
+            with self._lock:
+                del self._async_flights[key]
+            if isinstance(e, asyncio.CancelledError):
+                flight.cancel()
+            else:
+                flight.set_exception(e)
+                # Mark it retrieved: with no followers nobody else will
+                flight.exception()
+            raise
+        with self._lock:
+            del self._async_flights[key]
+            followers = entry[1]
+        # Followers resume after this coroutine returns, so they copy a snapshot taken now
+        flight.set_result(copy.deepcopy(resp) if followers else None)
+        return resp
+
+    def _land(self, key: tuple, flight: _Flight, resp=None) -> None:
+        with self._lock:
+            del self._flights[key]
+            followers = flight.followers
+        if followers and flight.error is None:
+            # Followers copy this snapshot, taken before the leader's caller can modify the rows
+            flight.response = copy.deepcopy(resp)
+        flight.done.set()
+
+
+resilience = Resilience()
+
+
+class ResilientClient:
+    def __init__(self, client, state: Resilience, is_async: bool = False):
+        self._client = client
+        self._state = state
+        self._query = _AsyncResilientQuery if is_async else _ResilientQuery
+
+    def table(self, name: str) -> "_ResilientQuery":
+        return self._query(self._state, self._client.table(name), ("table", name))
+
+    from_ = table
+
+    def rpc(self, fn: str, params: Dict | None = None) -> "_ResilientQuery":
+        q = self._query(self._state, self._client.rpc(fn, params), ("rpc", fn, repr(params)))
+        q._read = fn in READ_ONLY_RPCS
+        return q
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class _ResilientQuery:
+    def __init__(self, state: Resilience, inner, target: tuple):
+        self._state = state
+        self._inner = inner
+        self._calls = [target]
+        self._read = True
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            if name in _WRITE_OPS:
+                self._read = False
+            self._calls.append((name, repr(args), repr(sorted(kwargs.items()))))
+            result = attr(*args, **kwargs)
+            if result is self._inner or hasattr(result, "execute"):
+                self._inner = result
+                return self
+            return result
+        return call
+
+    def execute(self):
+        return self._state.execute(self._inner.execute, tuple(self._calls) if self._read else None, self._read)
+
+
+class _AsyncResilientQuery(_ResilientQuery):
+    async def execute(self):
+        return await self._state.execute_async(self._inner.execute, tuple(self._calls) if self._read else None,
+                                               self._read)
+
+
+def resilient(client, is_async: bool = False):
+    """
+    Wrap `client` in the resilience layer, if it's enabled. is_async: execute() returns an awaitable.
+    """
+    if not resilience.enabled or isinstance(client, ResilientClient):
+        return client
+    return ResilientClient(client, resilience, is_async)
@@ -0,0 +1,244 @@
+# src/services/analytics.py
+"""
+Time-bucketed sales analytics computed with NumPy.
+
+Payments and order lines for a date range are pulled in bulk as columnar pages
+(the analytics_*_columns database functions) into arrays. Revenue, sales, units
+and order counts are then grouped by day/week/month and optionally category or
+city with vectorised bincount/unique instead of Python loops, so arbitrary
+ranges and comparison periods stay interactive over millions of rows.
+
+Metrics:
+  revenue  PAID payment amounts by paid_at (the same figure as `report revenue`)
+  sales    order line totals (price * quantity) by order date, excluding cancelled orders
+  units    quantities sold by order date, excluding cancelled orders
+  orders   distinct non-cancelled orders by order date
+
+NumPy is optional for the rest of the app and only needed here.
+"""
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from src.config import get_supabase
+
+try:
+    import numpy as np
+except ImportError:  # optional: only the analytics reports need it
+    np = None
+
+# Rows per columnar page; these come back as one JSON value, so PostgREST's max-rows doesn't apply
+ANALYTICS_PAGE_SIZE = int(os.getenv("RETAIL_ANALYTICS_PAGE_SIZE", "50000"))
+
+BUCKETS = ("day", "week", "month", "total")
+DIMENSIONS = ("category", "city")
+METRICS = ("revenue", "sales", "units", "orders")
+# Label used for a missing category/city
+UNKNOWN = "(none)"
+
+def _sb():
+    return get_supabase()
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("Analytics needs NumPy; install it with `pip install numpy`.")
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def date_range(since=None, until=None, days: int = 30) -> Tuple[date, date]:
+    """
+    Normalise a [since, until) range of dates; defaults to the `days` days up to and including today.
+    """
+    until = _as_date(until) if until is not None else date.today() + timedelta(days=1)
+    since = _as_date(since) if since is not None else until - timedelta(days=days)
+    if since >= until:
+        raise ValueError("The start of the range must be before its end.")
+    return since, until
+
+
+class _Labels:
+    """
+    Maps category/city strings to dense integer codes while pages are loaded.
+    """
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def encode(self, values: List[Optional[str]]):
+        index, names = self.index, self.names
+
+        def code(v):
+            v = v or UNKNOWN
+            c = index.get(v)
+            if c is None:
+                c = index[v] = len(names)
+                names.append(v)
+            return c
+        return np.fromiter((code(v) for v in values), dtype=np.int32, count=len(values))
+
+
+def _load_columns(fn: str, key: str, since: date, until: date, numeric: Dict[str, str],
+                  labels: Tuple[str, ...], page_size: int | None) -> Dict:
+    _require_numpy()
+    page_size = page_size or ANALYTICS_PAGE_SIZE
+    encoders = {name: _Labels() for name in labels}
+    parts: Dict[str, list] = {name: [] for name in (*numeric, "day", *labels)}
+    after = None
+    while True:
+        page = _sb().rpc(fn, {"p_from": since.isoformat(), "p_to": until.isoformat(),
+                              "p_after": after, "p_limit": page_size}).execute().data or {}
+        n = len(page.get(key) or [])
+        if n:
+            for name, dtype in numeric.items():
+                parts[name].append(np.asarray(page[name], dtype=dtype))
+            parts["day"].append(np.asarray([str(d)[:10] for d in page["day"]], dtype="datetime64[D]"))
+            for name in labels:
+                parts[name].append(encoders[name].encode(page[name]))
+        if n < page_size:
+            break
+        after = page[key][-1]
+    cols = {}
+    for name, chunks in parts.items():
+        dtype = numeric.get(name) or ("datetime64[D]" if name == "day" else np.int32)
+        cols[name] = np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+    cols["labels"] = {name: enc.names for name, enc in encoders.items()}
+    return cols
+
+def load_payments(since, until, page_size: int | None = None) -> Dict:
+    """
+    PAID payments in [since, until) as arrays: payment_id, amount, day, city (codes into labels["city"]).
+    """
+    since, until = date_range(since, until)
+    return _load_columns("analytics_payment_columns", "payment_id", since, until,
+                         {"payment_id": "int64", "amount": "float64"}, ("city",), page_size)
+
+def load_items(since, until, page_size: int | None = None) -> Dict:
+    """
+    Lines of non-cancelled orders placed in [since, until) as arrays:
+    item_id, order_id, quantity, amount, day, category and city codes.
+    """
+    since, until = date_range(since, until)
+    return _load_columns("analytics_item_columns", "item_id", since, until,
+                         {"item_id": "int64", "order_id": "int64", "quantity": "int64", "amount": "float64"},
+                         ("category", "city"), page_size)
+
+def _distinct(values):
+    """
+    Sorted distinct values; a plain sort + mask, which is much faster than np.unique on large int arrays.
+    """
+    if not len(values):
+        return values
+    s = np.sort(values)
+    keep = np.empty(len(s), dtype=bool)
+    keep[0] = True
+    np.not_equal(s[1:], s[:-1], out=keep[1:])
+    return s[keep]
+
+def _bucket_index(day, bucket: str):
+    """
+    (bucket number per row, label per bucket) without sorting: buckets are numbered
+    from the earliest one present, labelled by their first day.
+    """
+    step = 1
+    if bucket == "month":
+        b = day.astype("datetime64[M]").astype("int64")
+    elif bucket == "total":
+        b = np.zeros(len(day), dtype=np.int64)
+    else:
+        b = day.astype("int64")
+        if bucket == "week":
+            # Weeks start on Monday; 1970-01-01 (day 0) was a Thursday
+            b = b - (b + 3) % 7
+            step = 7
+    lo = int(b.min())
+    idx = (b - lo) // step
+    starts = lo + np.arange(int(idx.max()) + 1) * step
+    if bucket == "month":
+        starts = starts.astype("datetime64[M]")
+    return idx, starts.astype("datetime64[D]").astype(str).tolist()
+
+def aggregate(cols: Dict, metric: str, bucket: str = "day", by: str | None = None) -> List[Dict]:
+    """
+    Group loaded columns into [{bucket, <by>, <metric>}] rows ordered by bucket then label.
+    `bucket` is the first day of each day/week/month (omitted for "total").
+    """
+    _require_numpy()
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket '{bucket}' (expected one of {', '.join(BUCKETS)})")
+    if by is not None and by not in cols.get("labels", {}):
+        raise ValueError(f"{metric} can't be broken down by {by}")
+    if not len(cols["day"]):
+        return []
+    bucket_idx, starts = _bucket_index(cols["day"], bucket)
+    n_groups = len(cols["labels"][by]) if by else 1
+    key = bucket_idx * n_groups + (cols[by] if by else 0)
+    size = len(starts) * n_groups
+
+    if metric == "orders":
+        # Count each order once per (bucket, group): unique over a combined (key, order_id) integer
+        span = int(cols["order_id"].max()) + 1
+        values = np.bincount(_distinct(key * span + cols["order_id"]) // span, minlength=size)
+        present = values > 0
+    else:
+        weights = cols["quantity"] if metric == "units" else cols["amount"]
+        values = np.bincount(key, weights=weights, minlength=size)
+        present = np.bincount(key, minlength=size) > 0
+
+    rows = []
+    for k in np.flatnonzero(present):
+        row = {}
+        if bucket != "total":
+            row["bucket"] = starts[k // n_groups]
+        if by:
+            row[by] = cols["labels"][by][k % n_groups]
+        v = values[k]
+        row[metric] = int(v) if metric in ("units", "orders") else round(float(v), 2)
+        rows.append(row)
+    if by:
+        rows.sort(key=lambda r: (r.get("bucket", ""), r[by]))
+    return rows
+
+def _total(cols: Dict, metric: str):
+    if metric == "orders":
+        return int(len(_distinct(cols["order_id"])))
+    if metric == "units":
+        return int(cols["quantity"].sum())
+    return round(float(cols["amount"].sum()), 2)
+
+def _load_for(metric: str, since: date, until: date, page_size: int | None) -> Dict:
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}' (expected one of {', '.join(METRICS)})")
+    return (load_payments if metric == "revenue" else load_items)(since, until, page_size)
+
+def breakdown(metric: str = "revenue", since=None, until=None, bucket: str = "day", by: str | None = None,
+              compare=None, page_size: int | None = None) -> Dict:
+    """
+    `metric` over [since, until) per bucket (and per category/city with `by`).
+    compare="previous" adds the same figures for the equally long period just before;
+    a (since, until) tuple compares against that range instead.
+    Revenue is recorded per payment, so only sales/units/orders break down by category.
+    """
+    if by == "category" and metric == "revenue":
+        raise ValueError("Revenue is recorded per payment; use the sales metric for a category breakdown.")
+    since, until = date_range(since, until)
+    cols = _load_for(metric, since, until, page_size)
+    result = {"metric": metric, "from": since.isoformat(), "to": until.isoformat(), "bucket": bucket, "by": by,
+              "total": _total(cols, metric), "series": aggregate(cols, metric, bucket, by)}
+    if compare is not None:
+        if compare == "previous":
+            c_since, c_until = since - (until - since), since
+        else:
+            c_since, c_until = date_range(*compare)
+        previous = _load_for(metric, c_since, c_until, page_size)
+        prev_total = _total(previous, metric)
+        result["compare"] = {
+            "from": c_since.isoformat(), "to": c_until.isoformat(), "total": prev_total,
+            "change": round(result["total"] - prev_total, 2),
+            "change_pct": round((result["total"] - prev_total) * 100.0 / prev_total, 2) if prev_total else None,
+            "series": aggregate(previous, metric, bucket, by),
+        }
+    return result
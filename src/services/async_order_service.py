@@ -0,0 +1,146 @@
+# src/services/async_order_service.py
+"""
+Async variant of order_service. Independent lookups and writes run concurrently
+(bounded by RETAIL_ASYNC_CONCURRENCY), so a call costs roughly its slowest
+dependent chain of queries rather than the sum of all of them.
+"""
+import asyncio
+from datetime import datetime
+from src.config import get_async_supabase
+from src.async_support import gather_bounded
+from src.dao import async_customer_dao, async_product_dao
+from src.services import report_aggregates
+from src.services.order_service import ORDER_DETAILS_SELECT, _shape_order_details, _raise_shortage
+
+async def _sb():
+    return await get_async_supabase()
+
+async def create_order(customer_id: int, items: list[dict]) -> dict:
+    demand = {}
+    for item in items:
+        demand[item["prod_id"]] = demand.get(item["prod_id"], 0) + item["quantity"]
+
+    # Check the customer before reserving, so an order for an unknown customer never holds stock
+    customer = await async_customer_dao.get_customer_by_id(customer_id)
+    if not customer:
+        raise ValueError(f"Customer with id {customer_id} does not exist.")
+    products = await _reserve_basket(items, demand)
+    total_amount = 0
+    for item in items:
+        total_amount += products[item["prod_id"]]["price"] * item["quantity"]
+
+    sb = await _sb()
+    order_id = None
+    try:
+        order_resp = await sb.table("orders").insert({
+            "cust_id": customer_id,
+            "total_amount": total_amount,
+            "status": "PLACED"
+        }).execute()
+        order_id = order_resp.data[0]["order_id"]
+
+        # Items and the pending payment only depend on the new order id
+        await asyncio.gather(
+            sb.table("order_items").insert([
+                {
+                    "order_id": order_id,
+                    "prod_id": item["prod_id"],
+                    "quantity": item["quantity"],
+                    "price": products[item["prod_id"]]["price"]
+                }
+                for item in items
+            ]).execute(),
+            sb.table("payments").insert({
+                "order_id": order_id,
+                "amount": total_amount,
+                "status": "PENDING"
+            }).execute(),
+        )
+    except Exception:
+        # Undo a half-written order (items and payment cascade), then hand the reserved stock back
+        if order_id is not None:
+            await sb.table("orders").delete().eq("order_id", order_id).execute()
+        await async_product_dao.release_stock(demand)
+        raise
+    await asyncio.to_thread(report_aggregates.record_order_created, customer_id, demand)
+    return await get_order_details(order_id)
+
+async def _reserve_basket(items: list[dict], demand: dict) -> dict:
+    try:
+        return await async_product_dao.reserve_stock(demand)
+    except async_product_dao.InsufficientStock as e:
+        # Same per-line messages as order_service.create_order
+        _raise_shortage(items, e)
+        raise
+
+async def process_payment(order_id: int, method: str) -> dict:
+    sb = await _sb()
+    payment = await sb.table("payments").select("*").eq("order_id", order_id).limit(1).execute()
+    if not payment.data:
+        raise ValueError("Payment record not found for this order.")
+    updated, _ = await asyncio.gather(
+        sb.table("payments").update({
+            "status": "PAID",
+            "method": method,
+            "paid_at": datetime.now().isoformat()
+        }).eq("order_id", order_id).execute(),
+        sb.table("orders").update({"status": "COMPLETED"}).eq("order_id", order_id).execute(),
+    )
+    await asyncio.to_thread(report_aggregates.record_payment_change, payment.data[0],
+                            updated.data[0] if updated.data else None)
+    return await get_order_details(order_id)
+
+async def get_order_details(order_id: int) -> dict:
+    sb = await _sb()
+    order = await sb.table("orders").select(ORDER_DETAILS_SELECT).eq("order_id", order_id).limit(1).execute()
+    if not order.data:
+        raise ValueError("Order not found.")
+    return _shape_order_details(order.data[0])
+
+async def get_many_order_details(order_ids: list[int], limit: int | None = None) -> list[dict]:
+    """
+    Load several orders concurrently; results keep the order of `order_ids`.
+    """
+    return await gather_bounded((get_order_details(oid) for oid in order_ids), limit)
+
+async def get_orders_by_customer(customer_id: int) -> list:
+    sb = await _sb()
+    orders = await sb.table("orders").select("*").eq("cust_id", customer_id).order("order_id", desc=False).execute()
+    return orders.data or []
+
+async def _transition(order_id: int, to_status: str, action: str) -> None:
+    """
+    Conditional PLACED -> `to_status` update; see order_service._transition.
+    """
+    sb = await _sb()
+    resp = await sb.table("orders").update({"status": to_status}) \
+        .eq("order_id", order_id).eq("status", "PLACED").execute()
+    if resp.data:
+        return
+    order = await sb.table("orders").select("order_id").eq("order_id", order_id).limit(1).execute()
+    if not order.data:
+        raise ValueError("Order not found.")
+    raise ValueError(f"Only orders with status 'PLACED' can be {action}.")
+
+async def cancel_order(order_id: int) -> dict:
+    await _transition(order_id, "CANCELLED", "cancelled")
+    sb = await _sb()
+    items = (await sb.table("order_items").select("*").eq("order_id", order_id).execute()).data or []
+    returned = {}
+    for item in items:
+        returned[item["prod_id"]] = returned.get(item["prod_id"], 0) + item["quantity"]
+
+    # Stock restore and refund are independent
+    _, refunded = await asyncio.gather(
+        async_product_dao.release_stock(returned) if returned else asyncio.sleep(0),
+        sb.table("payments").update({"status": "REFUNDED"}).eq("order_id", order_id).execute(),
+    )
+    for row in refunded.data or []:
+        # paid_at is only ever set when a payment is marked PAID
+        if row.get("paid_at"):
+            await asyncio.to_thread(report_aggregates.record_payment_change, dict(row, status="PAID"), row)
+    return await get_order_details(order_id)
+
+async def complete_order(order_id: int) -> dict:
+    await _transition(order_id, "COMPLETED", "completed")
+    return await get_order_details(order_id)
@@ -0,0 +1,29 @@
+# src/services/async_report_service.py
+import asyncio
+from src.services import report_service
+
+# The reports are single server-side aggregations; run them in worker threads so
+# a caller can await several at once.
+
+async def top_selling_products(limit: int = 5, since=None, until=None) -> list[dict]:
+    return await asyncio.to_thread(report_service.top_selling_products, limit, since, until)
+
+async def total_revenue_last_month(days: int = 30) -> float:
+    return await asyncio.to_thread(report_service.total_revenue_last_month, days)
+
+async def total_orders_by_customer(since=None, until=None) -> dict:
+    return await asyncio.to_thread(report_service.total_orders_by_customer, since, until)
+
+async def customers_with_more_than(n: int = 2, since=None, until=None) -> list:
+    return await asyncio.to_thread(report_service.customers_with_more_than, n, since, until)
+
+async def dashboard() -> dict:
+    """
+    All headline reports, fetched concurrently.
+    """
+    top5, revenue, big = await asyncio.gather(
+        top_selling_products(5),
+        total_revenue_last_month(),
+        customers_with_more_than(2),
+    )
+    return {"top_selling_products": top5, "revenue_last_30_days": revenue, "big_customers": big}
@@ -0,0 +1,136 @@
+# src/services/export_service.py
+"""
+Streaming extracts of orders, order_items and payments as NDJSON or CSV.
+
+Rows are read with keyset pagination (src/dao/scan.py) and written as they
+arrive, so an extract of any size runs in one or two pages of memory and can be
+piped straight into gzip. Date and status filters apply to the order; items
+and payments are exported for the matching orders, fetched as embedded
+resources of each page of orders.
+"""
+import csv
+import json
+from typing import Dict, Iterable, Iterator, List, TextIO
+from src.dao.scan import scan_table
+from src.services.report_service import _iso
+
+EXPORT_TABLES = {
+    "orders": "order_id",
+    "order_items": "item_id",
+    "payments": "payment_id",
+}
+
+# Columns of each exported table, in schema order
+EXPORT_COLUMNS = {
+    "orders": ["order_id", "cust_id", "order_date", "status", "total_amount"],
+    "order_items": ["item_id", "order_id", "prod_id", "quantity", "price"],
+    "payments": ["payment_id", "order_id", "amount", "method", "paid_at", "status"],
+}
+# Header of the flattened joined CSV (see flatten_joined); fixed, since the first order may lack items or payments
+JOINED_COLUMNS = (EXPORT_COLUMNS["orders"]
+                  + [f"item_{c}" for c in EXPORT_COLUMNS["order_items"] if c != "order_id"]
+                  + [f"payment_{c}" for c in EXPORT_COLUMNS["payments"] if c != "order_id"])
+
+def _order_filter(since=None, until=None, status: str | None = None):
+    if since is None and until is None and status is None:
+        return None
+
+    def where(q):
+        if since is not None:
+            q = q.gte("order_date", _iso(since))
+        if until is not None:
+            q = q.lt("order_date", _iso(until))
+        if status is not None:
+            q = q.eq("status", status)
+        return q
+    return where
+
+def export_rows(table: str, since=None, until=None, status: str | None = None,
+                page_size: int | None = None) -> Iterator[Dict]:
+    """
+    Yield every row of `table` (orders, order_items or payments) whose order falls in
+    [since, until) and has `status`, in primary-key order for unfiltered child tables
+    and in order_id order otherwise.
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Cannot export '{table}' (expected one of {', '.join(EXPORT_TABLES)})")
+    where = _order_filter(since, until, status)
+    if table == "orders":
+        yield from scan_table("orders", "order_id", page_size=page_size, where=where, prefetch=True)
+    elif where is None:
+        yield from scan_table(table, EXPORT_TABLES[table], page_size=page_size, prefetch=True)
+    else:
+        for order in scan_table("orders", "order_id", f"order_id, {table}(*)",
+                                page_size=page_size, where=where, prefetch=True):
+            yield from order.get(table) or []
+
+def export_orders_joined(since=None, until=None, status: str | None = None,
+                         page_size: int | None = None) -> Iterator[Dict]:
+    """
+    Yield each matching order with its `order_items` and `payments` embedded,
+    one round trip per page of orders.
+    """
+    yield from scan_table("orders", "order_id", "*, order_items(*), payments(*)",
+                          page_size=page_size, where=_order_filter(since, until, status), prefetch=True)
+
+def flatten_joined(orders: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    One flat row per order item (or per order without items) for tabular output:
+    order columns, then item_* and payment_* columns from the order's first payment.
+    """
+    for order in orders:
+        items = order.get("order_items") or [{}]
+        payments = order.get("payments") or [{}]
+        base = {k: v for k, v in order.items() if k not in ("order_items", "payments")}
+        payment = {f"payment_{k}": v for k, v in payments[0].items() if k != "order_id"}
+        for item in items:
+            row = dict(base)
+            row.update({f"item_{k}": v for k, v in item.items() if k != "order_id"})
+            row.update(payment)
+            yield row
+
+def write_ndjson(rows: Iterable[Dict], out: TextIO) -> int:
+    n = 0
+    for row in rows:
+        out.write(json.dumps(row, default=str, separators=(",", ":")) + "\n")
+        n += 1
+    return n
+
+def write_csv(rows: Iterable[Dict], out: TextIO, columns: List[str] | None = None) -> int:
+    """
+    Write rows as CSV with a header taken from `columns` or the first row.
+    Nested values are JSON-encoded; keys missing from the header are dropped.
+    """
+    writer = None
+    n = 0
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(out, fieldnames=columns or list(row), extrasaction="ignore")
+            writer.writeheader()
+        writer.writerow({k: json.dumps(v, default=str) if isinstance(v, (dict, list)) else v
+                         for k, v in row.items()})
+        n += 1
+    return n
+
+def export(table: str, out: TextIO, fmt: str = "ndjson", joined: bool = False, since=None, until=None,
+           status: str | None = None, page_size: int | None = None) -> int:
+    """
+    Stream an extract to `out`; returns the number of rows written.
+    With joined=True (orders only) NDJSON keeps items and payments nested and CSV
+    is flattened to one row per order item, under the JOINED_COLUMNS header.
+    """
+    columns = None
+    if joined:
+        if table != "orders":
+            raise ValueError("--joined is only supported for orders")
+        rows = export_orders_joined(since, until, status, page_size)
+        if fmt == "csv":
+            rows = flatten_joined(rows)
+            columns = JOINED_COLUMNS
+    else:
+        rows = export_rows(table, since, until, status, page_size)
+    if fmt == "ndjson":
+        return write_ndjson(rows, out)
+    if fmt == "csv":
+        return write_csv(rows, out, columns)
+    raise ValueError(f"Unsupported export format '{fmt}' (expected ndjson or csv)")
@@ -0,0 +1,187 @@
+# src/services/import_service.py
+"""
+Streaming bulk import of products and customers from CSV or JSONL files.
+
+Rows are validated with the same rules as `product add` / `customer add` and
+written in batches with one upsert per batch (ON CONFLICT DO NOTHING on the
+unique sku/email, so rows that already exist come back as per-row errors).
+A checkpoint file records the last committed line, so an interrupted import
+can be resumed without re-sending what was already written.
+"""
+import csv
+import json
+import os
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from src.config import get_supabase
+from src.dao.errors import is_transient
+from src.resilience import BackendUnavailable
+from src.services.product_service import ProductError
+
+IMPORT_BATCH_SIZE = int(os.getenv("RETAIL_IMPORT_BATCH_SIZE", "500"))
+
+def _sb():
+    return get_supabase()
+
+def read_rows(path: str, fmt: str | None = None) -> Iterator[Tuple[int, Dict]]:
+    """
+    Yield (line_number, row) from a CSV (with header) or JSONL file without loading it whole.
+    """
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv")
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        elif fmt == "jsonl":
+            for line_no, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        yield line_no, json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield line_no, {"__error__": f"Invalid JSON: {e.msg}"}
+        else:
+            raise ValueError(f"Unsupported import format '{fmt}' (expected csv or jsonl)")
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+def validate_product(row: Dict) -> Dict:
+    if _blank(row.get("name")) or _blank(row.get("sku")):
+        raise ProductError("name and sku are required")
+    try:
+        price = float(row["price"])
+    except (KeyError, TypeError, ValueError):
+        raise ProductError("price must be a number")
+    if price <= 0:
+        raise ProductError("Price must be greater than 0")
+    try:
+        stock = int(row.get("stock") or 0)
+    except (TypeError, ValueError):
+        raise ProductError("stock must be an integer")
+    payload = {"name": str(row["name"]).strip(), "sku": str(row["sku"]).strip(), "price": price, "stock": stock}
+    if not _blank(row.get("category")):
+        payload["category"] = str(row["category"]).strip()
+    return payload
+
+def validate_customer(row: Dict) -> Dict:
+    for field in ("name", "email", "phone"):
+        if _blank(row.get(field)):
+            raise ValueError(f"{field} is required")
+    payload = {"name": str(row["name"]).strip(), "email": str(row["email"]).strip(), "phone": str(row["phone"]).strip()}
+    if not _blank(row.get("city")):
+        payload["city"] = str(row["city"]).strip()
+    return payload
+
+def _load_checkpoint(path: str | None, source: str) -> int:
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        state = json.load(f)
+    if state.get("source") != os.path.abspath(source):
+        raise ValueError(f"Checkpoint {path} belongs to a different file: {state.get('source')}")
+    return int(state.get("line", 0))
+
+def _save_checkpoint(path: str | None, source: str, line: int, summary: Dict) -> None:
+    if not path:
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"source": os.path.abspath(source), "line": line, **summary}, f)
+    os.replace(tmp, path)
+
+def _backend_down(exc: Exception) -> bool:
+    # Failures that say nothing about the rows: the import stops before checkpointing so a resume retries them
+    return isinstance(exc, BackendUnavailable) or is_transient(exc)
+
+def _write_batch(table: str, key: str, batch: List[Tuple[int, Dict]]) -> Tuple[int, List[Dict]]:
+    """
+    Insert a batch with one upsert; returns (inserted, per-row errors).
+    Falls back to row-by-row inserts if the batch is rejected as a whole.
+    Transient backend errors are raised instead of being reported against the rows.
+    """
+    payload = [row for _, row in batch]
+    try:
+        resp = _sb().table(table).upsert(payload, on_conflict=key, ignore_duplicates=True).execute()
+    except Exception as e:
+        if _backend_down(e):
+            raise
+        inserted, errors = 0, []
+        for line_no, row in batch:
+            try:
+                resp = _sb().table(table).upsert(row, on_conflict=key, ignore_duplicates=True).execute()
+            except Exception as e:
+                if _backend_down(e):
+                    raise
+                errors.append({"line": line_no, key: row.get(key), "error": str(e)})
+                continue
+            if resp.data:
+                inserted += 1
+            else:
+                errors.append({"line": line_no, key: row[key], "error": f"{key} already exists"})
+        return inserted, errors
+    written = {r[key] for r in (resp.data or [])}
+    errors = [{"line": line_no, key: row[key], "error": f"{key} already exists"}
+              for line_no, row in batch if row[key] not in written]
+    return len(written), errors
+
+def _import(table: str, key: str, validate: Callable[[Dict], Dict], path: str, fmt: str | None,
+            batch_size: int | None, checkpoint: str | None, on_error: Optional[Callable[[Dict], None]]) -> Dict:
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    resume_after = _load_checkpoint(checkpoint, path)
+    summary = {"read": 0, "inserted": 0, "failed": 0, "skipped": 0}
+    seen_in_batch: set = set()
+    batch: List[Tuple[int, Dict]] = []
+    last_line = resume_after
+
+    def report(err: Dict) -> None:
+        summary["failed"] += 1
+        if on_error:
+            on_error(err)
+
+    def flush() -> None:
+        nonlocal batch
+        if batch:
+            inserted, errors = _write_batch(table, key, batch)
+            summary["inserted"] += inserted
+            for err in errors:
+                report(err)
+        _save_checkpoint(checkpoint, path, last_line, summary)
+        batch = []
+        seen_in_batch.clear()
+
+    for line_no, raw in read_rows(path, fmt):
+        if line_no <= resume_after:
+            summary["skipped"] += 1
+            continue
+        summary["read"] += 1
+        last_line = line_no
+        try:
+            if "__error__" in raw:
+                raise ValueError(raw["__error__"])
+            row = validate(raw)
+        except (ValueError, ProductError) as e:
+            report({"line": line_no, key: raw.get(key), "error": str(e)})
+            continue
+        if row[key] in seen_in_batch:
+            report({"line": line_no, key: row[key], "error": f"duplicate {key} in file"})
+            continue
+        seen_in_batch.add(row[key])
+        batch.append((line_no, row))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return summary
+
+def import_products(path: str, fmt: str | None = None, batch_size: int | None = None,
+                    checkpoint: str | None = None, on_error: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Import products (name, sku, price, stock, category). Returns counts; errors go to on_error.
+    """
+    return _import("products", "sku", validate_product, path, fmt, batch_size, checkpoint, on_error)
+
+def import_customers(path: str, fmt: str | None = None, batch_size: int | None = None,
+                     checkpoint: str | None = None, on_error: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Import customers (name, email, phone, city). Returns counts; errors go to on_error.
+    """
+    return _import("customers", "email", validate_customer, path, fmt, batch_size, checkpoint, on_error)
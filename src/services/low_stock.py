@@ -0,0 +1,157 @@
+# src/services/low_stock.py
+"""
+Low-stock checks against per-sku / per-category reorder levels (reorder_thresholds),
+filtered in the database and paged on prod_id, plus a watcher that only re-checks
+products whose stock moved since its last pass.
+
+The watcher learns about changes two ways: stock writes made in this process
+(product_dao stock listeners, fed by order placement, cancellation and restocks)
+and products.updated_at, which the database bumps on every update, for writes
+made elsewhere.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+from src.config import get_supabase
+from src.dao import catalog, product_dao
+from src.dao.scan import scan_table
+
+LOW_STOCK_THRESHOLD = int(os.getenv("RETAIL_LOW_STOCK_THRESHOLD", "5"))
+# How far behind the newest seen updated_at each watch pass re-reads (covers slow concurrent commits)
+WATCH_OVERLAP_SECONDS = float(os.getenv("RETAIL_LOW_STOCK_WATCH_OVERLAP", "5"))
+
+WATCH_COLUMNS = f"{product_dao.LOW_STOCK_COLUMNS}, updated_at"
+_ROW_FIELDS = [c.strip() for c in product_dao.LOW_STOCK_COLUMNS.split(",")]
+
+def _sb():
+    return get_supabase()
+
+def low_stock(threshold: int | None = None, page_size: int | None = None) -> Iterator[Dict]:
+    """
+    Stream {prod_id, name, sku, category, stock, threshold} for products that need
+    reordering, in prod_id order. With a `threshold` every product is held to it;
+    without one the configured reorder levels apply, falling back to RETAIL_LOW_STOCK_THRESHOLD.
+    """
+    if threshold is None:
+        return product_dao.scan_below_reorder_level(LOW_STOCK_THRESHOLD, page_size)
+    if catalog.enabled():
+        rows = catalog.catalog.ensure_fresh().low_stock(threshold)
+    else:
+        rows = product_dao.scan_low_stock(threshold, page_size)
+    return ({**{f: row.get(f) for f in _ROW_FIELDS}, "threshold": threshold} for row in rows)
+
+
+class LowStockWatcher:
+    """
+    Tracks which products are below their reorder level and reports transitions:
+    {"event": "low" | "recovered", prod_id, name, sku, category, stock, threshold}.
+    start() returns the current low set as "low" events; each poll() returns only changes.
+    """
+
+    def __init__(self, default: int | None = None):
+        self.default = LOW_STOCK_THRESHOLD if default is None else default
+        self.low: Dict[int, Dict] = {}
+        self._thresholds: Optional[Dict] = None
+        self._watermark: Optional[str] = None
+        self._pending: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _on_stock_change(self, rows: List[Dict]) -> None:
+        with self._lock:
+            for row in rows:
+                self._pending[row["prod_id"]] = row
+
+    def _load_thresholds(self) -> Dict:
+        by_scope: Dict = {"sku": {}, "category": {}}
+        for t in product_dao.list_reorder_thresholds():
+            by_scope[t["scope"]][t["target"]] = t["threshold"]
+        return by_scope
+
+    def threshold_for(self, row: Dict) -> int:
+        sku_levels, category_levels = self._thresholds["sku"], self._thresholds["category"]
+        if row.get("sku") in sku_levels:
+            return sku_levels[row["sku"]]
+        return category_levels.get(row.get("category"), self.default)
+
+    def _newest_update(self) -> Optional[str]:
+        resp = _sb().table("products").select("updated_at").order("updated_at", desc=True).limit(1).execute()
+        return str(resp.data[0]["updated_at"]) if resp.data and resp.data[0]["updated_at"] else None
+
+    def _event(self, kind: str, row: Dict, threshold: int) -> Dict:
+        return {"event": kind, "prod_id": row["prod_id"], "name": row.get("name"), "sku": row.get("sku"),
+                "category": row.get("category"), "stock": row.get("stock"), "threshold": threshold}
+
+    def _full_pass(self) -> List[Dict]:
+        current = {r["prod_id"]: r for r in product_dao.scan_below_reorder_level(self.default)}
+        events = [self._event("low", r, r["threshold"]) for pid, r in current.items() if pid not in self.low]
+        # Stock isn't known for products that left the low set here
+        events += [self._event("recovered", dict(r, stock=None), self.threshold_for(r))
+                   for pid, r in self.low.items() if pid not in current]
+        self.low = current
+        return events
+
+    def start(self) -> List[Dict]:
+        product_dao.add_stock_listener(self._on_stock_change)
+        self._watermark = self._newest_update()
+        self._thresholds = self._load_thresholds()
+        return self._full_pass()
+
+    def stop(self) -> None:
+        product_dao.remove_stock_listener(self._on_stock_change)
+
+    def poll(self) -> List[Dict]:
+        """
+        Re-check products changed since the last pass; a full pass if reorder levels were edited.
+        """
+        with self._lock:
+            changed, self._pending = self._pending, {}
+        since = self._watermark
+        where = None
+        if since is not None:
+            since = (datetime.fromisoformat(since) - timedelta(seconds=WATCH_OVERLAP_SECONDS)).isoformat()
+            where = lambda q: q.gt("updated_at", since)
+        for row in scan_table("products", "prod_id", WATCH_COLUMNS, where=where):
+            changed[row["prod_id"]] = row
+            stamp = row.get("updated_at")
+            if stamp and (self._watermark is None or str(stamp) > self._watermark):
+                self._watermark = str(stamp)
+
+        thresholds = self._load_thresholds()
+        if thresholds != self._thresholds:
+            self._thresholds = thresholds
+            return self._full_pass()
+
+        events = []
+        for pid, row in sorted(changed.items()):
+            threshold = self.threshold_for(row)
+            is_low = (row.get("stock") or 0) <= threshold
+            if is_low and pid not in self.low:
+                self.low[pid] = dict(row, threshold=threshold)
+                events.append(self._event("low", row, threshold))
+            elif not is_low and pid in self.low:
+                del self.low[pid]
+                events.append(self._event("recovered", row, threshold))
+            elif is_low:
+                self.low[pid] = dict(row, threshold=threshold)
+        return events
+
+
+def watch(on_event: Callable[[Dict], None], interval: float = 10.0, default: int | None = None,
+          passes: int | None = None) -> None:
+    """
+    Report the current low set, then poll every `interval` seconds (forever, or `passes` times).
+    """
+    watcher = LowStockWatcher(default)
+    try:
+        for event in watcher.start():
+            on_event(event)
+        n = 0
+        while passes is None or n < passes:
+            time.sleep(interval)
+            for event in watcher.poll():
+                on_event(event)
+            n += 1
+    finally:
+        watcher.stop()
@@ -1,5 +1,7 @@
-from src.dao import customer_dao, product_dao
+from src.dao import catalog, customer_dao, product_dao
+from src.services import report_aggregates
 from src.config import get_supabase
+from src.resilience import resilience
 from datetime import datetime
 
 def _sb():
@@ -11,120 +13,285 @@ def create_order(customer_id: int, items: list[dict]) -> dict:
     if not customer:
         raise ValueError(f"Customer with id {customer_id} does not exist.")
 
-    # Check product stock and calculate total
-    total_amount = 0
-    product_updates = []
+    # Merge repeated lines for the same product so stock is checked against the total
+    demand = {}
     for item in items:
-        prod = product_dao.get_product_by_id(item["prod_id"])
-        if not prod:
-            raise ValueError(f"Product id {item['prod_id']} does not exist.")
-        if prod["stock"] < item["quantity"]:
-            raise ValueError(f"Not enough stock for product {prod['name']} (id {prod['prod_id']}).")
-        total_amount += prod["price"] * item["quantity"]
-        product_updates.append((prod["prod_id"], prod["stock"] - item["quantity"]))
-
-    # Insert order
-    order_payload = {
-        "cust_id": customer_id,
-        "total_amount": total_amount,
-        "status": "PLACED"
-    }
-    order_resp = _sb().table("orders").insert(order_payload).execute()
-    order_id = order_resp.data[0]["order_id"]
+        demand[item["prod_id"]] = demand.get(item["prod_id"], 0) + item["quantity"]
 
-    # Insert order items and update product stock
+    # Take the whole basket out of stock atomically (no read-modify-write race)
+    products = _reserve_basket(items, demand)
+    total_amount = 0
     for item in items:
-        prod = product_dao.get_product_by_id(item["prod_id"])
-        _sb().table("order_items").insert({
+        total_amount += products[item["prod_id"]]["price"] * item["quantity"]
+
+    order_id = None
+    try:
+        # Insert order
+        order_payload = {
+            "cust_id": customer_id,
+            "total_amount": total_amount,
+            "status": "PLACED"
+        }
+        order_resp = _sb().table("orders").insert(order_payload).execute()
+        order_id = order_resp.data[0]["order_id"]
+
+        # Insert all order items in one request
+        _sb().table("order_items").insert([
+            {
+                "order_id": order_id,
+                "prod_id": item["prod_id"],
+                "quantity": item["quantity"],
+                "price": products[item["prod_id"]]["price"]
+            }
+            for item in items
+        ]).execute()
+
+        # Insert pending payment
+        _sb().table("payments").insert({
             "order_id": order_id,
-            "prod_id": item["prod_id"],
-            "quantity": item["quantity"],
-            "price": prod["price"]
+            "amount": total_amount,
+            "status": "PENDING"
         }).execute()
-    for prod_id, new_stock in product_updates:
-        _sb().table("products").update({"stock": new_stock}).eq("prod_id", prod_id).execute()
-
-    # Insert pending payment
-    _sb().table("payments").insert({
-        "order_id": order_id,
-        "amount": total_amount,
-        "status": "PENDING"
-    }).execute()
+    except Exception:
+        # Undo a half-written order (items and payment cascade), then hand the reserved stock back
+        if order_id is not None:
+            _delete_orders([order_id])
+        product_dao.release_stock(demand)
+        raise
+    report_aggregates.record_order_created(customer_id, demand)
 
     return get_order_details(order_id)
 
+def _delete_orders(order_ids: list[int]) -> None:
+    """
+    Compensation for orders that were only partly written. Deleting by id is safe to
+    retry. If it still fails the error propagates and the stock stays reserved for the
+    orders that remain.
+    """
+    with resilience.idempotent():
+        _sb().table("orders").delete().in_("order_id", order_ids).execute()
+
+# Attempts at reserving a batch's stock before giving up on concurrent stock changes
+BATCH_RESERVE_ATTEMPTS = 3
+
+def create_orders(batch: list[dict]) -> list[dict]:
+    """
+    Place many orders at once (e.g. a till uploading its offline queue).
+    Each entry is {"customer_id", "items": [{prod_id, quantity}], "ref" (optional, echoed back)}.
+
+    Customers and products are validated with one query each, stock for every accepted
+    order is reserved in one call, and orders, items and pending payments are written
+    with one bulk insert each, so the number of round trips doesn't grow with the batch.
+    Returns one result per entry, in order: {index, ref, ok, order_id, total_amount} or
+    {index, ref, ok: False, error}. Orders are accepted first come, first served while
+    stock lasts.
+    """
+    results: list[dict] = [{"index": i, "ref": entry.get("ref"), "ok": False} for i, entry in enumerate(batch)]
+    pending: dict[int, tuple[int, list[dict], dict]] = {}
+    for i, entry in enumerate(batch):
+        try:
+            customer_id = int(entry.get("customer_id", entry.get("cust_id")))
+            items = [{"prod_id": int(it["prod_id"]), "quantity": int(it["quantity"])} for it in entry["items"]]
+        except (KeyError, TypeError, ValueError):
+            results[i]["error"] = "Order needs a customer_id and items of {prod_id, quantity}."
+            continue
+        if not items or any(it["quantity"] <= 0 for it in items):
+            results[i]["error"] = "Order needs at least one item and positive quantities."
+            continue
+        demand = {}
+        for item in items:
+            demand[item["prod_id"]] = demand.get(item["prod_id"], 0) + item["quantity"]
+        pending[i] = (customer_id, items, demand)
+
+    customers = customer_dao.get_customers_by_ids([c for c, _, _ in pending.values()])
+    for i, (customer_id, _, _) in list(pending.items()):
+        if customer_id not in customers:
+            results[i]["error"] = f"Customer with id {customer_id} does not exist."
+            del pending[i]
+
+    accepted, products = _reserve_batch(pending, results)
+    if not accepted:
+        return results
+
+    total_demand: dict = {}
+    orders_per_customer: dict = {}
+    order_rows = []
+    for i in accepted:
+        customer_id, items, demand = pending[i]
+        for pid, qty in demand.items():
+            total_demand[pid] = total_demand.get(pid, 0) + qty
+        orders_per_customer[customer_id] = orders_per_customer.get(customer_id, 0) + 1
+        total = sum(products[it["prod_id"]]["price"] * it["quantity"] for it in items)
+        order_rows.append({"cust_id": customer_id, "total_amount": total, "status": "PLACED"})
+
+    written: list[dict] = []
+    try:
+        written = _sb().table("orders").insert(order_rows).execute().data or []
+        if len(written) != len(order_rows):
+            raise RuntimeError(f"Expected {len(order_rows)} orders back from the insert, got {len(written)}.")
+        item_rows, payment_rows = [], []
+        for i, order in zip(accepted, written):
+            for item in pending[i][1]:
+                item_rows.append({"order_id": order["order_id"], "prod_id": item["prod_id"],
+                                  "quantity": item["quantity"], "price": products[item["prod_id"]]["price"]})
+            payment_rows.append({"order_id": order["order_id"], "amount": order["total_amount"], "status": "PENDING"})
+        _sb().table("order_items").insert(item_rows).execute()
+        _sb().table("payments").insert(payment_rows).execute()
+    except Exception:
+        # Undo the whole batch: drop orders already written (items/payments cascade) and return the stock
+        if written:
+            _delete_orders([o["order_id"] for o in written])
+        product_dao.release_stock(total_demand)
+        raise
+    report_aggregates.apply_delta(units=total_demand, orders=orders_per_customer)
+
+    for i, order in zip(accepted, written):
+        results[i].update(ok=True, order_id=order["order_id"], total_amount=order["total_amount"])
+    return results
+
+def _reserve_batch(pending: dict, results: list[dict]) -> tuple[list[int], dict]:
+    """
+    Decide which pending orders the current stock can fill (in batch order) and reserve
+    their combined demand atomically. Failed entries get an error in `results`.
+    Returns (accepted indexes, {prod_id: product row}).
+    """
+    for attempt in range(BATCH_RESERVE_ATTEMPTS):
+        for i in pending:
+            results[i].pop("error", None)
+        ids = list({pid for _, _, demand in pending.values() for pid in demand})
+        products = {}
+        if attempt == 0 and catalog.enabled():
+            # Plan against the snapshot; a failed reservation re-plans from the database
+            products = catalog.catalog.ensure_fresh().get_many(ids)
+        if len(products) < len(ids):
+            products = product_dao.get_products_by_ids(ids, fresh=True)
+        available = {pid: row["stock"] for pid, row in products.items()}
+        accepted, total = [], {}
+        for i, (_, items, demand) in pending.items():
+            missing = next((pid for pid in demand if pid not in products), None)
+            if missing is not None:
+                results[i]["error"] = f"Product id {missing} does not exist."
+                continue
+            short = next((pid for pid, qty in demand.items() if available[pid] < qty), None)
+            if short is not None:
+                results[i]["error"] = f"Not enough stock for product {products[short]['name']} (id {short})."
+                continue
+            for pid, qty in demand.items():
+                available[pid] -= qty
+                total[pid] = total.get(pid, 0) + qty
+            accepted.append(i)
+        if not total:
+            return [], products
+        try:
+            reserved = product_dao.reserve_stock(total)
+        except product_dao.InsufficientStock:
+            # Stock moved between the read and the reservation: re-plan against fresh numbers
+            continue
+        products.update(reserved)
+        return accepted, products
+    for i in pending:
+        results[i].setdefault("error", "Stock changed concurrently; retry the order.")
+    return [], {}
+
+def _reserve_basket(items: list[dict], demand: dict) -> dict:
+    """
+    Reserve stock for the basket, translating shortages into the usual per-line errors.
+    """
+    try:
+        return product_dao.reserve_stock(demand)
+    except product_dao.InsufficientStock as e:
+        _raise_shortage(items, e)
+        raise
+
+def _raise_shortage(items: list[dict], error: Exception) -> None:
+    shortages = {s["prod_id"]: s for s in error.shortages}
+    for item in items:
+        short = shortages.get(item["prod_id"])
+        if short and short.get("name") is None:
+            raise ValueError(f"Product id {item['prod_id']} does not exist.") from error
+        if short:
+            raise ValueError(f"Not enough stock for product {short['name']} (id {item['prod_id']}).") from error
+
+def _transition(order_id: int, to_status: str, action: str) -> None:
+    """
+    Move a PLACED order to `to_status` with a conditional update, so concurrent
+    callers can't both act on the same order.
+    """
+    resp = _sb().table("orders").update({"status": to_status}) \
+        .eq("order_id", order_id).eq("status", "PLACED").execute()
+    if resp.data:
+        return
+    order = _sb().table("orders").select("order_id").eq("order_id", order_id).limit(1).execute()
+    if not order.data:
+        raise ValueError("Order not found.")
+    raise ValueError(f"Only orders with status 'PLACED' can be {action}.")
+
 def process_payment(order_id: int, method: str) -> dict:
     # Mark payment as PAID
     payment = _sb().table("payments").select("*").eq("order_id", order_id).limit(1).execute()
     if not payment.data:
         raise ValueError("Payment record not found for this order.")
-    _sb().table("payments").update({
+    updated = _sb().table("payments").update({
         "status": "PAID",
         "method": method,
         "paid_at": datetime.now().isoformat()
     }).eq("order_id", order_id).execute()
+    report_aggregates.record_payment_change(payment.data[0], updated.data[0] if updated.data else None)
     # Mark order as COMPLETED
     _sb().table("orders").update({"status": "COMPLETED"}).eq("order_id", order_id).execute()
     return get_order_details(order_id)
 
-def get_order_details(order_id: int) -> dict:
-    # Fetch order
-    order = _sb().table("orders").select("*").eq("order_id", order_id).limit(1).execute()
-    if not order.data:
-        raise ValueError("Order not found.")
-    order = order.data[0]
-    # Fetch customer
-    customer = customer_dao.get_customer_by_id(order["cust_id"])
-    # Fetch order items
-    items = _sb().table("order_items").select("*").eq("order_id", order_id).execute().data
-    # Fetch product details for each item
+# One PostgREST request loads the order with its customer, items (+ products) and payment
+ORDER_DETAILS_SELECT = "*, customers(*), order_items(*, products(*)), payments(*)"
+
+def _shape_order_details(row: dict) -> dict:
+    """
+    Turn an embedded orders row into the {order, customer, items, payment} dict.
+    """
+    order = dict(row)
+    customer = order.pop("customers", None)
+    items = order.pop("order_items", None) or []
+    payments = order.pop("payments", None) or []
+    items.sort(key=lambda i: i.get("item_id") or 0)
     for item in items:
-        prod = product_dao.get_product_by_id(item["prod_id"])
-        item["product_info"] = prod
-    # Fetch payment
-    payment = _sb().table("payments").select("*").eq("order_id", order_id).limit(1).execute()
-    payment = payment.data[0] if payment.data else None
+        item["product_info"] = item.pop("products", None)
     return {
         "order": order,
         "customer": customer,
         "items": items,
-        "payment": payment
+        "payment": payments[0] if payments else None
     }
 
+def get_order_details(order_id: int) -> dict:
+    order = _sb().table("orders").select(ORDER_DETAILS_SELECT).eq("order_id", order_id).limit(1).execute()
+    if not order.data:
+        raise ValueError("Order not found.")
+    return _shape_order_details(order.data[0])
+
 def get_orders_by_customer(customer_id: int) -> list:
     orders = _sb().table("orders").select("*").eq("cust_id", customer_id).order("order_id", desc=False).execute()
     return orders.data or []
 
 def cancel_order(order_id: int) -> dict:
-    # Fetch order
-    order = _sb().table("orders").select("*").eq("order_id", order_id).limit(1).execute()
-    if not order.data:
-        raise ValueError("Order not found.")
-    order = order.data[0]
-    if order["status"] != "PLACED":
-        raise ValueError("Only orders with status 'PLACED' can be cancelled.")
+    # Update order status first: only one caller can win the PLACED -> CANCELLED transition
+    _transition(order_id, "CANCELLED", "cancelled")
 
     # Restore stock
     items = _sb().table("order_items").select("*").eq("order_id", order_id).execute().data
+    returned = {}
     for item in items:
-        prod = product_dao.get_product_by_id(item["prod_id"])
-        new_stock = prod["stock"] + item["quantity"]
-        _sb().table("products").update({"stock": new_stock}).eq("prod_id", prod["prod_id"]).execute()
+        returned[item["prod_id"]] = returned.get(item["prod_id"], 0) + item["quantity"]
+    if returned:
+        product_dao.release_stock(returned)
 
-    # Update order status
-    _sb().table("orders").update({"status": "CANCELLED"}).eq("order_id", order_id).execute()
     # Mark payment as REFUNDED
-    _sb().table("payments").update({"status": "REFUNDED"}).eq("order_id", order_id).execute()
+    refunded = _sb().table("payments").update({"status": "REFUNDED"}).eq("order_id", order_id).execute()
+    for row in refunded.data or []:
+        # paid_at is only ever set when a payment is marked PAID
+        if row.get("paid_at"):
+            report_aggregates.record_payment_change(dict(row, status="PAID"), row)
     return get_order_details(order_id)
 
 def complete_order(order_id: int) -> dict:
-    # Fetch order
-    order = _sb().table("orders").select("*").eq("order_id", order_id).limit(1).execute()
-    if not order.data:
-        raise ValueError("Order not found.")
-    order = order.data[0]
-    if order["status"] != "PLACED":
-        raise ValueError("Only orders with status 'PLACED' can be completed.")
-
-    _sb().table("orders").update({"status": "COMPLETED"}).eq("order_id", order_id).execute()
-    return get_order_details(order_id)
\ No newline at end of file
+    _transition(order_id, "COMPLETED", "completed")
+    return get_order_details(order_id)
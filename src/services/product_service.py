@@ -1,6 +1,8 @@
 # src/services/product_service.py
 from typing import List, Dict
 import src.dao.product_dao as product_dao
+from src.services import low_stock
+from src.dao.errors import is_unique_violation
  
 class ProductError(Exception):
     pass
@@ -12,20 +14,24 @@ def add_product(name: str, sku: str, price: float, stock: int = 0, category: str
     """
     if price <= 0:
         raise ProductError("Price must be greater than 0")
-    existing = product_dao.get_product_by_sku(sku)
-    if existing:
-        raise ProductError(f"SKU already exists: {sku}")
-    return product_dao.create_product(name, sku, price, stock, category)
+    try:
+        return product_dao.create_product(name, sku, price, stock, category)
+    except Exception as e:
+        if is_unique_violation(e):
+            raise ProductError(f"SKU already exists: {sku}") from e
+        raise
  
 def restock_product(prod_id: int, delta: int) -> Dict:
     if delta <= 0:
         raise ProductError("Delta must be positive")
-    p = product_dao.get_product_by_id(prod_id)
-    if not p:
+    # Atomic increment: concurrent restocks and orders can't overwrite each other
+    rows = product_dao.release_stock({prod_id: delta})
+    if prod_id not in rows:
         raise ProductError("Product not found")
-    new_stock = (p.get("stock") or 0) + delta
-    return product_dao.update_product(prod_id, {"stock": new_stock})
+    return rows[prod_id]
  
-def get_low_stock(threshold: int = 5) -> List[Dict]:
-    allp = product_dao.list_products(limit=1000)
-    return [p for p in allp if (p.get("stock") or 0) <= threshold]
\ No newline at end of file
+def get_low_stock(threshold: int | None = 5) -> List[Dict]:
+    """
+    Products with stock <= threshold; threshold=None applies the configured reorder levels.
+    """
+    return list(low_stock.low_stock(threshold))
@@ -0,0 +1,90 @@
+# src/services/report_aggregates.py
+"""
+Incrementally maintained report totals: units sold per product, orders per
+customer and paid revenue per day. order_service pushes deltas as orders change,
+so the reports read a handful of pre-aggregated rows instead of scanning history.
+
+Enable with RETAIL_INCREMENTAL_REPORTS=1 and run `report rebuild` once to seed
+the tables from existing data; `report verify` diffs them against a recomputation.
+Deltas are best-effort: the order they describe is already committed, so a
+failed update is logged and left for `report verify` / `report rebuild`.
+"""
+import logging
+import os
+from src.config import get_supabase
+from src.dao.scan import scan_table
+
+INCREMENTAL_REPORTS = os.getenv("RETAIL_INCREMENTAL_REPORTS", "0").lower() in ("1", "true", "yes")
+
+log = logging.getLogger(__name__)
+
+def _sb():
+    return get_supabase()
+
+def enabled() -> bool:
+    return INCREMENTAL_REPORTS
+
+def apply_delta(units: dict | None = None, orders: dict | None = None, revenue: dict | None = None) -> None:
+    """
+    units {prod_id: qty}, orders {cust_id: n}, revenue {"YYYY-MM-DD": amount}; applied in one RPC.
+    Never raises: a failure is logged and the aggregates drift until the next rebuild.
+    """
+    if not INCREMENTAL_REPORTS:
+        return
+    params = {
+        "p_units": [{"prod_id": k, "units": v} for k, v in (units or {}).items() if v],
+        "p_orders": [{"cust_id": k, "orders": v} for k, v in (orders or {}).items() if k is not None and v],
+        "p_revenue": [{"day": k, "amount": v} for k, v in (revenue or {}).items() if v],
+    }
+    if not any(params.values()):
+        return
+    try:
+        _sb().rpc("report_apply_delta", params).execute()
+    except Exception:
+        log.warning("Report aggregate update failed; run `report verify` / `report rebuild` to repair: %s",
+                    params, exc_info=True)
+
+def record_order_created(cust_id: int, demand: dict) -> None:
+    apply_delta(units=demand, orders={cust_id: 1})
+
+def record_payment_change(before: dict | None, after: dict | None) -> None:
+    """
+    Adjust daily revenue for a payment row moving from `before` to `after`.
+    Only PAID rows with a paid_at count, mirroring the revenue report.
+    """
+    revenue: dict = {}
+    for row, sign in ((before, -1), (after, 1)):
+        if row and row.get("status") == "PAID" and row.get("paid_at"):
+            day = str(row["paid_at"])[:10]
+            revenue[day] = revenue.get(day, 0) + sign * float(row.get("amount") or 0)
+    apply_delta(revenue=revenue)
+
+def top_selling_products(limit: int = 5) -> list[dict]:
+    resp = _sb().table("report_product_sales").select("prod_id, units_sold, products(name)") \
+        .order("units_sold", desc=True).order("prod_id").limit(limit).execute()
+    return [
+        {"prod_id": r["prod_id"], "name": (r.get("products") or {}).get("name"), "units_sold": r["units_sold"]}
+        for r in (resp.data or [])
+    ]
+
+def revenue_since(day: str) -> float:
+    resp = _sb().table("report_daily_revenue").select("day, revenue").gte("day", day[:10]).execute()
+    return float(sum(float(r["revenue"]) for r in (resp.data or [])))
+
+def order_counts_by_customer(min_orders: int = 1) -> dict:
+    rows = scan_table("report_customer_orders", "cust_id", "cust_id, order_count",
+                      where=lambda q: q.gte("order_count", max(1, min_orders)))
+    return {r["cust_id"]: r["order_count"] for r in rows}
+
+def rebuild() -> None:
+    """
+    Recompute every aggregate from the source tables (in the database).
+    """
+    _sb().rpc("report_rebuild_aggregates", {}).execute()
+
+def verify() -> list[dict]:
+    """
+    Return [{kind, key, expected, actual}] for every aggregate that has drifted.
+    """
+    resp = _sb().rpc("report_verify_aggregates", {}).execute()
+    return resp.data or []
@@ -1,34 +1,72 @@
 from src.config import get_supabase
+from src.services import report_aggregates
+from src.dao.scan import SCAN_PAGE_SIZE
 from datetime import datetime, timedelta
-from collections import Counter
 
 def _sb():
     return get_supabase()
 
+def _iso(value) -> str | None:
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+# Every report is aggregated in the database (see the report_* functions in
+# src/tables_used.txt); only the result rows are downloaded. With incremental
+# reports enabled, unwindowed reports read the running totals instead.
+
+def top_selling_products(limit: int = 5, since=None, until=None) -> list[dict]:
+    """
+    Best sellers by units, with product names: [{prod_id, name, units_sold}, ...].
+    `since`/`until` bound the order date (until is exclusive).
+    """
+    if report_aggregates.enabled() and since is None and until is None:
+        return report_aggregates.top_selling_products(limit)
+    resp = _sb().rpc("report_top_selling_products", {
+        "p_limit": limit, "p_from": _iso(since), "p_to": _iso(until)
+    }).execute()
+    return resp.data or []
+
 def top_5_selling_products():
-    resp = _sb().table("order_items").select("prod_id, quantity").execute()
-    counter = Counter()
-    for item in resp.data:
-        counter[item["prod_id"]] += item["quantity"]
-    # Optionally join with product names
-    return counter.most_common(5)
-
-def total_revenue_last_month():
-    from_date = (datetime.now() - timedelta(days=30)).date().isoformat()
-    resp = _sb().table("payments").select("amount, paid_at, status").eq("status", "PAID").gte("paid_at", from_date).execute()
-    total = sum([float(p["amount"]) for p in resp.data])
-    return total
-
-def total_orders_by_customer():
-    resp = _sb().table("orders").select("cust_id").execute()
-    counter = Counter()
-    for order in resp.data:
-        counter[order["cust_id"]] += 1
-    return dict(counter)
+    return [(row["prod_id"], row["units_sold"]) for row in top_selling_products(5)]
+
+def revenue_between(since, until=None) -> float:
+    if report_aggregates.enabled() and until is None:
+        return report_aggregates.revenue_since(_iso(since))
+    resp = _sb().rpc("report_paid_revenue", {"p_from": _iso(since), "p_to": _iso(until)}).execute()
+    return float(resp.data or 0)
+
+def total_revenue_last_month(days: int = 30):
+    from_date = (datetime.now() - timedelta(days=days)).date().isoformat()
+    return revenue_between(from_date)
+
+def order_counts_by_customer(min_orders: int = 1, since=None, until=None) -> dict:
+    if report_aggregates.enabled() and since is None and until is None:
+        return report_aggregates.order_counts_by_customer(min_orders)
+    return {row["cust_id"]: row["order_count"] for row in scan_order_counts(min_orders, since, until)}
+
+def scan_order_counts(min_orders: int = 1, since=None, until=None, page_size: int | None = None):
+    """
+    Stream {cust_id, order_count} rows page by page (keyset on cust_id).
+    """
+    page_size = page_size or SCAN_PAGE_SIZE
+    after = None
+    while True:
+        resp = _sb().rpc("report_orders_by_customer", {
+            "p_from": _iso(since), "p_to": _iso(until), "p_min_orders": min_orders,
+            "p_after": after, "p_page_size": page_size
+        }).execute()
+        page = resp.data or []
+        yield from page
+        if len(page) < page_size:
+            return
+        after = page[-1]["cust_id"]
+
+def total_orders_by_customer(since=None, until=None):
+    return order_counts_by_customer(1, since, until)
+
+def customers_with_more_than(n: int = 2, since=None, until=None) -> list:
+    return list(order_counts_by_customer(n + 1, since, until))
 
 def customers_with_more_than_2_orders():
-    resp = _sb().table("orders").select("cust_id").execute()
-    counter = Counter()
-    for order in resp.data:
-        counter[order["cust_id"]] += 1
-    return [cust_id for cust_id, count in counter.items() if count > 2]
\ No newline at end of file
+    return customers_with_more_than(2)
@@ -0,0 +1,27 @@
+"""
+Small-scale run of the stock reservation stress test (src/bench/stress_stock.py)
+against the local PostgREST stand-in: concurrent orders, cancellations and
+restocks on a few hot products must never oversell or lose a stock update.
+"""
+from src.bench.stress_stock import build_parser, run
+
+
+def _stress(*argv):
+    return run(build_parser().parse_args(["--latency-ms", "0", "--jitter-ms", "1", *argv]))
+
+
+def test_no_oversell_or_lost_restocks():
+    result = _stress("--threads", "16", "--orders", "300", "--products", "3", "--stock", "100")
+    assert result["outcome"]["errors"] == 0
+    assert result["violations"] == []
+    assert result["outcome"]["restocks"] > 0
+    assert result["outcome"]["cancelled"] > 0
+
+
+def test_contended_stock_runs_out_without_going_negative():
+    # Far more demand than stock: most orders must be refused, and none may dip below zero
+    result = _stress("--threads", "16", "--orders", "300", "--products", "2", "--stock", "20",
+                     "--restock-ratio", "0", "--cancel-ratio", "0")
+    assert result["outcome"]["errors"] == 0
+    assert result["outcome"]["rejected"] > 0
+    assert result["violations"] == []